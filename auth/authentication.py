@@ -0,0 +1,43 @@
+"""
+Autenticación JWT con el usuario resuelto desde cache.
+"""
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from auth.services import UserCacheService
+from auth.tokens import TokenBlacklistStore
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    Igual que JWTAuthentication, pero el User sale de UserCacheService: la firma
+    del token ya se verificó, así que en un hit la request no consulta la BD
+    para autenticar. En un miss se carga como siempre y se cachea.
+
+    Sólo con una cache compartida (Redis): con LocMem cada worker tendría su
+    copia y un baneo o cambio de contraseña sólo invalidaría la del worker
+    que lo atendió.
+    """
+
+    def get_user(self, validated_token):
+        # CHECK_REVOKE_TOKEN compara contra el hash de la contraseña, que no se cachea
+        if api_settings.CHECK_REVOKE_TOKEN or not TokenBlacklistStore.shared():
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = UserCacheService.get(user_id)
+        if user is None:
+            user = super().get_user(validated_token)
+            UserCacheService.set(user)
+            return user
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return user
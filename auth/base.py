@@ -2,13 +2,12 @@
 Clases base que TODAS las vistas de autenticación heredarán.
 Esto garantiza comportamiento consistente.
 """
-import json
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 from core.mixins import SentryErrorHandlerMixin
 from config.throttling import SensitiveOperationThrottle
-from rest_framework_simplejwt.tokens import RefreshToken
+from auth.tokens import RefreshToken
 from django.utils import timezone
 from datetime import timedelta
 import logging
@@ -52,13 +51,9 @@ class BaseAuthenticationView(SentryErrorHandlerMixin):
                 'is_new_user': self._is_new_user(user)
             })
         
-        message = f"[bold cyan]{event_type}[/bold cyan]: {user.email if user else 'N/A'}"
-        details = json.dumps(log_data, indent=2, default=str)
-        
-        if success:
-            logger.info(f"{message}\n{details}", extra={'log_data': log_data})
-        else:
-            logger.warning(f"{message}\n{details}", extra={'log_data': log_data})
+        # Los detalles van en extra: el formatter decide si/cómo serializarlos al emitir
+        level = logging.INFO if success else logging.WARNING
+        logger.log(level, "%s: %s", event_type, user.email if user else 'N/A', extra={'log_data': log_data})
             
     def _is_new_user(self, user):
         """Detecta si el usuario fue creado recientemente (últimos 10 segundos)"""
@@ -2,11 +2,16 @@
 import re
 from rest_framework import serializers
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import (
+    TokenBlacklistSerializer,
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
+)
 from django.contrib.auth.password_validation import validate_password
 from django.contrib.auth import get_user_model
 from dj_rest_auth.registration.serializers import SocialLoginSerializer
 
+from auth.tokens import RefreshToken
 from core.responses.messages import AuthMessages
 
 User = get_user_model()
@@ -27,9 +32,23 @@ class SetNewPasswordSerializer(serializers.Serializer):
             )
         return attrs
 
+# Mismos serializers de simplejwt, con la blacklist en cache de auth.tokens.RefreshToken
+class JWTObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = RefreshToken
+
+
+class JWTRefreshSerializer(TokenRefreshSerializer):
+    token_class = RefreshToken
+
+
+class JWTBlacklistSerializer(TokenBlacklistSerializer):
+    token_class = RefreshToken
+
+
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     """Serializer que permite autenticación con username o email"""
-    
+    token_class = RefreshToken
+
     username = serializers.CharField(required=False)
     email = serializers.EmailField(required=False)
     password = serializers.CharField(write_only=True)
@@ -8,6 +8,7 @@ from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from django.core.mail import send_mail
 from django.conf import settings
+from django.core.cache import cache
 from rest_framework.exceptions import ValidationError
 import logging
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
@@ -35,7 +36,7 @@ class AuthenticationService:
     @staticmethod
     def generate_tokens_for_user(user):
         """Genera tokens JWT para un usuario"""
-        from rest_framework_simplejwt.tokens import RefreshToken
+        from auth.tokens import RefreshToken
         
         refresh = RefreshToken.for_user(user)
         return {
@@ -179,6 +180,7 @@ class ChangePasswordService:
 
         user.set_password(new_password)
         user.save(update_fields=['password'])
+        UserCacheService.invalidate(user.pk)
 
 
 
@@ -235,4 +237,46 @@ class LoginService:
     @staticmethod
     def check_provider_only_account(user) -> bool:
         """True si el usuario no tiene contraseña utilizable (registrado via provider)."""
-        return user is not None and not user.has_usable_password()
\ No newline at end of file
+        return user is not None and not user.has_usable_password()
+
+
+class UserCacheService:
+    """
+    Usuario de cada request autenticado por JWT, cacheado por id durante
+    AUTH_USER_CACHE_TTL segundos. Se invalida al guardar o borrar el User
+    (users/signals.py), al cambiar contraseña, en el baneo masivo del admin y
+    en el logout. El hash de la contraseña no se guarda: queda diferido.
+    CachedJWTAuthentication no la usa si la cache no es compartida.
+    """
+
+    FIELDS = [
+        'id', 'username', 'email', 'first_name', 'last_name',
+        'is_active', 'is_staff', 'is_superuser', 'last_login', 'date_joined',
+    ]
+
+    @staticmethod
+    def cache_key(user_id) -> str:
+        return f'auth:user:{user_id}'
+
+    @staticmethod
+    def get(user_id):
+        """Retorna el User cacheado o None en un miss."""
+        data = cache.get(UserCacheService.cache_key(user_id))
+        if data is None:
+            return None
+        # from_db espera los valores en el orden de los campos concretos del modelo
+        names = [f.attname for f in User._meta.concrete_fields if f.attname in data]
+        return User.from_db('default', names, [data[name] for name in names])
+
+    @staticmethod
+    def set(user) -> None:
+        cache.set(
+            UserCacheService.cache_key(user.pk),
+            {field: getattr(user, field) for field in UserCacheService.FIELDS},
+            settings.AUTH_USER_CACHE_TTL,
+        )
+
+    @staticmethod
+    def invalidate(*user_ids) -> None:
+        cache.delete_many([UserCacheService.cache_key(user_id) for user_id in user_ids])
+
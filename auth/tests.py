@@ -1,3 +1,5 @@
+import io
+
 from django.test import TestCase
 
 # Create your tests here.
@@ -6,6 +8,16 @@ from django.test import TestCase
 from rest_framework.exceptions import ValidationError  # ← Importar de DRF
 from rest_framework.test import APIClient
 from django.contrib.auth import get_user_model
+from django.test import RequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken as SimpleRefreshToken
+
+from auth.authentication import CachedJWTAuthentication
+from auth.tokens import RefreshToken
+from auth.services import ChangePasswordService, UserCacheService
 User = get_user_model()
 
 
@@ -541,4 +553,143 @@ class RegistrationIntegrationTests(TestCase):
         # Verificar que se llamó send_email dos veces (registro + reenvío)
         self.assertEqual(mock_send_email.call_count, 2)
 
-        
\ No newline at end of file
+        
+
+class CachedJWTAuthenticationTests(TestCase):
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='cacheuser', email='cache@example.com', password='testpass123'
+        )
+        self.refresh = RefreshToken.for_user(self.user)
+        self.factory = RequestFactory()
+        # La cache de usuarios sólo se usa con una cache compartida entre workers
+        patcher = patch('auth.tokens.TokenBlacklistStore.shared', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _authenticate(self):
+        request = self.factory.get(
+            '/api/v1/users/', HTTP_AUTHORIZATION=f'Bearer {self.refresh.access_token}'
+        )
+        return CachedJWTAuthentication().authenticate(request)
+
+    def test_cached_user_skips_database(self):
+        self._authenticate()
+
+        with self.assertNumQueries(0):
+            user, _ = self._authenticate()
+
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(user.email, 'cache@example.com')
+
+    def test_user_save_invalidates_cache(self):
+        self._authenticate()
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self._authenticate()
+
+    def test_change_password_invalidates_cache(self):
+        self._authenticate()
+
+        ChangePasswordService.change_password(self.user, 'testpass123', 'nuevaClave456!')
+
+        self.assertIsNone(UserCacheService.get(self.user.pk))
+
+    def test_logout_invalidates_cache(self):
+        self._authenticate()
+
+        response = APIClient().post('/api/v1/auth/logout/', {'refresh': str(self.refresh)})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(UserCacheService.get(self.user.pk))
+
+    def test_local_cache_always_reads_user_from_database(self):
+        with patch('auth.tokens.TokenBlacklistStore.shared', return_value=False):
+            self._authenticate()
+            self.assertIsNone(UserCacheService.get(self.user.pk))
+
+            # Baneo atendido por otro worker: esta cache no se entera
+            User.objects.filter(pk=self.user.pk).update(is_active=False)
+
+            with self.assertRaises(AuthenticationFailed):
+                self._authenticate()
+
+
+class TokenBlacklistStoreTests(TestCase):
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='tokenuser', email='token@example.com', password='testpass123'
+        )
+
+    def _refresh(self, token):
+        return self.client.post('/api/v1/auth/token/refresh/', {'refresh': str(token)})
+
+    @patch('auth.tokens.TokenBlacklistStore.shared', return_value=True)
+    def test_rotation_blacklists_in_cache_without_db_rows(self, _shared):
+        token = RefreshToken.for_user(self.user)
+
+        first = self._refresh(token)
+        reused = self._refresh(token)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('refresh', first.data)
+        self.assertEqual(reused.status_code, 401)
+        self.assertFalse(OutstandingToken.objects.exists())
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+    def test_logout_blacklists_refresh_token(self):
+        token = RefreshToken.for_user(self.user)
+
+        response = self.client.post('/api/v1/auth/logout/', {'refresh': str(token)})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._refresh(token).status_code, 401)
+
+    @override_settings(TOKEN_BLACKLIST_DB_MIRROR=True)
+    def test_db_mirror_keeps_audit_rows(self):
+        token = RefreshToken.for_user(self.user)
+
+        self._refresh(token)
+
+        self.assertTrue(BlacklistedToken.objects.filter(token__jti=token['jti']).exists())
+
+    @override_settings(TOKEN_BLACKLIST_DB_MIRROR=True)
+    @patch('auth.tokens.TokenBlacklistStore.shared', return_value=True)
+    def test_db_mirror_rejects_token_evicted_from_cache(self, _shared):
+        from django.core.cache import cache
+        token = RefreshToken.for_user(self.user)
+        self._refresh(token)
+
+        cache.clear()
+
+        self.assertEqual(self._refresh(token).status_code, 401)
+
+    def test_local_cache_falls_back_to_db_blacklist(self):
+        # En pruebas la cache es LocMem: cada worker tendría la suya
+        from django.core.cache import cache
+        token = RefreshToken.for_user(self.user)
+        self._refresh(token)
+
+        cache.clear()
+
+        self.assertTrue(BlacklistedToken.objects.filter(token__jti=token['jti']).exists())
+        self.assertEqual(self._refresh(token).status_code, 401)
+
+    def test_migrate_command_moves_existing_rows(self):
+        token = SimpleRefreshToken.for_user(self.user)
+        token.blacklist()
+
+        call_command('migrate_token_blacklist', '--purge', stdout=io.StringIO())
+
+        self.assertFalse(OutstandingToken.objects.exists())
+        self.assertEqual(self._refresh(token).status_code, 401)
+
@@ -0,0 +1,98 @@
+"""
+Refresh tokens con blacklist en Redis.
+
+La blacklist de simplejwt escribe un OutstandingToken por cada token emitido y
+un BlacklistedToken por cada rotación/logout; las tablas crecen sin límite y
+cada verificación es un JOIN contra ellas. Aquí el JTI revocado se guarda en la
+cache (Redis en producción) con expiración igual a la vida restante del token:
+pasado ese punto el token ya no valida por `exp`, así que la entrada sobra.
+
+La cache sólo sirve de blacklist si la comparten todos los workers y sobrevive
+reinicios. Con LocMem/Dummy (sin Redis) un token revocado en un worker seguiría
+valiendo en los demás, así que se escriben y consultan las tablas de simplejwt.
+Lo mismo con TOKEN_BLACKLIST_DB_MIRROR: la BD respalda a la cache cuando Redis
+desaloja una entrada o se reinicia sin persistencia.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import BlacklistMixin, RefreshToken as SimpleRefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow, datetime_from_epoch
+
+# Caches propias de cada proceso: no sirven para revocar tokens entre workers
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+class TokenBlacklistStore:
+
+    @staticmethod
+    def shared() -> bool:
+        """True si la cache por defecto la ven todos los procesos (Redis, Memcached, BD)."""
+        return settings.CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
+    @staticmethod
+    def uses_db() -> bool:
+        """True si la blacklist también se escribe y consulta en las tablas de simplejwt."""
+        return settings.TOKEN_BLACKLIST_DB_MIRROR or not TokenBlacklistStore.shared()
+
+    @staticmethod
+    def cache_key(jti: str) -> str:
+        return f'jwt:blacklist:{jti}'
+
+    @staticmethod
+    def ttl(exp: int) -> int:
+        """Segundos que le quedan al token; nunca 0 (en la cache 0 significa no guardar)."""
+        remaining = (datetime_from_epoch(exp) - aware_utcnow()).total_seconds()
+        return max(int(remaining) + 1, 1)
+
+    @staticmethod
+    def add(jti: str, exp: int) -> None:
+        cache.set(TokenBlacklistStore.cache_key(jti), 1, TokenBlacklistStore.ttl(exp))
+
+    @staticmethod
+    def add_many(entries) -> int:
+        """Agrega pares (jti, exp); retorna cuántos seguían vigentes."""
+        added = 0
+        for jti, exp in entries:
+            if datetime_from_epoch(exp) > aware_utcnow():
+                TokenBlacklistStore.add(jti, exp)
+                added += 1
+        return added
+
+    @staticmethod
+    def contains(jti: str) -> bool:
+        return cache.get(TokenBlacklistStore.cache_key(jti)) is not None
+
+
+class RefreshToken(SimpleRefreshToken):
+    """RefreshToken de simplejwt con la blacklist en TokenBlacklistStore (y en BD si hace falta)."""
+
+    def check_blacklist(self) -> None:
+        if TokenBlacklistStore.contains(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+        if TokenBlacklistStore.uses_db():
+            # Cubre workers con cache propia y entradas desalojadas de Redis
+            super().check_blacklist()
+
+    def blacklist(self):
+        TokenBlacklistStore.add(self.payload[api_settings.JTI_CLAIM], self.payload['exp'])
+        if TokenBlacklistStore.uses_db():
+            return super().blacklist()
+        return None
+
+    def outstand(self):
+        if TokenBlacklistStore.uses_db():
+            return super().outstand()
+        return None
+
+    @classmethod
+    def for_user(cls, user):
+        if TokenBlacklistStore.uses_db():
+            return super().for_user(user)
+        # Salta el INSERT de OutstandingToken de BlacklistMixin.for_user
+        return super(BlacklistMixin, cls).for_user(user)
@@ -12,14 +12,15 @@ from django.contrib.auth import authenticate, get_user_model
 from auth.base import BaseAuthenticationView, BaseJWTView
 from auth.docs.schemas import LOGIN_SCHEMA, LOGOUT, TOKEN_REFRESH, TOKEN_VERIFY
 from auth.serializers import CustomTokenObtainPairSerializer, LoginSerializer
-from auth.services import LoginService, UsersRegisterService
+from auth.services import LoginService, UserCacheService, UsersRegisterService
 from core.docs.schema_utils import auto_schema
 from config.throttling import LoginThrottle
 from rest_framework.views import APIView
 from rest_framework.generics import GenericAPIView
 from rest_framework.permissions import AllowAny
 from rest_framework import status
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.settings import api_settings
+from auth.tokens import RefreshToken
 from core.responses.messages import AuthMessages
 from auth.base import BaseAuthenticationView
 
@@ -91,4 +92,11 @@ class TokenVerifyView(TokenVerifyView):
 
 @auto_schema(**LOGOUT)
 class LogoutView(TokenBlacklistView):
-    pass
\ No newline at end of file
+
+    def post(self, request, *args, **kwargs):
+        response = super().post(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            # El refresh ya se validó y quedó en la blacklist; sólo falta leer el user_id
+            token = RefreshToken(request.data['refresh'], verify=False)
+            UserCacheService.invalidate(token[api_settings.USER_ID_CLAIM])
+        return response
\ No newline at end of file
@@ -11,7 +11,7 @@ from pieces.models import Piece
 
 @BLOG_VIEWSET
 class BlogViewSet(ViewSetSentryMixin, ModelViewSet):
-    queryset = Blog.objects.all()
+    queryset = Blog.objects.select_related('section').prefetch_related('pieces')
     serializer_class = BlogSerializer
     permission_classes = [IsAdminOrReadOnly]
     lookup_field = 'slug'
@@ -145,10 +145,17 @@ SIMPLE_JWT = {
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
 
-     'TOKEN_OBTAIN_SERIALIZER': 'rest_framework_simplejwt.serializers.TokenObtainPairSerializer',
+     'TOKEN_OBTAIN_SERIALIZER': 'auth.serializers.JWTObtainPairSerializer',
 
-    'TOKEN_REFRESH_SERIALIZER': 'rest_framework_simplejwt.serializers.TokenRefreshSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'auth.serializers.JWTRefreshSerializer',
+    'TOKEN_BLACKLIST_SERIALIZER': 'auth.serializers.JWTBlacklistSerializer',
 }
+# Segundos que CachedJWTAuthentication reutiliza el User sin consultar la BD (sólo con Redis)
+AUTH_USER_CACHE_TTL = config('AUTH_USER_CACHE_TTL', default=60, cast=int)
+# La blacklist de refresh tokens vive en la cache (Redis) con TTL = vida restante del token.
+# True además escribe y consulta OutstandingToken/BlacklistedToken, por si Redis desaloja
+# una entrada. Sin Redis (LocMem, cache por proceso) la BD se usa siempre
+TOKEN_BLACKLIST_DB_MIRROR = config('TOKEN_BLACKLIST_DB_MIRROR', default=False, cast=bool)
 
 
 #================================================ REST AUTH ==========================================================
@@ -159,6 +166,7 @@ REST_AUTH = {
     'JWT_AUTH_RETURN_EXPIRATION': True,
     'REGISTER_SERIALIZER': 'users.serializers.CustomRegisterSerializer', 
     'TOKEN_MODEL': None,  
+    'JWT_TOKEN_CLAIMS_SERIALIZER': 'auth.serializers.JWTObtainPairSerializer',
 }
 
 
@@ -207,8 +215,8 @@ AUTHENTICATION_BACKENDS = [
 #================================================ REST_FRAMEWORK ======================================================
 if config('ACTIVE_RATES', default=False, cast=bool):
     DEFAULT_THROTTLE_CLASSES = (
-            'rest_framework.throttling.AnonRateThrottle',
-            'rest_framework.throttling.UserRateThrottle',
+            'config.throttling.AnonThrottle',
+            'config.throttling.UserThrottle',
             'config.throttling.BurstRateThrottle',
     )
     DEFAULT_THROTTLE_RATES = {
@@ -223,8 +231,8 @@ if config('ACTIVE_RATES', default=False, cast=bool):
     }
 else:
     DEFAULT_THROTTLE_CLASSES = (
-            'rest_framework.throttling.AnonRateThrottle',
-            'rest_framework.throttling.UserRateThrottle',
+            'config.throttling.AnonThrottle',
+            'config.throttling.UserThrottle',
             'config.throttling.BurstRateThrottle',
     )
     DEFAULT_THROTTLE_RATES = {
@@ -248,7 +256,7 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'auth.authentication.CachedJWTAuthentication',
     ),
 
     'DEFAULT_PERMISSION_CLASSES': [
@@ -284,6 +292,17 @@ EMAIL_HOST_PASSWORD = config('RESEND_API_KEY')
 DEFAULT_FROM_EMAIL = f'no-reply@{DOMAIN}'
 EMAIL_TIMEOUT = 10
 
+#================================================ EMAIL OUTBOX ==========================================================
+# Los correos se encolan en core.EmailOutbox y los entrega `python manage.py process_email_outbox`
+if 'test' in sys.argv:
+    EMAIL_OUTBOX_BACKEND = 'core.services.email_backends.LocmemBackend'
+else:
+    EMAIL_OUTBOX_BACKEND = config('EMAIL_OUTBOX_BACKEND', default='core.services.email_backends.ResendBackend')
+
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', default=6, cast=int)
+# Días que se guarda el html/text de un correo ya enviado (process_email_outbox lo vacía después)
+EMAIL_OUTBOX_RETENTION_DAYS = config('EMAIL_OUTBOX_RETENTION_DAYS', default=7, cast=int)
+
 # ================================================ CORS CONFIGURATION ================================================
 # URLs permitidas (tu frontend)
 CORS_ALLOWED_ORIGINS = config(
@@ -370,6 +389,8 @@ else:
 
 #================================================= MIDDLEWARE ====================================================
 MIDDLEWARE = [
+    'core.middleware.RequestIdMiddleware',
+    'core.middleware.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',  
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -421,6 +442,11 @@ if not DEBUG:
 
 
 #================================================ LOGS ======================================================
+# 'rich' = consola con colores y archivos rotados (dev); 'json' = una línea JSON por registro
+LOG_FORMAT = config('LOG_FORMAT', default='rich')
+# Encola los registros y los formatea/escribe un hilo listener, fuera del request
+LOG_QUEUE = config('LOG_QUEUE', default=LOG_FORMAT == 'json', cast=bool)
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -437,6 +463,9 @@ LOGGING = {
             'format': "%(message)s",
             'datefmt': "[%X]",
         },
+        'json': {
+            '()': 'core.utils.logs.JSONFormatter',
+        },
     },
     'filters': {
         'require_debug_false': {
@@ -500,11 +529,41 @@ LOGGING = {
             'level': 'INFO',
             'propagate': True,
         },
+        'core': {
+            'handlers': ['console', 'file', 'error_file'],
+            'level': 'INFO',
+            'propagate': True,
+        },
         
     },
 }
 
 
+if LOG_FORMAT == 'json':
+    # RotatingFileHandler no es seguro con varios workers de gunicorn (cada uno rota el mismo
+    # archivo por su cuenta). WatchedFileHandler sólo agrega líneas y reabre el archivo cuando
+    # logrotate lo mueve
+    LOGGING['handlers'].update({
+        'console': {
+            'level': 'DEBUG',
+            'class': 'logging.StreamHandler',
+            'formatter': 'json',
+        },
+        'file': {
+            'level': 'INFO',
+            'class': 'logging.handlers.WatchedFileHandler',
+            'filename': LOG_DIR / 'django.jsonl',
+            'formatter': 'json',
+        },
+        'error_file': {
+            'level': 'ERROR',
+            'class': 'logging.handlers.WatchedFileHandler',
+            'filename': LOG_DIR / 'errors.jsonl',
+            'formatter': 'json',
+        },
+    })
+
+
 #================================================ CACHE ======================================================
 REDIS_URL = config('REDIS_URL')
 
@@ -540,6 +599,13 @@ else:
         }
     }
 
+# Throttles de config.throttling: con Redis el conteo es un script Lua atómico compartido por
+# todos los workers; vacío = historial en la cache de Django (comportamiento de DRF)
+THROTTLE_REDIS_URL = config('THROTTLE_REDIS_URL', default=CACHES['default']['LOCATION'] if 'redis' in CACHES['default']['BACKEND'].lower() else '')
+THROTTLE_REDIS_TIMEOUT = config('THROTTLE_REDIS_TIMEOUT', default=0.5, cast=float)
+# Segundos que los throttles dejan de intentar Redis tras un error de conexión
+THROTTLE_REDIS_BACKOFF = config('THROTTLE_REDIS_BACKOFF', default=30, cast=float)
+
 
 
 
@@ -566,11 +632,31 @@ SPECTACULAR_SETTINGS = {
 
 
 #================================================ CONFIGURACION DE SENTRY ======================================================
+# Tasa de trazas por ruta: (prefijo, métodos o None para todos, tasa). Gana la
+# primera entrada que coincide; lo que no coincide usa SENTRY_TRACES_DEFAULT_RATE.
+# Los errores se envían siempre (sample_rate), independientemente de estas tasas.
+SENTRY_TRACES_DEFAULT_RATE = config('SENTRY_TRACES_DEFAULT_RATE', default=0.1, cast=float)
+SENTRY_TRACES_RATES = [
+    ('/health', None, 0.0),
+    ('/api/v1/debug/', None, 0.0),
+    ('/api/v1/metrics/', None, 0.0),
+    ('/static/', None, 0.0),
+    ('/media/', None, 0.0),
+    ('/api/v1/orders/checkout/', None, 1.0),
+    ('/api/v1/orders/webhook/', None, 1.0),
+    ('/api/v1/orders/', ('POST', 'PUT', 'PATCH', 'DELETE'), 1.0),
+    ('/api/v1/pieces/', ('GET', 'HEAD'), config('SENTRY_TRACES_PIECES_READ_RATE', default=0.02, cast=float)),
+]
+
 if not config('DEBUG', default=True, cast=bool):
+    from core.utils.sentry import before_send, traces_sampler
+
     sentry_sdk.init(
         dsn=config('SDK_SENTRY', default=None),
         send_default_pii=True,
-        traces_sample_rate=1.0,
+        sample_rate=1.0,
+        traces_sampler=traces_sampler,
+        before_send=before_send,
     )
 
 
@@ -581,15 +667,56 @@ USE_I18N = True
 USE_TZ = True
 
 
+#================================================ BANXICO ======================================================
+# Serie FIX (SF43718); configurable para apuntar a un servidor falso en benchmarks
+BANXICO_API_URL = config(
+    'BANXICO_API_URL',
+    default='https://www.banxico.org.mx/SieAPIRest/service/v1/series/SF43718/datos/oportuno',
+)
+
+
 #================================================ STRIPE ======================================================
 
 STRIPE_SECRET_KEY = config('STRIPE_SECRET_KEY')       
 STRIPE_PUBLISHABLE_KEY = config('STRIPE_PUBLISHABLE_KEY')  
 STRIPE_WEBHOOK_SECRET = config('STRIPE_WEBHOOK_SECRET') 
+# Los webhooks se guardan en orders.StripeEvent y los aplica `python manage.py process_stripe_events`
+STRIPE_EVENT_MAX_ATTEMPTS = config('STRIPE_EVENT_MAX_ATTEMPTS', default=5, cast=int)
+# Minutos que el checkout aparta el stock mientras el cliente paga
+STOCK_RESERVATION_MINUTES = config('STOCK_RESERVATION_MINUTES', default=15, cast=int)
+# Cancelaciones de PaymentIntent encoladas, las entrega `python manage.py process_stripe_cancellations`
+STRIPE_CANCEL_MAX_ATTEMPTS = config('STRIPE_CANCEL_MAX_ATTEMPTS', default=5, cast=int)
+# Antigüedad a partir de la cual `expire_pending_orders` da por abandonado un pedido pendiente
+PENDING_ORDER_MAX_AGE_MINUTES = config('PENDING_ORDER_MAX_AGE_MINUTES', default=60, cast=int)
 
 #================================================ GEOIP ======================================================
 
 GEOIP_DB_PATH = os.path.join(BASE_DIR, 'data', 'geoip', 'GeoLite2-Country.mmdb')
+# 'mmap' comparte el archivo entre workers vía page cache; 'memory' lo carga completo en cada proceso
+GEOIP_READER_MODE = config('GEOIP_READER_MODE', default='mmap')
+# Entradas del LRU IP→país por worker
+GEOIP_CACHE_SIZE = config('GEOIP_CACHE_SIZE', default=10000, cast=int)
+# Rutas que no cotizan nada: CountryDetectionMiddleware no hace lookup ni asigna detected_country
+GEOIP_SKIP_PATHS = (
+    '/admin/',
+    '/static/',
+    '/media/',
+    '/accounts/',
+    '/api/schema/',
+    '/api/docs/',
+    '/api/redoc/',
+    '/api/v1/auth/',
+    '/api/v1/orders/webhook/',
+    '/api/v1/metrics/',
+)
+
+#================================================ MÉTRICAS ============================================
+# RequestMetricsMiddleware + /api/v1/metrics/ (staff). Con varios workers, METRICS_DIR
+# debe ser un directorio compartido por todos (cada uno escribe metrics-<pid>.json);
+# sin él el endpoint sólo reporta el worker que atiende el scrape.
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_DIR = config('METRICS_DIR', default=None)
+METRICS_FLUSH_INTERVAL = config('METRICS_FLUSH_INTERVAL', default=10.0, cast=float)
 
 #================================================ PARLER LENGUAGE ============================================
 LANGUAGES = [
@@ -1,35 +1,189 @@
-from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
+import logging
+import secrets
+import threading
+import time
 
-class LoginThrottle(AnonRateThrottle):
+import redis
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from rest_framework.throttling import SimpleRateThrottle, UserRateThrottle, AnonRateThrottle
+
+logger = logging.getLogger(__name__)
+
+
+# Ventana deslizante en un sorted set (score = timestamp de cada petición aceptada).
+# Limpia lo que salió de la ventana, cuenta y, si hay cupo, registra la petición;
+# todo en el servidor, en un solo round trip y sin carreras entre workers.
+SLIDING_WINDOW_LUA = """
+local now = tonumber(ARGV[1])
+local duration = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - duration)
+local count = redis.call('ZCARD', KEYS[1])
+
+if count < limit then
+    redis.call('ZADD', KEYS[1], now, ARGV[4])
+    redis.call('EXPIRE', KEYS[1], math.ceil(duration))
+    return {1, count + 1, ARGV[1]}
+end
+
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return {0, count, oldest[2]}
+"""
+
+_client = None
+_script = None
+_client_lock = threading.Lock()
+
+# Historial de respaldo mientras Redis no responde. No se usa la cache por defecto
+# porque en producción suele ser el mismo Redis caído; en memoria el límite se
+# aplica por proceso (más laxo que el global, pero no desaparece)
+_fallback_cache = LocMemCache('throttle-fallback', {})
+
+# Hasta cuándo (time.monotonic) no se intenta Redis tras un error: cada intento
+# contra un Redis caído cuesta hasta THROTTLE_REDIS_TIMEOUT por petición
+_redis_down_until = 0.0
+_redis_down_lock = threading.Lock()
+
+
+def _redis_backoff_active() -> bool:
+    return time.monotonic() < _redis_down_until
+
+
+def _mark_redis_down() -> bool:
+    """Abre la ventana de backoff; True sólo para quien la abrió (el que debe loguear)."""
+    global _redis_down_until
+    with _redis_down_lock:
+        now = time.monotonic()
+        if now < _redis_down_until:
+            return False
+        _redis_down_until = now + settings.THROTTLE_REDIS_BACKOFF
+        return True
+
+
+def get_throttle_script():
+    """Script Lua registrado en el cliente Redis del proceso; None si no hay THROTTLE_REDIS_URL."""
+    global _client, _script
+    url = getattr(settings, 'THROTTLE_REDIS_URL', None)
+    if not url:
+        return None
+
+    if _script is None:
+        with _client_lock:
+            if _script is None:
+                _client = redis.Redis.from_url(
+                    url,
+                    socket_connect_timeout=settings.THROTTLE_REDIS_TIMEOUT,
+                    socket_timeout=settings.THROTTLE_REDIS_TIMEOUT,
+                )
+                # Script usa EVALSHA y sólo reenvía el cuerpo si Redis no lo tiene cacheado
+                _script = _client.register_script(SLIDING_WINDOW_LUA)
+    return _script
+
+
+class RedisRateThrottle(SimpleRateThrottle):
+    """
+    Base de los throttles del proyecto: mismo límite y misma ventana deslizante que
+    SimpleRateThrottle, pero el historial vive en un sorted set de Redis y la
+    comprobación es un script Lua atómico (un round trip, O(log n)) en lugar de
+    leer y reescribir la lista completa en la cache en cada petición.
+
+    Sin THROTTLE_REDIS_URL (tests, dev con LocMem) cae al comportamiento de DRF.
+    Si Redis no responde se usa el mismo algoritmo de DRF sobre una cache en
+    memoria del proceso: un fallo del limitador no debe tumbar la API, pero
+    tampoco dejar login/registro sin límite. Tras el error Redis no se vuelve a
+    intentar durante THROTTLE_REDIS_BACKOFF segundos.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        script = get_throttle_script()
+        if script is None:
+            return super().allow_request(request, view)
+        if _redis_backoff_active():
+            return self._allow_locally(request, view)
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        member = f'{self.now}:{secrets.token_hex(4)}'
+        try:
+            allowed, count, oldest = script(
+                keys=[self.key],
+                args=[repr(self.now), self.duration, self.num_requests, member],
+            )
+        except redis.RedisError:
+            if _mark_redis_down():
+                logger.warning(
+                    "Throttle sin Redis, se limita en memoria del proceso",
+                    extra={"scope": self.scope, "backoff": settings.THROTTLE_REDIS_BACKOFF},
+                    exc_info=True,
+                )
+            return self._allow_locally(request, view)
+
+        self.count = int(count)
+        self.oldest = float(oldest)
+        return bool(allowed)
+
+    def _allow_locally(self, request, view):
+        self.cache = _fallback_cache
+        return super().allow_request(request, view)
+
+    def wait(self):
+        if not hasattr(self, 'oldest'):
+            return super().wait()
+
+        # Mismo cálculo que SimpleRateThrottle.wait → mismo Retry-After
+        remaining_duration = self.duration - (self.now - self.oldest)
+        available_requests = self.num_requests - self.count + 1
+        if available_requests <= 0:
+            return None
+        return remaining_duration / float(available_requests)
+
+
+class AnonThrottle(RedisRateThrottle, AnonRateThrottle):
+    pass
+
+
+class UserThrottle(RedisRateThrottle, UserRateThrottle):
+    pass
+
+
+class LoginThrottle(RedisRateThrottle, AnonRateThrottle):
     scope = 'login'
 
-class RegisterThrottle(AnonRateThrottle):
+class RegisterThrottle(RedisRateThrottle, AnonRateThrottle):
     scope = 'register'
 
-class SensitiveOperationThrottle(UserRateThrottle):
+class SensitiveOperationThrottle(RedisRateThrottle, UserRateThrottle):
     scope = 'sensitive'
-    
 
-class BurstRateThrottle(UserRateThrottle):
+
+class BurstRateThrottle(RedisRateThrottle, UserRateThrottle):
     """
     Límite de ráfaga para prevenir ataques de fuerza bruta.
     Se aplica globalmente a todas las vistas.
     """
     scope = 'burst'
-    
+
     def allow_request(self, request, view):
         """
         Se aplica tanto a usuarios autenticados como anónimos
         """
         return super().allow_request(request, view)
-    
+
 class RegisterValidThrottle(AnonRateThrottle):
     scope = 'register_valid'
 
     def allow_request(self, request, view):
         self.request = request
-        return True 
+        return True
 
     def throttle_success(self):
         if getattr(self.request, "_is_valid", False):
-            return super().throttle_success()
\ No newline at end of file
+            return super().throttle_success()
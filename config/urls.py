@@ -29,6 +29,7 @@ from pieces.urls import pieces_patterns
 from orders.urls import orders_patterns
 from blog.urls import blog_patterns
 from cms.urls import cms_patterns
+from core.views import MetricsView
 
 def trigger_error(request):
     division_by_zero = 1 / 0
@@ -44,6 +45,7 @@ api_v1_patterns = [
     path('', include(orders_patterns)),
     path('', include(blog_patterns)),
     path('', include(cms_patterns)),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
 
 urlpatterns = [
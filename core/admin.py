@@ -1,8 +1,11 @@
 # admin.py
 from django.contrib import admin
+from django.utils import timezone
 from allauth.socialaccount.models import SocialAccount
 from allauth.socialaccount.admin import SocialAccountAdmin
 
+from core.models import EmailOutbox
+
 # Desregistrar
 admin.site.unregister(SocialAccount)
 
@@ -13,4 +16,20 @@ def custom_str(self):
 SocialAccount.__str__ = custom_str
 
 # Volver a registrar
-admin.site.register(SocialAccount, SocialAccountAdmin)
\ No newline at end of file
+admin.site.register(SocialAccount, SocialAccountAdmin)
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ("id", "to_email", "subject", "status", "attempts", "next_attempt_at", "sent_at", "created_at")
+    list_filter = ("status", "template_name")
+    search_fields = ("to_email", "subject", "external_id")
+    readonly_fields = ("external_id", "last_error", "sent_at", "locked_at", "created_at")
+    actions = ["action_retry"]
+
+    @admin.action(description="Reintentar correos seleccionados")
+    def action_retry(self, request, queryset):
+        updated = queryset.exclude(status='sent').update(
+            status='pending', attempts=0, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f"{updated} correo(s) encolados de nuevo.")
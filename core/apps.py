@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from core.utils.logs import install_record_factory, start_queue_logging
+        from core.utils.metrics import install_instrumentation
+
+        install_record_factory()
+        if settings.LOG_QUEUE:
+            start_queue_logging(['', *settings.LOGGING.get('loggers', {})])
+        if settings.METRICS_ENABLED:
+            install_instrumentation()
@@ -0,0 +1,15 @@
+"""
+Benchmarks de carga contra servidores falsos de Stripe, Banxico y Resend.
+
+fakes.FakeProviders levanta un servidor HTTP local que responde como las APIs
+que usa el proyecto y redirige hacia él a stripe, resend y BANXICO_API_URL;
+scenarios arma los escenarios (catálogo por región y moneda, ráfaga de
+checkouts sobre una sola pieza, tormenta de webhooks y el outbox de correos) y
+report calcula p50/p95/p99 y throughput y los compara contra un baseline.
+
+Se corre con `python manage.py run_benchmarks` sobre una BD de prueba nueva.
+
+synthetic genera volúmenes realistas de catálogo, clientes e historial de
+pedidos (`python manage.py generate_synthetic_data`) para medir consultas y
+planes de ejecución con tablas grandes.
+"""
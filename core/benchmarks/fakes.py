@@ -0,0 +1,153 @@
+"""
+Servidor HTTP local que imita las APIs externas del proyecto:
+
+- Stripe: crear/cancelar PaymentIntent y crear Refund (`/v1/...`)
+- Banxico: la serie del tipo de cambio (`/SieAPIRest/...`)
+- Resend: envío individual y por lote (`/emails`, `/emails/batch`)
+
+`latency` agrega una espera fija por respuesta para aproximar el tiempo de red
+de los proveedores reales.
+"""
+import itertools
+import json
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import resend
+import stripe
+from django.test import override_settings
+
+BANXICO_PATH = '/SieAPIRest/service/v1/series/SF43718/datos/oportuno'
+USD_TO_MXN = '17.2500'
+
+PAYMENT_INTENT_CANCEL_RE = re.compile(r'^/v1/payment_intents/(?P<id>[^/]+)/cancel$')
+
+
+class FakeProviders:
+
+    def __init__(self, latency: float = 0.0, host: str = '127.0.0.1', port: int = 0):
+        self.latency = latency
+        self.calls = Counter()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+        self._saved = None
+        self._settings = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    # ------------------------------------------------------------ ciclo de vida
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+        self._saved = (stripe.api_base, resend.api_url)
+        stripe.api_base = self.url
+        resend.api_url = self.url
+        self._settings = override_settings(BANXICO_API_URL=self.url + BANXICO_PATH)
+        self._settings.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._settings.disable()
+        stripe.api_base, resend.api_url = self._saved
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    # ------------------------------------------------------------ respuestas
+
+    def _next_id(self, prefix: str) -> str:
+        with self._lock:
+            return f'{prefix}_fake{next(self._ids):08d}'
+
+    def respond(self, method: str, path: str, form: dict, body: dict) -> tuple[int, dict]:
+        if method == 'POST' and path == '/v1/payment_intents':
+            intent_id = self._next_id('pi')
+            return 200, {
+                'id': intent_id,
+                'object': 'payment_intent',
+                'amount': int(form.get('amount', 0)),
+                'currency': form.get('currency', 'mxn'),
+                'status': 'requires_payment_method',
+                'client_secret': f'{intent_id}_secret_{uuid.uuid4().hex[:12]}',
+                'metadata': {
+                    key[len('metadata['):-1]: value for key, value in form.items() if key.startswith('metadata[')
+                },
+            }
+
+        match = PAYMENT_INTENT_CANCEL_RE.match(path)
+        if method == 'POST' and match:
+            return 200, {'id': match['id'], 'object': 'payment_intent', 'status': 'canceled'}
+
+        if method == 'POST' and path == '/v1/refunds':
+            return 200, {
+                'id': self._next_id('re'),
+                'object': 'refund',
+                'payment_intent': form.get('payment_intent'),
+                'status': 'succeeded',
+            }
+
+        if method == 'GET' and path == BANXICO_PATH:
+            return 200, {'bmx': {'series': [{'idSerie': 'SF43718', 'datos': [{'fecha': '', 'dato': USD_TO_MXN}]}]}}
+
+        if method == 'POST' and path == '/emails':
+            return 200, {'id': str(uuid.uuid4())}
+
+        if method == 'POST' and path == '/emails/batch':
+            return 200, {'data': [{'id': str(uuid.uuid4())} for _ in body or []]}
+
+        return 404, {'error': {'message': f'Ruta no simulada: {method} {path}'}}
+
+    def _handler_class(self):
+        providers = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _dispatch(self, method):
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length).decode() if length else ''
+                path = urlsplit(self.path).path
+
+                form, body = {}, None
+                if 'json' in (self.headers.get('Content-Type') or ''):
+                    body = json.loads(raw or 'null')
+                else:
+                    form = {key: values[-1] for key, values in parse_qs(raw).items()}
+
+                with providers._lock:
+                    providers.calls[f'{method} {path}'] += 1
+                if providers.latency:
+                    time.sleep(providers.latency)
+
+                status, payload = providers.respond(method, path, form, body)
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.send_header('Request-Id', f'req_{uuid.uuid4().hex[:14]}')
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._dispatch('GET')
+
+            def do_POST(self):
+                self._dispatch('POST')
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
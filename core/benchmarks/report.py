@@ -0,0 +1,81 @@
+"""Percentiles, resumen por escenario y comparación contra un baseline guardado."""
+import json
+from collections import Counter
+from dataclasses import dataclass, field
+
+
+def percentile(values, pct: float) -> float | None:
+    """Percentil por rango más cercano (el mismo criterio que OutboxStats)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    elapsed: float = 0.0
+    # Segundos por operación; vacío si el escenario sólo mide throughput
+    latencies: list[float] = field(default_factory=list)
+    operations: int = 0
+    statuses: Counter = field(default_factory=Counter)
+    errors: int = 0
+
+    def summary(self) -> dict:
+        def ms(value):
+            return None if value is None else round(value * 1000, 2)
+
+        return {
+            'operations': self.operations,
+            'errors': self.errors,
+            'elapsed_s': round(self.elapsed, 3),
+            'throughput': round(self.operations / self.elapsed, 2) if self.elapsed > 0 else 0.0,
+            'p50_ms': ms(percentile(self.latencies, 50)),
+            'p95_ms': ms(percentile(self.latencies, 95)),
+            'p99_ms': ms(percentile(self.latencies, 99)),
+            'statuses': {str(code): count for code, count in sorted(self.statuses.items(), key=lambda kv: str(kv[0]))},
+        }
+
+
+def format_table(summaries: dict) -> str:
+    header = f"{'escenario':<22}{'ops':>7}{'err':>6}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  status"
+    lines = [header, '-' * len(header)]
+    for name, data in summaries.items():
+        def cell(key):
+            value = data[key]
+            return '-' if value is None else f'{value:.2f}'
+
+        statuses = ' '.join(f'{code}:{count}' for code, count in data['statuses'].items())
+        lines.append(
+            f"{name:<22}{data['operations']:>7}{data['errors']:>6}{data['throughput']:>10.2f}"
+            f"{cell('p50_ms'):>10}{cell('p95_ms'):>10}{cell('p99_ms'):>10}  {statuses}"
+        )
+    return '\n'.join(lines)
+
+
+def load_baseline(path) -> dict:
+    with open(path) as fh:
+        return json.load(fh)['scenarios']
+
+
+def compare(summaries: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Regresiones contra el baseline: p95 o p99 más alto, o throughput más bajo,
+    por más de `tolerance` (0.2 = 20%). Escenarios nuevos o sin dato no cuentan.
+    """
+    regressions = []
+    for name, current in summaries.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+
+        for key in ('p95_ms', 'p99_ms'):
+            if current.get(key) is not None and before.get(key):
+                if current[key] > before[key] * (1 + tolerance):
+                    regressions.append(f'{name}: {key} {before[key]} → {current[key]}')
+
+        if before.get('throughput') and current['throughput'] < before['throughput'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {before['throughput']} → {current['throughput']}")
+
+    return regressions
@@ -0,0 +1,258 @@
+"""
+Datos de prueba y escenarios de carga.
+
+Cada escenario es una lista de trabajos `job(client) -> status` que run_jobs
+reparte entre `concurrency` hilos, cada uno con su django.test.Client y su
+conexión a la BD. Los trabajos se generan con un random.Random sembrado para
+que dos corridas con el mismo --seed hagan exactamente las mismas peticiones.
+"""
+import hashlib
+import hmac
+import json
+import queue
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.benchmarks.report import ScenarioResult
+from core.services.email_backends import ResendBackend
+from core.services.email_outbox import EmailOutboxService
+from orders.models import Payment
+from orders.service import StripeEventService
+from pieces.models import Piece, Section, ShippingRate, TypePiece
+from pieces.service import EXCHANGE_RATE_CACHE_KEY
+from users.models import Address
+
+User = get_user_model()
+
+# X-Force-Country sólo se respeta con DEBUG; la IP de Cloudflare cubre el resto
+REGION_HEADERS = {
+    'MX': {'HTTP_X_FORCE_COUNTRY': 'MX', 'HTTP_CF_CONNECTING_IP': '189.203.0.10'},
+    'US': {'HTTP_X_FORCE_COUNTRY': 'US', 'HTTP_CF_CONNECTING_IP': '8.8.8.8'},
+}
+
+
+@dataclass
+class BenchmarkData:
+    # (token de acceso, id de su dirección) por usuario
+    customers: list[tuple[str, int]]
+    slugs: list[str]
+    hot_piece_id: int
+    pages: int
+
+
+def seed(pieces: int, users: int, hot_stock: int) -> BenchmarkData:
+    type_piece = TypePiece.objects.create(type='Benchmark', key='benchmark')
+    section = Section.objects.create(section='Benchmark', key='benchmark')
+    ShippingRate.objects.bulk_create([
+        ShippingRate(region=region, kg=kg, cost=Decimal(150 + kg * 25))
+        for region in ('MX', 'US') for kg in range(1, 31)
+    ], ignore_conflicts=True)
+
+    created = Piece.objects.bulk_create([
+        Piece(
+            title=f'Pieza benchmark {i}', title_es=f'Pieza benchmark {i}', title_en=f'Benchmark piece {i}',
+            slug=f'pieza-benchmark-{i}', description='Pieza de benchmark', description_es='Pieza de benchmark',
+            description_en='Benchmark piece', quantity=hot_stock if i == 0 else 50,
+            price_base=Decimal(500 + i % 40 * 25), width=Decimal('20'), height=Decimal('20'),
+            length=Decimal('10'), weight=Decimal('1.5'), type=type_piece, section=section,
+            thumbnail_path=f'pieces/benchmark-{i}.jpg',
+        )
+        for i in range(pieces)
+    ], batch_size=500)
+
+    # Contraseña inutilizable: los clientes se autentican con un access token emitido aquí
+    password = make_password(None)
+    customers = User.objects.bulk_create([
+        User(username=f'bench{i}', email=f'bench{i}@example.com', password=password)
+        for i in range(users)
+    ], batch_size=500)
+    addresses = Address.objects.bulk_create([
+        Address(
+            user=user, recipient_name=user.username, country='mexico' if i % 2 == 0 else 'usa',
+            state='Jalisco', city='Guadalajara', postal_code='44100', neighborhood='Centro',
+            street='Juárez', street_number=i + 1, phone_number='+523310000000',
+            reference='Benchmark', is_default=True,
+        )
+        for i, user in enumerate(customers)
+    ], batch_size=500)
+
+    return BenchmarkData(
+        customers=[(str(AccessToken.for_user(user)), address.pk) for user, address in zip(customers, addresses)],
+        slugs=[piece.slug for piece in created],
+        hot_piece_id=created[0].pk,
+        pages=max(1, -(-pieces // int(settings.REST_FRAMEWORK['PAGE_SIZE']))),
+    )
+
+
+def _auth(token: str | None) -> dict:
+    return {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+
+
+def run_jobs(name: str, jobs: list, concurrency: int, start_together: bool = False) -> ScenarioResult:
+    """
+    Ejecuta los trabajos con `concurrency` hilos. Con start_together todos los
+    hilos esperan en una barrera y salen a la vez (ráfagas).
+    """
+    result = ScenarioResult(name)
+    pending = queue.SimpleQueue()
+    for job in jobs:
+        pending.put(job)
+
+    lock = threading.Lock()
+    workers = max(1, min(concurrency, len(jobs)))
+    barrier = threading.Barrier(workers) if start_together else None
+
+    def worker():
+        client = Client()
+        try:
+            if barrier:
+                barrier.wait()
+            while True:
+                try:
+                    job = pending.get_nowait()
+                except queue.Empty:
+                    return
+                started = time.perf_counter()
+                try:
+                    status = job(client)
+                except Exception:
+                    status = 'exception'
+                elapsed = time.perf_counter() - started
+                with lock:
+                    result.latencies.append(elapsed)
+                    result.operations += 1
+                    result.statuses[status] += 1
+                    if status == 'exception' or status >= 500:
+                        result.errors += 1
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+# ---------------------------------------------------------------- escenarios
+
+def catalog_browsing(data: BenchmarkData, requests: int, concurrency: int, rng) -> ScenarioResult:
+    """Listado y detalle de piezas desde MX y US, en MXN y USD, anónimo y con sesión."""
+    # Sin tipo de cambio en cache: la primera petición en USD va a Banxico (falso)
+    cache.delete(EXCHANGE_RATE_CACHE_KEY)
+
+    jobs = []
+    for _ in range(requests):
+        region = rng.choice(('MX', 'US'))
+        currency = rng.choice(('MXN', 'MXN', 'USD'))
+        token = rng.choice(data.customers)[0] if rng.random() < 0.3 else None
+        if rng.random() < 0.7:
+            path = f'/api/v1/pieces/?page={rng.randint(1, data.pages)}&currency={currency}'
+        else:
+            path = f'/api/v1/pieces/{rng.choice(data.slugs)}/?currency={currency}'
+        headers = {**REGION_HEADERS[region], **_auth(token)}
+        jobs.append(lambda client, path=path, headers=headers: client.get(path, **headers).status_code)
+
+    return run_jobs('catalog', jobs, concurrency)
+
+
+def checkout_burst(data: BenchmarkData, concurrency: int) -> ScenarioResult:
+    """Todos los clientes intentan comprar la misma pieza a la vez; sólo hay stock para algunos."""
+    jobs = []
+    for token, address_id in data.customers:
+        payload = json.dumps({
+            'address': address_id,
+            'payment_method': 'card',
+            'items': [{'piece': data.hot_piece_id, 'quantity': 1}],
+        })
+        jobs.append(lambda client, payload=payload, token=token: client.post(
+            '/api/v1/orders/checkout/', payload, content_type='application/json', **_auth(token)
+        ).status_code)
+
+    return run_jobs('checkout_burst', jobs, concurrency, start_together=True)
+
+
+def _stripe_signature(payload: str, secret: str) -> str:
+    timestamp = int(time.time())
+    signature = hmac.new(secret.encode(), f'{timestamp}.{payload}'.encode(), hashlib.sha256).hexdigest()
+    return f't={timestamp},v1={signature}'
+
+
+def webhook_storm(duplicates: int, concurrency: int, rng) -> ScenarioResult:
+    """
+    payment_intent.succeeded por cada PaymentIntent creado en el checkout, cada
+    uno entregado `duplicates` veces y en desorden, como hace Stripe al reintentar.
+    """
+    intents = Payment.objects.filter(external_id__startswith='pi_').values_list('external_id', 'amount')
+    jobs = []
+    for intent_id, amount in intents:
+        payload = json.dumps({
+            'id': f'evt_{uuid.uuid4().hex[:24]}',
+            'object': 'event',
+            'type': 'payment_intent.succeeded',
+            'data': {'object': {
+                'id': intent_id,
+                'object': 'payment_intent',
+                'amount': int(amount * 100),
+                'currency': 'mxn',
+                'status': 'succeeded',
+            }},
+        })
+        for _ in range(duplicates):
+            jobs.append(lambda client, payload=payload: client.post(
+                '/api/v1/orders/webhook/', payload, content_type='application/json',
+                HTTP_STRIPE_SIGNATURE=_stripe_signature(payload, settings.STRIPE_WEBHOOK_SECRET),
+            ).status_code)
+    rng.shuffle(jobs)
+
+    return run_jobs('webhook_storm', jobs, concurrency)
+
+
+def webhook_processing(concurrency: int) -> ScenarioResult:
+    """Drena los eventos guardados por webhook_storm como lo hace process_stripe_events."""
+    started = time.perf_counter()
+    stats = StripeEventService.drain(workers=concurrency)
+    return ScenarioResult(
+        'webhook_processing',
+        elapsed=time.perf_counter() - started,
+        operations=stats['processed'] + stats['failed'],
+        errors=stats['failed'],
+    )
+
+
+def email_outbox(emails: int, concurrency: int) -> ScenarioResult:
+    """
+    Encola `emails` correos (más los que hayan dejado los webhooks) y drena el
+    outbox contra Resend (falso). La latencia es encolado → entregado.
+    """
+    for i in range(emails):
+        EmailOutboxService.enqueue(
+            subject=f'Benchmark {i}',
+            to_email=f'bench{i}@example.com',
+            html='<p>Benchmark</p>',
+            text='Benchmark',
+            template_name='benchmark',
+        )
+
+    stats = EmailOutboxService.drain(workers=concurrency, backend=ResendBackend())
+    return ScenarioResult(
+        'email_outbox',
+        elapsed=stats.elapsed,
+        latencies=stats.latencies,
+        operations=stats.sent,
+        errors=stats.retried + stats.dead,
+    )
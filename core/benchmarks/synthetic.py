@@ -0,0 +1,537 @@
+"""
+Generador de datos sintéticos en volumen (catálogo, clientes, historial de
+pedidos, reseñas, blog y colecciones) para benchmarks y análisis de planes de
+consulta.
+
+El trabajo se parte en bloques de `chunk_size` filas y cada bloque usa su
+propio random.Random sembrado con (seed, fase, bloque): con la misma semilla y
+el mismo chunk_size el contenido es idéntico sin importar cuántos workers haya
+ni en qué orden terminen. Los ids sí pueden variar entre corridas con
+workers > 1; las relaciones se arman por índice (slug/username), no por id.
+
+Cada bloque es una transacción con bulk_create por modelo. Las fechas
+(created_at, date_joined, published_at, ...) se reparten en los últimos
+`days` días para que los índices por fecha tengan una distribución realista.
+"""
+import math
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image
+
+from blog.models import Blog
+from cms.models import Collection, ImageCollection
+from orders.models import Order, OrderItem, Payment, ShippingTracking
+from pieces.models import Discount, Piece, PieceDiscount, PiecePhoto, Review, Section, ShippingRate, TypePiece
+from users.models import Address
+
+User = get_user_model()
+
+PLACEHOLDERS_PER_KIND = 8
+MAX_SHIPPING_KG = 70
+
+TYPES = [
+    ('escultura', 'Escultura', 'Sculpture'),
+    ('pintura', 'Pintura', 'Painting'),
+    ('ceramica', 'Cerámica', 'Ceramics'),
+    ('textil', 'Textil', 'Textile'),
+    ('joyeria', 'Joyería', 'Jewelry'),
+    ('grabado', 'Grabado', 'Print'),
+]
+SECTIONS = [
+    ('arte', 'Arte', 'Art'),
+    ('hogar', 'Hogar', 'Home'),
+    ('accesorios', 'Accesorios', 'Accessories'),
+    ('especiales', 'Colecciones especiales', 'Special collections'),
+]
+NOUNS = [
+    ('Jarrón', 'Vase'), ('Cuenco', 'Bowl'), ('Máscara', 'Mask'), ('Tapete', 'Rug'),
+    ('Collar', 'Necklace'), ('Alebrije', 'Alebrije'), ('Lienzo', 'Canvas'), ('Figura', 'Figure'),
+    ('Plato', 'Plate'), ('Rebozo', 'Shawl'), ('Aretes', 'Earrings'), ('Lámpara', 'Lamp'),
+]
+ADJECTIVES = [
+    ('de barro negro', 'black clay'), ('de talavera', 'talavera'), ('de plata', 'silver'),
+    ('tejido a mano', 'hand-woven'), ('de cobre', 'copper'), ('de madera tallada', 'carved wood'),
+    ('de vidrio soplado', 'blown glass'), ('bordado', 'embroidered'), ('de palma', 'palm leaf'),
+]
+FIRST_NAMES = [
+    'María', 'José', 'Lucía', 'Carlos', 'Ana', 'Luis', 'Sofía', 'Diego', 'Valeria', 'Jorge',
+    'Fernanda', 'Miguel', 'Emily', 'Michael', 'Sarah', 'David', 'Jessica', 'Daniel',
+]
+LAST_NAMES = [
+    'García', 'Hernández', 'López', 'Martínez', 'González', 'Pérez', 'Rodríguez', 'Sánchez',
+    'Ramírez', 'Torres', 'Flores', 'Smith', 'Johnson', 'Brown', 'Miller', 'Wilson',
+]
+LOCATIONS = {
+    'mexico': [
+        ('Jalisco', 'Guadalajara', '44100'), ('Ciudad de México', 'Coyoacán', '04000'),
+        ('Nuevo León', 'Monterrey', '64000'), ('Oaxaca', 'Oaxaca de Juárez', '68000'),
+        ('Puebla', 'Puebla', '72000'), ('Yucatán', 'Mérida', '97000'),
+    ],
+    'usa': [
+        ('Texas', 'Houston', '77001'), ('California', 'Los Angeles', '90001'),
+        ('Illinois', 'Chicago', '60601'), ('New York', 'New York', '10001'), ('Arizona', 'Phoenix', '85001'),
+    ],
+}
+STREETS = ['Juárez', 'Hidalgo', 'Morelos', 'Reforma', 'Insurgentes', 'Main St', 'Oak Ave', 'Elm St']
+REVIEW_COMMENTS = [
+    'Muy bonita, tal como en las fotos.', 'Llegó bien empacada y a tiempo.', 'Excelente calidad.',
+    'El color es un poco distinto, pero me gustó.', 'Beautiful piece, fast shipping.', None,
+]
+# Sin 'pending': con fechas pasadas expire_pending_orders los barrería y encolaría
+# cancelaciones en Stripe de PaymentIntents (pi_...) que no existen
+ORDER_STATUSES = (['paid', 'cancelled', 'expired'], [75, 8, 17])
+PAYMENT_STATUS = {'paid': 'completed', 'cancelled': 'failed', 'expired': 'failed'}
+
+
+@dataclass
+class BaseCatalog:
+    type_ids: list[int]
+    section_ids: list[int]
+    discount_ids: list[int]
+    # {(región, kg): costo}
+    rates: dict
+
+
+@dataclass(frozen=True)
+class CatalogPiece:
+    id: int
+    price: Decimal
+    weight: Decimal
+
+
+@contextmanager
+def historical_timestamps(*models):
+    """
+    Apaga auto_now/auto_now_add en los modelos dados para que bulk_create
+    respete las fechas generadas. Afecta a todo el proceso mientras dure.
+    """
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class SyntheticDataGenerator:
+
+    def __init__(self, prefix: str = 'synthetic', seed: int = 42, chunk_size: int = 1000, workers: int = 4,
+                 days: int = 730, end=None, password: str | None = None, write_placeholders: bool = True,
+                 log=None):
+        self.prefix = prefix
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.days = days
+        self.end = end or timezone.now().replace(microsecond=0)
+        # Un solo hash para todos: hashear miles de contraseñas domina el tiempo de generación
+        self.password_hash = make_password(password)
+        self.write_placeholders = write_placeholders
+        self.log = log or (lambda message: None)
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------ utilidades
+
+    def rng(self, *parts) -> random.Random:
+        return random.Random(':'.join(str(part) for part in (self.seed, *parts)))
+
+    def _past(self, rng, after=None):
+        """Fecha al azar entre `after` (o el inicio del historial) y el final."""
+        start = after or self.end - timedelta(days=self.days)
+        return start + (self.end - start) * rng.random()
+
+    def _placeholder(self, kind: str, rng) -> str:
+        return f'{self.prefix}/placeholders/{kind}-{rng.randrange(PLACEHOLDERS_PER_KIND)}.jpg'
+
+    def _count(self, **counts):
+        with self._lock:
+            self.counts.update(counts)
+
+    def _unique_name(self, name: str) -> str:
+        """Títulos y nombres son únicos en BD: el prefijo evita chocar con otra corrida."""
+        return f'{name} [{self.prefix}]'
+
+    def existing(self) -> bool:
+        return (
+            Piece.all_objects.filter(slug__startswith=f'{self.prefix}-piece-').exists()
+            or User.objects.filter(username__startswith=f'{self.prefix}-user-').exists()
+            or Blog.all_objects.filter(slug__startswith=f'{self.prefix}-blog-').exists()
+            or Collection.all_objects.filter(name__endswith=self._unique_name('')).exists()
+        )
+
+    # ------------------------------------------------------------ ejecución
+
+    def run(self, pieces: int, users: int, orders: int, blogs: int, collections: int,
+            discounts: int = 20, review_rate: float = 0.3) -> Counter:
+        if self.write_placeholders:
+            self._placeholders()
+        base = self._base(discounts)
+
+        with historical_timestamps(
+            Piece, PiecePhoto, PieceDiscount, Review, Address, Order, OrderItem, Payment,
+            ShippingTracking, Blog, Collection, ImageCollection,
+        ):
+            self._parallel('piezas', pieces, lambda index, start, end: self._pieces(index, start, end, base))
+            catalog = self._catalog()
+            self._parallel('usuarios', users, lambda index, start, end: self._customers(
+                index, start, end, users, orders, catalog, base, review_rate
+            ))
+            self._parallel('blogs', blogs, lambda index, start, end: self._blogs(index, start, end, catalog, base))
+            self._parallel('colecciones', collections, self._collections)
+
+        return self.counts
+
+    def _parallel(self, phase: str, total: int, build):
+        """
+        Reparte [0, total) en bloques de chunk_size entre `workers` hilos, cada
+        bloque en su transacción. Con workers=1 corre en el hilo actual.
+        """
+        chunks = [(index, start, min(start + self.chunk_size, total))
+                  for index, start in enumerate(range(0, total, self.chunk_size))]
+        if not chunks:
+            return
+        pending = iter(chunks)
+        started = time.monotonic()
+        done = [0]
+
+        def worker():
+            try:
+                while True:
+                    with self._lock:
+                        chunk = next(pending, None)
+                    if chunk is None:
+                        return
+                    with transaction.atomic():
+                        build(*chunk)
+                    with self._lock:
+                        done[0] += chunk[2] - chunk[1]
+                        progress = done[0]
+                    self.log(f'{phase}: {progress}/{total}')
+            finally:
+                if self.workers > 1:
+                    connection.close()
+
+        if self.workers <= 1:
+            worker()
+        else:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for future in [executor.submit(worker) for _ in range(min(self.workers, len(chunks)))]:
+                    future.result()
+
+        self.log(f'{phase}: {total} en {time.monotonic() - started:.1f}s')
+
+    # ------------------------------------------------------------ fases
+
+    def _placeholders(self):
+        """Imágenes JPEG pequeñas a las que apuntan todas las filas generadas."""
+        rng = self.rng('placeholders')
+        for kind in ('piece', 'photo', 'review', 'blog', 'collection'):
+            for index in range(PLACEHOLDERS_PER_KIND):
+                path = f'{self.prefix}/placeholders/{kind}-{index}.jpg'
+                if default_storage.exists(path):
+                    continue
+                buffer = BytesIO()
+                color = tuple(rng.randrange(256) for _ in range(3))
+                Image.new('RGB', (64, 64), color).save(buffer, format='JPEG')
+                default_storage.save(path, ContentFile(buffer.getvalue()))
+
+    def _base(self, discounts: int) -> BaseCatalog:
+        # Reusa los tipos y secciones que ya existan con la misma llave o nombre
+        type_ids = [
+            (TypePiece.all_objects.filter(Q(key=key) | Q(type=es)).first()
+             or TypePiece.objects.create(key=key, type=es, type_es=es, type_en=en)).pk
+            for key, es, en in TYPES
+        ]
+        section_ids = [
+            (Section.all_objects.filter(Q(key=key) | Q(section=es)).first()
+             or Section.objects.create(key=key, section=es, section_es=es, section_en=en)).pk
+            for key, es, en in SECTIONS
+        ]
+
+        rng = self.rng('discounts')
+        today = self.end.date()
+        created = Discount.objects.bulk_create([
+            Discount(
+                name=f'{self.prefix} temporada {i + 1}',
+                percentage=Decimal(rng.choice([5, 10, 15, 20, 25, 30])),
+                # La mitad vigentes hoy, el resto ya vencidos
+                start_date=today - timedelta(days=rng.randint(1, 60) if i % 2 == 0 else rng.randint(90, 365)),
+                end_date=today + timedelta(days=rng.randint(1, 60)) if i % 2 == 0 else today - timedelta(days=rng.randint(1, 80)),
+            )
+            for i in range(discounts)
+        ])
+        self._count(discounts=len(created))
+
+        ShippingRate.objects.bulk_create([
+            ShippingRate(region=region, kg=kg, cost=Decimal(base + kg * step))
+            for region, base, step in (('MX', 150, 35), ('US', 450, 90))
+            for kg in range(1, MAX_SHIPPING_KG + 1)
+        ], ignore_conflicts=True)
+        rates = {(rate.region, rate.kg): rate.cost for rate in ShippingRate.objects.all()}
+
+        return BaseCatalog(type_ids, section_ids, [discount.pk for discount in created], rates)
+
+    def _pieces(self, index, start, end, base: BaseCatalog):
+        rng = self.rng('pieces', index)
+        pieces = []
+        for i in range(start, end):
+            noun_es, noun_en = rng.choice(NOUNS)
+            adjective_es, adjective_en = rng.choice(ADJECTIVES)
+            title_es = self._unique_name(f'{noun_es} {adjective_es} {i + 1}')
+            title_en = self._unique_name(f'{adjective_en.capitalize()} {noun_en.lower()} {i + 1}')
+            description_es = f'{noun_es} {adjective_es} hecho a mano por artesanos mexicanos. Pieza única.'
+            description_en = f'Handmade {adjective_en} {noun_en.lower()} by Mexican artisans. One of a kind.'
+            created = self._past(rng)
+            pieces.append(Piece(
+                title=title_es, title_es=title_es, title_en=title_en, slug=f'{self.prefix}-piece-{i}',
+                description=description_es, description_es=description_es, description_en=description_en,
+                quantity=0 if rng.random() < 0.1 else rng.randint(1, 30),
+                price_base=Decimal(max(150, round(rng.lognormvariate(7, 0.8), -1))).quantize(Decimal('0.01')),
+                width=Decimal(rng.randint(5, 120)), height=Decimal(rng.randint(5, 120)),
+                length=Decimal(rng.randint(2, 60)),
+                weight=Decimal(str(round(rng.uniform(0.2, 25), 2))),
+                customizable=rng.random() < 0.15, featured=rng.random() < 0.05,
+                type_id=rng.choice(base.type_ids), section_id=rng.choice(base.section_ids),
+                thumbnail_path=self._placeholder('piece', rng),
+                created_at=created, updated_at=created,
+            ))
+        pieces = Piece.objects.bulk_create(pieces, batch_size=self.chunk_size)
+
+        photos, piece_discounts, reviews = [], [], []
+        for piece in pieces:
+            for position in range(1, rng.choices([1, 2, 3, 4, 6, 10], [10, 20, 30, 20, 15, 5])[0] + 1):
+                photos.append(PiecePhoto(
+                    piece=piece, image_path=self._placeholder('photo', rng), position=position,
+                    created_at=piece.created_at, updated_at=piece.created_at,
+                ))
+            if base.discount_ids and rng.random() < 0.2:
+                piece_discounts.append(PieceDiscount(
+                    piece=piece, discount_id=rng.choice(base.discount_ids),
+                    created_at=piece.created_at, updated_at=piece.created_at,
+                ))
+            # Reseñas importadas de Etsy
+            if rng.random() < 0.1:
+                for _ in range(rng.randint(1, 3)):
+                    when = self._past(rng, after=piece.created_at)
+                    reviews.append(Review(
+                        review_type=Review.ReviewType.EXTERNAL, piece=piece,
+                        external_author=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)[0]}.',
+                        link_etsy=f'https://www.etsy.com/listing/{rng.randint(10 ** 8, 10 ** 9)}',
+                        comment=rng.choice(REVIEW_COMMENTS), rating=rng.choices([5, 4, 3], [70, 20, 10])[0],
+                        created_at=when, updated_at=when,
+                    ))
+
+        PiecePhoto.objects.bulk_create(photos, batch_size=self.chunk_size)
+        PieceDiscount.objects.bulk_create(piece_discounts, batch_size=self.chunk_size)
+        Review.objects.bulk_create(reviews, batch_size=self.chunk_size)
+        self._count(pieces=len(pieces), photos=len(photos), piece_discounts=len(piece_discounts), reviews=len(reviews))
+
+    def _catalog(self) -> list[CatalogPiece]:
+        """Piezas generadas ordenadas por índice, para elegirlas de forma determinista."""
+        rows = Piece.all_objects.filter(slug__startswith=f'{self.prefix}-piece-').values_list(
+            'slug', 'id', 'price_base', 'weight'
+        )
+        ordered = sorted(rows, key=lambda row: int(row[0].rsplit('-', 1)[1]))
+        return [CatalogPiece(id=pk, price=price, weight=weight) for _, pk, price, weight in ordered]
+
+    def _customers(self, index, start, end, total_users, total_orders, catalog, base: BaseCatalog, review_rate):
+        """Usuarios del bloque con sus direcciones, sus pedidos y las reseñas de lo que compraron."""
+        rng = self.rng('users', index)
+        users = User.objects.bulk_create([
+            User(
+                username=f'{self.prefix}-user-{i}', email=f'{self.prefix}-user-{i}@example.com',
+                first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES),
+                password=self.password_hash, date_joined=self._past(rng),
+            )
+            for i in range(start, end)
+        ], batch_size=self.chunk_size)
+
+        addresses = []
+        for user in users:
+            country = 'mexico' if rng.random() < 0.75 else 'usa'
+            for position in range(rng.choices([1, 2, 3], [70, 22, 8])[0]):
+                state, city, postal_code = rng.choice(LOCATIONS[country])
+                prefix = '+52' if country == 'mexico' else '+1'
+                addresses.append(Address(
+                    user=user, recipient_name=f'{user.first_name} {user.last_name}', country=country,
+                    state=state, city=city, postal_code=postal_code, neighborhood='Centro',
+                    street=rng.choice(STREETS), street_number=rng.randint(1, 3000),
+                    phone_number=f'{prefix}{rng.randint(10 ** 9, 10 ** 10 - 1)}', reference='Sin referencias',
+                    is_default=position == 0, created_at=user.date_joined, updated_at=user.date_joined,
+                ))
+        addresses = Address.objects.bulk_create(addresses, batch_size=self.chunk_size)
+        self._count(users=len(users), addresses=len(addresses))
+
+        # Pedidos proporcionales al tamaño del bloque; la suma de todos los bloques es exacta
+        count = total_orders * end // total_users - total_orders * start // total_users
+        if not catalog or not count:
+            return
+
+        by_user = {}
+        for address in addresses:
+            by_user.setdefault(address.user_id, []).append(address)
+
+        orders, lines = [], []
+        for _ in range(count):
+            user = rng.choice(users)
+            address = rng.choice(by_user[user.pk])
+            when = self._past(rng, after=user.date_joined)
+            status = rng.choices(*ORDER_STATUSES)[0]
+
+            items = [(piece, 1 if rng.random() < 0.9 else rng.randint(2, 3))
+                     for piece in rng.sample(catalog, min(len(catalog), rng.choices([1, 2, 3, 4], [60, 25, 10, 5])[0]))]
+            subtotal = sum(piece.price * quantity for piece, quantity in items)
+            kg = min(MAX_SHIPPING_KG, max(1, math.ceil(sum(piece.weight * quantity for piece, quantity in items))))
+            region = 'MX' if address.country == 'mexico' else 'US'
+
+            orders.append(Order(
+                user=user, address=address, status=status,
+                total=subtotal + base.rates.get((region, kg), Decimal('0')),
+                created_at=when, updated_at=when,
+            ))
+            lines.append(items)
+        orders = Order.objects.bulk_create(orders, batch_size=self.chunk_size)
+
+        items, payments, trackings, reviews = [], [], [], []
+        reviewed = set()
+        for order, order_lines in zip(orders, lines):
+            when = order.created_at
+            for piece, quantity in order_lines:
+                items.append(OrderItem(
+                    order=order, piece_id=piece.id, quantity=quantity, price_snapshot=piece.price,
+                    created_at=when, updated_at=when,
+                ))
+
+            payments.append(Payment(
+                order=order, amount=order.total, payment_method=rng.choices(['card', 'paypal'], [85, 15])[0],
+                external_id=f'pi_{uuid.UUID(int=rng.getrandbits(128)).hex[:24]}',
+                status=PAYMENT_STATUS[order.status], created_at=when, updated_at=when,
+            ))
+
+            if order.status != 'paid':
+                continue
+
+            shipped_at = when + timedelta(hours=rng.randint(12, 96))
+            delivered_at = shipped_at + timedelta(days=rng.randint(2, 10))
+            if delivered_at <= self.end:
+                status = 'delivered'
+            elif shipped_at <= self.end:
+                status, delivered_at = 'shipped', None
+            else:
+                status, shipped_at, delivered_at = 'pending', None, None
+            trackings.append(ShippingTracking(
+                order=order, carrier=rng.choice(['dhl', 'ups', 'fedex']),
+                tracking_number=None if status == 'pending' else str(rng.randint(10 ** 11, 10 ** 12 - 1)),
+                status=status, shipped_at=shipped_at, delivered_at=delivered_at,
+                created_at=when, updated_at=delivered_at or shipped_at or when,
+            ))
+
+            for piece, _ in order_lines:
+                # Una reseña interna por usuario y pieza (unique_internal_review_per_user_piece)
+                if delivered_at and (order.user_id, piece.id) not in reviewed and rng.random() < review_rate:
+                    reviewed.add((order.user_id, piece.id))
+                    review_at = self._past(rng, after=delivered_at)
+                    reviews.append(Review(
+                        review_type=Review.ReviewType.INTERNAL, user_id=order.user_id, piece_id=piece.id,
+                        rating=rng.choices([5, 4, 3, 2, 1], [55, 25, 10, 5, 5])[0],
+                        comment=rng.choice(REVIEW_COMMENTS),
+                        photo=self._placeholder('review', rng) if rng.random() < 0.1 else None,
+                        created_at=review_at, updated_at=review_at,
+                    ))
+
+        OrderItem.objects.bulk_create(items, batch_size=self.chunk_size)
+        Payment.objects.bulk_create(payments, batch_size=self.chunk_size)
+        ShippingTracking.objects.bulk_create(trackings, batch_size=self.chunk_size)
+        Review.objects.bulk_create(reviews, batch_size=self.chunk_size)
+        self._count(
+            orders=len(orders), order_items=len(items), payments=len(payments),
+            trackings=len(trackings), reviews=len(reviews),
+        )
+
+    def _blogs(self, index, start, end, catalog, base: BaseCatalog):
+        rng = self.rng('blogs', index)
+        blogs = []
+        for i in range(start, end):
+            noun_es, noun_en = rng.choice(NOUNS)
+            adjective_es, adjective_en = rng.choice(ADJECTIVES)
+            title_es = self._unique_name(f'La historia del {noun_es.lower()} {adjective_es} ({i + 1})')
+            title_en = self._unique_name(f'The story of the {adjective_en} {noun_en.lower()} ({i + 1})')
+            content_es = '\n\n'.join(
+                f'Párrafo {n + 1} sobre el {noun_es.lower()} {adjective_es} y sus artesanos.'
+                for n in range(rng.randint(3, 12))
+            )
+            content_en = '\n\n'.join(
+                f'Paragraph {n + 1} about the {adjective_en} {noun_en.lower()} and its artisans.'
+                for n in range(rng.randint(3, 12))
+            )
+            created = self._past(rng)
+            published = rng.random() < 0.85
+            blogs.append(Blog(
+                title=title_es, title_es=title_es, title_en=title_en, slug=f'{self.prefix}-blog-{i}',
+                content=content_es, content_es=content_es, content_en=content_en,
+                storage_id=uuid.UUID(int=rng.getrandbits(128)), cover_image=self._placeholder('blog', rng),
+                status='published' if published else 'draft',
+                published_at=created + timedelta(days=rng.randint(0, 7)) if published else None,
+                section_id=rng.choice(base.section_ids), created_at=created, updated_at=created,
+            ))
+        blogs = Blog.objects.bulk_create(blogs, batch_size=self.chunk_size)
+
+        links = [
+            Blog.pieces.through(blog_id=blog.pk, piece_id=piece.id)
+            for blog in blogs
+            for piece in rng.sample(catalog, min(len(catalog), rng.randint(0, 5)))
+        ]
+        Blog.pieces.through.objects.bulk_create(links, batch_size=self.chunk_size)
+        self._count(blogs=len(blogs), blog_pieces=len(links))
+
+    def _collections(self, index, start, end):
+        rng = self.rng('collections', index)
+        collections = []
+        for i in range(start, end):
+            adjective_es, adjective_en = rng.choice(ADJECTIVES)
+            name_es = self._unique_name(f'Colección {adjective_es} {i + 1}')
+            name_en = self._unique_name(f'{adjective_en.capitalize()} collection {i + 1}')
+            created = self._past(rng)
+            collections.append(Collection(
+                name=name_es, name_es=name_es, name_en=name_en,
+                description=f'Piezas {adjective_es} de distintos años.', description_es=f'Piezas {adjective_es} de distintos años.',
+                description_en=f'{adjective_en.capitalize()} pieces from different years.',
+                featured=rng.random() < 0.1, thumbnail_path=self._placeholder('collection', rng),
+                created_at=created, updated_at=created,
+            ))
+        collections = Collection.objects.bulk_create(collections, batch_size=self.chunk_size)
+
+        images = [
+            ImageCollection(
+                collection=collection, image_path=self._placeholder('collection', rng),
+                year=rng.randint(1990, self.end.year), name=f'Imagen {n + 1}',
+                created_at=collection.created_at, updated_at=collection.created_at,
+            )
+            for collection in collections
+            for n in range(rng.randint(3, 20))
+        ]
+        ImageCollection.objects.bulk_create(images, batch_size=self.chunk_size)
+        self._count(collections=len(collections), collection_images=len(images))
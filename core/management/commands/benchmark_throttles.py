@@ -0,0 +1,105 @@
+import statistics
+import time
+from types import SimpleNamespace
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory, override_settings
+from rest_framework.throttling import UserRateThrottle
+
+from config import throttling
+from config.throttling import RedisRateThrottle
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara el UserRateThrottle de DRF (historial en la cache de Django) contra '
+        'RedisRateThrottle (script Lua) con el mismo número de peticiones por clave'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=2000,
+            help='Peticiones simuladas por clave'
+        )
+        parser.add_argument(
+            '--keys',
+            type=int,
+            default=5,
+            help='Usuarios distintos (una clave de throttle por usuario)'
+        )
+        parser.add_argument(
+            '--redis-url',
+            default=None,
+            help='Redis a usar para RedisRateThrottle (por defecto THROTTLE_REDIS_URL)'
+        )
+
+    def handle(self, *args, **options):
+        per_key = options['requests']
+        users = [SimpleNamespace(is_authenticated=True, pk=f'bench-{i}') for i in range(options['keys'])]
+        request = RequestFactory().get('/api/v1/pieces/')
+
+        # El límite es justo el total por clave: ninguna petición se rechaza y el
+        # historial crece hasta `per_key` entradas, que es donde DRF paga O(n)
+        rate = f'{per_key}/hour'
+        stock = type('StockThrottle', (UserRateThrottle,), {'rate': rate, 'scope': 'bench'})
+        lua = type('LuaThrottle', (RedisRateThrottle, UserRateThrottle), {'rate': rate, 'scope': 'bench'})
+
+        self.stdout.write(f'Cache de Django: {settings.CACHES["default"]["BACKEND"]}')
+        self._report('DRF UserRateThrottle', self._run(stock, users, request, per_key))
+
+        url = options['redis_url'] or settings.THROTTLE_REDIS_URL
+        if not url:
+            raise CommandError('Sin THROTTLE_REDIS_URL ni --redis-url: no hay Redis contra el cual comparar')
+
+        with override_settings(THROTTLE_REDIS_URL=url):
+            throttling._script = None
+            try:
+                self._report('RedisRateThrottle (Lua)', self._run(lua, users, request, per_key))
+            except redis.RedisError as exc:
+                raise CommandError(f'No se pudo usar Redis en {url}: {exc}')
+            finally:
+                throttling._script = None
+
+    def _run(self, throttle_class, users, request, per_key):
+        self._reset(throttle_class, users, request)
+        latencies = []
+        denied = 0
+        started = time.perf_counter()
+
+        for _ in range(per_key):
+            for user in users:
+                request.user = user
+                t0 = time.perf_counter()
+                if not throttle_class().allow_request(request, None):
+                    denied += 1
+                latencies.append(time.perf_counter() - t0)
+
+        elapsed = time.perf_counter() - started
+        self._reset(throttle_class, users, request)
+        return latencies, elapsed, denied
+
+    def _reset(self, throttle_class, users, request):
+        throttle = throttle_class()
+        script = throttling.get_throttle_script()
+        for user in users:
+            request.user = user
+            key = throttle.get_cache_key(request, None)
+            cache.delete(key)
+            if script is not None and issubclass(throttle_class, RedisRateThrottle):
+                script.registered_client.delete(key)
+
+    def _report(self, label, result):
+        latencies, elapsed, denied = result
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        self.stdout.write(self.style.SUCCESS(
+            f'{label}: {len(latencies)} checks en {elapsed:.2f}s '
+            f'({len(latencies) / elapsed:.0f} checks/s), '
+            f'p50={statistics.median(latencies) * 1000:.3f}ms p99={p99 * 1000:.3f}ms, '
+            f'{denied} rechazadas'
+        ))
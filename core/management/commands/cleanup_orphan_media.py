@@ -0,0 +1,121 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import models
+from django.utils import timezone
+
+from core.utils.storages import delete_storage_names, iter_storage_pages
+
+# Carpetas donde los upload_to del proyecto guardan archivos
+DEFAULT_PREFIXES = ['pieces', 'collection', 'carrusel', 'blog']
+
+
+class Command(BaseCommand):
+    help = 'Detecta y borra archivos del storage que ya no están referenciados en la BD'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo reporta los huérfanos, no borra nada'
+        )
+        parser.add_argument(
+            '--prefix',
+            nargs='+',
+            default=DEFAULT_PREFIXES,
+            help='Carpetas del storage a revisar'
+        )
+        parser.add_argument(
+            '--min-age-hours',
+            type=int,
+            default=24,
+            help='Ignora archivos más recientes (pueden pertenecer a una transacción en curso)'
+        )
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=1000,
+            help='Tamaño de página al listar el storage y de cada lote de borrado'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Lotes de borrado ejecutados en paralelo'
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        page_size = min(options['page_size'], 1000)  # límite de delete_objects en S3
+        cutoff = timezone.now() - timedelta(hours=options['min_age_hours'])
+
+        referenced = self._collect_referenced_names(chunk_size=page_size)
+        self.stdout.write(f'{len(referenced)} archivos referenciados en la BD')
+
+        scanned = orphans = deleted = 0
+        failed = []
+
+        def collect(future):
+            count, errors = future.result()
+            failed.extend(errors)
+            return count
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            in_flight = []
+            for prefix in options['prefix']:
+                for page in iter_storage_pages(default_storage, prefix, page_size):
+                    scanned += len(page)
+                    batch = [
+                        name for name, modified_at in page
+                        if name not in referenced and modified_at < cutoff
+                    ]
+                    if not batch:
+                        continue
+
+                    orphans += len(batch)
+                    if dry_run:
+                        for name in batch:
+                            self.stdout.write(f'  huérfano: {name}')
+                        continue
+
+                    in_flight.append(executor.submit(delete_storage_names, default_storage, batch))
+                    # Limitar los lotes pendientes para no acumular páginas en memoria
+                    if len(in_flight) >= options['workers'] * 2:
+                        deleted += collect(in_flight.pop(0))
+
+            deleted += sum(collect(future) for future in in_flight)
+
+        for name, error in failed:
+            self.stderr.write(self.style.ERROR(f'  no se pudo borrar {name}: {error}'))
+
+        summary = f'{scanned} archivos revisados, {orphans} huérfanos'
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f'{summary} (dry-run, no se borró nada)'))
+        else:
+            summary = f'{summary}, {deleted} eliminados'
+            if failed:
+                self.stdout.write(self.style.WARNING(f'{summary}, {len(failed)} con error'))
+            else:
+                self.stdout.write(self.style.SUCCESS(summary))
+
+    def _collect_referenced_names(self, chunk_size):
+        """Lee en streaming todas las columnas FileField/ImageField de todos los modelos."""
+        referenced = set()
+        for model in apps.get_models():
+            file_fields = [
+                field.attname for field in model._meta.concrete_fields
+                if isinstance(field, models.FileField)
+            ]
+            for field_name in file_fields:
+                names = (
+                    model._base_manager
+                    .exclude(**{field_name: ''})
+                    .exclude(**{f'{field_name}__isnull': True})
+                    .values_list(field_name, flat=True)
+                    .iterator(chunk_size=chunk_size)
+                )
+                referenced.update(names)
+        return referenced
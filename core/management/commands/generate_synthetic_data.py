@@ -0,0 +1,113 @@
+import time
+from datetime import datetime, time as dt_time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from core.benchmarks.synthetic import SyntheticDataGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera catálogo, clientes, historial de pedidos, reseñas, blog y colecciones sintéticos '
+        'en volumen (bulk_create por bloques, semilla determinista, en paralelo)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pieces', type=int, default=2000, help='Piezas (con traducciones, fotos y descuentos)')
+        parser.add_argument('--users', type=int, default=5000, help='Clientes (con 1 a 3 direcciones)')
+        parser.add_argument(
+            '--orders',
+            type=int,
+            default=20000,
+            help='Pedidos en total (con items, pago y guía de envío), repartidos entre los clientes'
+        )
+        parser.add_argument('--blogs', type=int, default=200, help='Entradas de blog')
+        parser.add_argument('--collections', type=int, default=50, help='Colecciones (con sus imágenes)')
+        parser.add_argument('--discounts', type=int, default=20, help='Descuentos de temporada a repartir')
+        parser.add_argument(
+            '--review-rate',
+            type=float,
+            default=0.3,
+            help='Probabilidad de que un cliente reseñe cada pieza entregada'
+        )
+        parser.add_argument('--days', type=int, default=730, help='Días de historial hacia atrás')
+        parser.add_argument(
+            '--end-date',
+            type=lambda value: datetime.fromisoformat(value).date(),
+            help='Último día del historial, AAAA-MM-DD (por defecto hoy; fíjalo para corridas idénticas)'
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Semilla; misma semilla y --chunk-size = mismos datos')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Filas por bloque y por bulk_create')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Bloques generados en paralelo, cada uno con su conexión (1 = sin hilos)'
+        )
+        parser.add_argument(
+            '--prefix',
+            default='synthetic',
+            help='Prefijo de slugs, usuarios y rutas de placeholders'
+        )
+        parser.add_argument(
+            '--password',
+            help='Contraseña de todos los clientes generados (por defecto inutilizable)'
+        )
+        parser.add_argument(
+            '--skip-placeholders',
+            action='store_true',
+            help='No escribir las imágenes placeholder en el storage (las filas apuntan a ellas igual)'
+        )
+
+    def handle(self, *args, **options):
+        for name in ('pieces', 'users', 'orders', 'blogs', 'collections', 'discounts', 'days'):
+            if options[name] < 0:
+                raise CommandError(f'--{name} no puede ser negativo')
+        if options['chunk_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--chunk-size y --workers deben ser mayores a 0')
+        if not 0 <= options['review_rate'] <= 1:
+            raise CommandError('--review-rate debe estar entre 0 y 1')
+
+        if connection.vendor == 'sqlite' and options['workers'] > 1:
+            # SQLite bloquea la BD completa en cada escritura: los hilos sólo chocarían
+            self.stdout.write(self.style.WARNING('SQLite no admite escrituras en paralelo; se usa --workers 1'))
+            options['workers'] = 1
+
+        end = None
+        if options['end_date']:
+            end = timezone.make_aware(datetime.combine(options['end_date'], dt_time(23, 59, 59)))
+
+        generator = SyntheticDataGenerator(
+            prefix=options['prefix'],
+            seed=options['seed'],
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            days=options['days'],
+            end=end,
+            password=options['password'],
+            write_placeholders=not options['skip_placeholders'],
+            log=self.stdout.write if options['verbosity'] > 1 else None,
+        )
+        if generator.existing():
+            raise CommandError(
+                f'Ya hay datos sintéticos con el prefijo "{options["prefix"]}"; genera sobre una BD limpia'
+            )
+
+        started = time.monotonic()
+        counts = generator.run(
+            pieces=options['pieces'],
+            users=options['users'],
+            orders=options['orders'],
+            blogs=options['blogs'],
+            collections=options['collections'],
+            discounts=options['discounts'],
+            review_rate=options['review_rate'],
+        )
+
+        for name, count in sorted(counts.items()):
+            self.stdout.write(f'{name:<20}{count:>10}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{sum(counts.values())} filas generadas en {time.monotonic() - started:.1f}s'
+        ))
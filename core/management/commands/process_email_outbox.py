@@ -0,0 +1,92 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.services.email_outbox import EmailOutboxService
+
+logger = logging.getLogger(__name__)
+
+# En modo --loop los cuerpos de correos viejos se vacían como mucho una vez por hora
+PURGE_INTERVAL_SECONDS = 60 * 60
+
+
+class Command(BaseCommand):
+    help = 'Entrega los correos pendientes del outbox con un pool fijo de workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Hilos que drenan la cola en paralelo'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Correos reservados por cada worker en cada vuelta'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='No terminar al vaciar la cola; volver a revisar cada --interval segundos'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Segundos entre revisiones en modo --loop'
+        )
+
+    def handle(self, *args, **options):
+        last_purge = None
+        while True:
+            if last_purge is None or time.monotonic() - last_purge >= PURGE_INTERVAL_SECONDS:
+                purged = EmailOutboxService.purge_sent_bodies()
+                if purged:
+                    self.stdout.write(f'{purged} correos enviados sin html tras la retención')
+                last_purge = time.monotonic()
+
+            stats = EmailOutboxService.drain(
+                workers=options['workers'],
+                batch_size=options['batch_size'],
+            )
+            if stats.sent or stats.retried or stats.dead:
+                self._report(stats)
+
+            if not options['loop']:
+                if not (stats.sent or stats.retried or stats.dead):
+                    self.stdout.write('Outbox vacío')
+                return
+            time.sleep(options['interval'])
+
+    def _report(self, stats):
+        p50 = stats.latency_percentile(50)
+        p95 = stats.latency_percentile(95)
+        latency = f', latencia p50={p50:.1f}s p95={p95:.1f}s' if p50 is not None else ''
+        backlog = EmailOutboxService.backlog()
+
+        # stdout sólo lo ve quien corre el comando; en --loop el resumen va al log
+        logger.info(
+            "Outbox drenado",
+            extra={
+                "sent": stats.sent,
+                "retried": stats.retried,
+                "dead": stats.dead,
+                "elapsed_s": round(stats.elapsed, 2),
+                "throughput": round(stats.throughput, 1),
+                "latency_p50_s": p50,
+                "latency_p95_s": p95,
+                "backlog": backlog["by_status"],
+                "oldest_pending_s": round(backlog["oldest_pending_seconds"]),
+            },
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{stats.sent} enviados, {stats.retried} reintentos, {stats.dead} descartados '
+            f'en {stats.elapsed:.2f}s ({stats.throughput:.1f} correos/s{latency})'
+        ))
+        self.stdout.write(
+            f'Cola: {backlog["by_status"]}, pendiente más antiguo: '
+            f'{backlog["oldest_pending_seconds"]:.0f}s'
+        )
@@ -0,0 +1,208 @@
+import json
+import platform
+import random
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from rest_framework.views import APIView
+
+from core.benchmarks import scenarios
+from core.benchmarks.fakes import FakeProviders
+from core.benchmarks.report import compare, format_table, load_baseline
+
+SCENARIOS = ('catalog', 'checkout_burst', 'webhook_storm', 'webhook_processing', 'email_outbox')
+
+# Cache propia de la corrida: las llaves de la BD de prueba (auth:user:<id>, tipo de
+# cambio, cupones, throttles) no deben pisar ni borrar las del Redis configurado
+BENCHMARK_SETTINGS = {
+    'CACHES': {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'run-benchmarks',
+        }
+    },
+    'THROTTLE_REDIS_URL': '',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Corre escenarios de carga (catálogo, ráfaga de checkouts, tormenta de webhooks, outbox) '
+        'sobre una BD de prueba nueva, con Stripe, Banxico y Resend simulados en un servidor local'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenarios',
+            default=','.join(SCENARIOS),
+            help=f'Escenarios separados por coma ({", ".join(SCENARIOS)})'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=8,
+            help='Hilos que hacen peticiones en paralelo'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=500,
+            help='Peticiones del escenario de catálogo'
+        )
+        parser.add_argument(
+            '--pieces',
+            type=int,
+            default=200,
+            help='Piezas sembradas en el catálogo'
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=100,
+            help='Clientes sembrados; cada uno hace un checkout en la ráfaga'
+        )
+        parser.add_argument(
+            '--hot-stock',
+            type=int,
+            default=10,
+            help='Existencias de la pieza que todos intentan comprar'
+        )
+        parser.add_argument(
+            '--webhook-duplicates',
+            type=int,
+            default=3,
+            help='Veces que se entrega cada evento de webhook'
+        )
+        parser.add_argument(
+            '--emails',
+            type=int,
+            default=200,
+            help='Correos extra encolados para el escenario del outbox'
+        )
+        parser.add_argument(
+            '--provider-latency',
+            type=float,
+            default=50,
+            help='Milisegundos que tarda cada respuesta de los proveedores falsos'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Semilla de las peticiones generadas'
+        )
+        parser.add_argument(
+            '--with-throttles',
+            action='store_true',
+            help='Deja activos los throttles, sobre la cache local de la corrida (por defecto se desactivan)'
+        )
+        parser.add_argument(
+            '--keepdb',
+            action='store_true',
+            help='Reutiliza la BD de prueba si ya existe (se vacía antes de sembrar)'
+        )
+        parser.add_argument(
+            '--output',
+            help='Guarda los resultados en este JSON (sirve como baseline de la siguiente corrida)'
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON de una corrida anterior contra el cual comparar'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.2,
+            help='Variación permitida contra el baseline (0.2 = 20%%)'
+        )
+        parser.add_argument(
+            '--fail-on-regression',
+            action='store_true',
+            help='Termina con error si alguna métrica empeora más que la tolerancia'
+        )
+
+    def handle(self, *args, **options):
+        selected = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(selected) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f'Escenarios desconocidos: {", ".join(sorted(unknown))}')
+
+        baseline = load_baseline(options['baseline']) if options['baseline'] else None
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=options['keepdb'])
+        try:
+            with override_settings(**BENCHMARK_SETTINGS):
+                # Con --keepdb la BD trae lo sembrado en la corrida anterior
+                call_command('flush', interactive=False, verbosity=0)
+                summaries, calls = self._run(selected, options)
+        finally:
+            connection.close()
+            teardown_databases(old_config, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        self.stdout.write(format_table(summaries))
+        self.stdout.write(f'\nLlamadas a proveedores falsos: {dict(sorted(calls.items()))}')
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump({'meta': self._meta(options), 'scenarios': summaries}, fh, indent=2)
+            self.stdout.write(f'Resultados guardados en {options["output"]}')
+
+        if baseline is None:
+            return
+
+        regressions = compare(summaries, baseline, options['tolerance'])
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS('Sin regresiones contra el baseline'))
+            return
+
+        for regression in regressions:
+            self.stdout.write(self.style.WARNING(f'Regresión: {regression}'))
+        if options['fail_on_regression']:
+            raise CommandError(f'{len(regressions)} regresiones contra {options["baseline"]}')
+
+    def _run(self, selected, options):
+        rng = random.Random(options['seed'])
+        concurrency = options['concurrency']
+
+        data = scenarios.seed(options['pieces'], options['users'], options['hot_stock'])
+        summaries = {}
+
+        with ExitStack() as stack:
+            providers = stack.enter_context(FakeProviders(latency=options['provider_latency'] / 1000))
+            if not options['with_throttles']:
+                stack.enter_context(patch.object(APIView, 'check_throttles', lambda self, request: None))
+
+            runs = {
+                'catalog': lambda: scenarios.catalog_browsing(data, options['requests'], concurrency, rng),
+                'checkout_burst': lambda: scenarios.checkout_burst(data, concurrency),
+                'webhook_storm': lambda: scenarios.webhook_storm(options['webhook_duplicates'], concurrency, rng),
+                'webhook_processing': lambda: scenarios.webhook_processing(concurrency),
+                'email_outbox': lambda: scenarios.email_outbox(options['emails'], concurrency),
+            }
+            # Siempre en el orden de SCENARIOS: los webhooks usan los pagos del checkout
+            for name in SCENARIOS:
+                if name in selected:
+                    self.stdout.write(f'→ {name}')
+                    summaries[name] = runs[name]().summary()
+
+        return summaries, providers.calls
+
+    @staticmethod
+    def _meta(options):
+        keys = (
+            'concurrency', 'requests', 'pieces', 'users', 'hot_stock', 'webhook_duplicates',
+            'emails', 'provider_latency', 'seed', 'with_throttles',
+        )
+        return {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'options': {key: options[key] for key in keys},
+        }
@@ -1,16 +1,104 @@
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from functools import lru_cache
+
 import geoip2.database
 import geoip2.errors
+import maxminddb
 from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from core.utils import metrics
+from core.utils.logs import bind_request, unbind_request
+
+logger = logging.getLogger(__name__)
 
 REGION_NORMALIZE = {'MX': 'MX', 'US': 'US', 'CA': 'US'}
 
+# Ids aceptados desde el proxy/cliente; cualquier otra cosa se reemplaza por uno nuevo
+REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+
+class RequestIdMiddleware:
+    """
+    Asigna un id a cada request (respeta X-Request-ID si viene bien formado),
+    lo deja en request.request_id y en el header de respuesta, y lo liga al
+    contexto para que cada LogRecord del request lo lleve.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        incoming = request.META.get('HTTP_X_REQUEST_ID', '')
+        request.request_id = incoming if REQUEST_ID_RE.match(incoming) else uuid.uuid4().hex
+
+        tokens = bind_request(request.request_id)
+        try:
+            response = self.get_response(request)
+        finally:
+            unbind_request(tokens)
+
+        response['X-Request-ID'] = request.request_id
+        return response
+
+READER_MODES = {
+    'mmap': maxminddb.MODE_MMAP,
+    'memory': maxminddb.MODE_MEMORY,
+}
+
+
 class CountryDetectionMiddleware:
-    
+    """
+    Resuelve request.detected_country a partir de la IP del cliente.
+
+    El lookup IP→país pasa por un LRU en proceso (GEOIP_CACHE_SIZE) y el .mmdb se
+    abre una vez por worker en el modo de GEOIP_READER_MODE: 'mmap' comparte las
+    páginas entre procesos vía el page cache, 'memory' carga el archivo completo
+    en cada worker. Las rutas de GEOIP_SKIP_PATHS (admin, estáticos, webhooks,
+    auth) no consultan nada y no reciben detected_country.
+    """
+
     def __init__(self, get_response):
         self.get_response = get_response
-        self.reader = geoip2.database.Reader(settings.GEOIP_DB_PATH)
+        self.skip_paths = tuple(getattr(settings, 'GEOIP_SKIP_PATHS', ()))
+        self.reader = self._open_reader()
+        self._lookup = lru_cache(maxsize=settings.GEOIP_CACHE_SIZE)(self._lookup_uncached)
+        self._skipped = 0
+        self._lock = threading.Lock()
+
+        global _active
+        _active = self
+
+    def _open_reader(self):
+        path = settings.GEOIP_DB_PATH
+        mode = getattr(settings, 'GEOIP_READER_MODE', 'mmap')
+        if mode not in READER_MODES:
+            raise ValueError(f"GEOIP_READER_MODE inválido: {mode!r} (usa 'mmap' o 'memory')")
+
+        # Sin base no se tumba el arranque del worker: todo el tráfico cae al fallback
+        if not os.path.exists(path):
+            logger.warning("Base GeoIP no encontrada, se usará el país por defecto", extra={"path": path})
+            return None
+
+        try:
+            return geoip2.database.Reader(path, mode=READER_MODES[mode])
+        except (OSError, maxminddb.InvalidDatabaseError):
+            logger.exception("No se pudo abrir la base GeoIP", extra={"path": path})
+            return None
 
     def __call__(self, request):
+        if self.skip_paths and request.path.startswith(self.skip_paths):
+            with self._lock:
+                self._skipped += 1
+            return self.get_response(request)
+
         if settings.DEBUG:
             forced = request.META.get('HTTP_X_FORCE_COUNTRY')
             if forced and forced in REGION_NORMALIZE:
@@ -35,13 +123,100 @@ class CountryDetectionMiddleware:
         return request.META.get('REMOTE_ADDR')
 
     def get_country(self, ip) -> str:
+        if not ip:
+            return 'US'
+
         private_prefixes = ('127.', '192.168.', '10.', '::1')
         if any(ip.startswith(p) for p in private_prefixes):
             return 'MX'
 
+        return self._lookup(ip)
+
+    def _lookup_uncached(self, ip) -> str:
+        if self.reader is None:
+            return 'US'
+
         try:
             result = self.reader.country(ip)
             country = result.country.iso_code
             return country if country in ['MX', 'US'] else 'US'
         except (geoip2.errors.AddressNotFoundError, Exception):
-            return 'US'
\ No newline at end of file
+            return 'US'
+
+    def stats(self) -> dict:
+        info = self._lookup.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            'hits': info.hits,
+            'misses': info.misses,
+            'hit_rate': round(info.hits / lookups, 4) if lookups else None,
+            'size': info.currsize,
+            'max_size': info.maxsize,
+            'skipped': self._skipped,
+            'reader': None if self.reader is None else getattr(settings, 'GEOIP_READER_MODE', 'mmap'),
+        }
+
+
+# Última instancia cargada en este proceso (una por handler WSGI/ASGI)
+_active: CountryDetectionMiddleware | None = None
+
+
+def geoip_cache_stats() -> dict | None:
+    """Contadores del LRU de GeoIP del proceso actual; None si el middleware no está cargado."""
+    return _active.stats() if _active is not None else None
+
+
+def _geoip_metrics() -> dict:
+    stats = geoip_cache_stats()
+    if stats is None:
+        return {}
+    return {
+        'geoip_cache_hits_total': stats['hits'],
+        'geoip_cache_misses_total': stats['misses'],
+        'geoip_cache_size': stats['size'],
+        'geoip_lookups_skipped_total': stats['skipped'],
+    }
+
+
+class RequestMetricsMiddleware:
+    """
+    Mide cada request por vista y acción: latencia, consultas SQL y su tiempo,
+    hits/misses de cache y tiempo en llamadas HTTP salientes. Lo acumula en el
+    registro de core.utils.metrics, que expone MetricsView. Con
+    METRICS_ENABLED=False Django lo saca de la cadena.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        metrics.get_registry().add_collector('geoip', _geoip_metrics)
+
+    def __call__(self, request):
+        stats = metrics.RequestStats()
+        token = metrics.bind_stats(stats)
+        started = time.perf_counter()
+        status = 500
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(metrics.record_query))
+                response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.unbind_stats(token)
+            view, action = getattr(request, '_metrics_view', ('unresolved', ''))
+            metrics.record_request(view, action, request.method, status, elapsed, stats)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+        if view_class is None:
+            request._metrics_view = (f'{view_func.__module__}.{view_func.__name__}', '')
+            return None
+
+        # Los ViewSets traen el mapeo método → acción en view_func.actions
+        actions = getattr(view_func, 'actions', None) or {}
+        request._metrics_view = (view_class.__name__, actions.get(request.method.lower(), ''))
+        return None
@@ -355,6 +355,11 @@ class SentryErrorHandlerMixin:
     
     def _capture_to_sentry(self, exception, level, tags, extra, request=None):
         """Capturar excepción en Sentry con contexto"""
+        # Sin cliente activo (DEBUG/tests) o ya enviada por otra capa (p. ej. el
+        # handle_exception del ViewSet que luego re-lanza): no armar el scope
+        if not sentry_sdk.get_client().is_active() or getattr(exception, '_sentry_captured', False):
+            return
+
         with sentry_sdk.push_scope() as scope:
             scope.level = level
             
@@ -384,6 +389,11 @@ class SentryErrorHandlerMixin:
             
             sentry_sdk.capture_exception(exception)
 
+        try:
+            exception._sentry_captured = True
+        except AttributeError:
+            pass
+
 
 class ViewSetSentryMixin(SentryErrorHandlerMixin):
     """
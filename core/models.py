@@ -128,4 +128,41 @@ class BaseModel(models.Model):
         )
 
     def __str__(self):
-        return f"{self.__class__.__name__} - {self.pk}"
\ No newline at end of file
+        return f"{self.__class__.__name__} - {self.pk}"
+
+class EmailOutbox(models.Model):
+    """
+    Cola durable de correos. EmailService la escribe al encolar (las
+    notificaciones de pedidos, tras el commit del pago) y la drena el comando
+    process_email_outbox con un pool fijo de hilos.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead'),
+    ]
+    subject = models.CharField(max_length=255)
+    to_email = models.EmailField()
+    html = models.TextField()
+    text = models.TextField(blank=True)
+    template_name = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    external_id = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Correo en cola'
+        verbose_name_plural = 'Correos en cola'
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='emailoutbox_status_next_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.to_email} - {self.subject} ({self.status})"
@@ -0,0 +1,59 @@
+import logging
+import uuid
+
+import resend
+from decouple import config
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+resend.api_key = config('RESEND_API_KEY')
+
+logger = logging.getLogger(__name__)
+
+
+class BaseEmailBackend:
+    """
+    Backend que usa el worker del outbox para entregar correos.
+    `send_batch` recibe una lista de dicts {from, to, subject, html, text}
+    y retorna los ids externos en el mismo orden. Si falla debe lanzar excepción.
+    """
+    max_batch_size = 100
+
+    def send_batch(self, messages: list[dict]) -> list[str]:
+        raise NotImplementedError
+
+
+class ResendBackend(BaseEmailBackend):
+    """Envía hasta 100 correos por request con la API batch de Resend."""
+
+    def send_batch(self, messages):
+        if len(messages) == 1:
+            return [resend.Emails.send(messages[0])['id']]
+
+        response = resend.Batch.send(messages)
+        return [item['id'] for item in response['data']]
+
+
+class ConsoleBackend(BaseEmailBackend):
+    """Solo loguea los correos. Útil en desarrollo local."""
+
+    def send_batch(self, messages):
+        ids = []
+        for message in messages:
+            email_id = f"console-{uuid.uuid4().hex[:12]}"
+            logger.info(f"[outbox] {message['to']} - {message['subject']} (id: {email_id})")
+            ids.append(email_id)
+        return ids
+
+
+class LocmemBackend(BaseEmailBackend):
+    """Guarda los correos en memoria. Usado en tests."""
+    outbox: list[dict] = []
+
+    def send_batch(self, messages):
+        LocmemBackend.outbox.extend(messages)
+        return [f"locmem-{uuid.uuid4().hex[:12]}" for _ in messages]
+
+
+def get_email_backend() -> BaseEmailBackend:
+    return import_string(settings.EMAIL_OUTBOX_BACKEND)()
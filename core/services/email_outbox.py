@@ -0,0 +1,242 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from core.models import EmailOutbox
+from core.services.email_backends import get_email_backend
+
+logger = logging.getLogger(__name__)
+
+# Si un worker muere con filas en 'sending', se recuperan pasado este tiempo
+SENDING_TIMEOUT = timedelta(minutes=10)
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 60 * 60
+
+
+@dataclass
+class OutboxStats:
+    sent: int = 0
+    retried: int = 0
+    dead: int = 0
+    latencies: list[float] = field(default_factory=list)
+    started: float = field(default_factory=time.monotonic)
+    finished: float | None = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, sent=0, retried=0, dead=0, latencies=()):
+        with self._lock:
+            self.sent += sent
+            self.retried += retried
+            self.dead += dead
+            self.latencies.extend(latencies)
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def throughput(self) -> float:
+        """Correos enviados por segundo."""
+        return self.sent / self.elapsed if self.elapsed > 0 else 0.0
+
+    def latency_percentile(self, percentile: int) -> float | None:
+        """Segundos entre que el correo se encoló y se entregó."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+        return ordered[index]
+
+
+class EmailOutboxService:
+
+    @staticmethod
+    def enqueue(subject, to_email, html, text='', template_name='') -> EmailOutbox:
+        """
+        Inserta el correo en el outbox. Es un INSERT normal: si hay una
+        transacción abierta participa de ella. Las notificaciones de pedidos
+        (OrderNotificationService) llegan aquí desde transaction.on_commit, ya
+        fuera de la transacción del pago, así que un rollback no deja correos
+        pero una caída justo después del commit sí puede perder uno.
+        """
+        return EmailOutbox.objects.create(
+            subject=subject,
+            to_email=to_email,
+            html=html,
+            text=text,
+            template_name=template_name,
+        )
+
+    @staticmethod
+    def claim_batch(batch_size: int) -> list[EmailOutbox]:
+        """
+        Reserva un lote con SELECT ... FOR UPDATE SKIP LOCKED para que varios
+        workers puedan drenar la cola en paralelo sin pisarse.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            ids = list(
+                EmailOutbox.objects
+                .select_for_update(skip_locked=True)
+                .filter(
+                    Q(status='pending', next_attempt_at__lte=now)
+                    | Q(status='sending', locked_at__lt=now - SENDING_TIMEOUT)
+                )
+                .order_by('next_attempt_at')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                return []
+            EmailOutbox.objects.filter(id__in=ids).update(status='sending', locked_at=now)
+
+        return list(EmailOutbox.objects.filter(id__in=ids))
+
+    @staticmethod
+    def _message(row: EmailOutbox) -> dict:
+        return {
+            "from": settings.DEFAULT_FROM_EMAIL,
+            "to": [row.to_email],
+            "subject": row.subject,
+            "html": row.html,
+            "text": row.text,
+        }
+
+    @staticmethod
+    def deliver(rows: list[EmailOutbox], backend, stats: OutboxStats) -> None:
+        """
+        Entrega los correos en sub-lotes del tamaño máximo que acepta el backend.
+        Si un lote falla se reintenta correo por correo: un mensaje que el
+        proveedor rechaza no debe mandar a reintento (y a 'dead') a todo el lote.
+        """
+        size = backend.max_batch_size
+        for start in range(0, len(rows), size):
+            chunk = rows[start:start + size]
+            try:
+                external_ids = backend.send_batch([EmailOutboxService._message(row) for row in chunk])
+            except Exception as e:
+                if len(chunk) == 1:
+                    logger.warning(f"Error al enviar correo a {chunk[0].to_email}: {e}")
+                    EmailOutboxService._mark_failed(chunk, str(e), stats)
+                    continue
+                logger.warning(f"Error al enviar lote de {len(chunk)} correos, se envían uno por uno: {e}")
+                for row in chunk:
+                    EmailOutboxService.deliver([row], backend, stats)
+            else:
+                EmailOutboxService._mark_sent(chunk, external_ids, stats)
+
+    @staticmethod
+    def _mark_sent(rows, external_ids, stats: OutboxStats) -> None:
+        now = timezone.now()
+        external_ids = list(external_ids)
+        if len(external_ids) != len(rows):
+            # El proveedor aceptó el lote: reintentarlo duplicaría correos, pero no
+            # se sabe qué id corresponde a cuál; se marcan enviados sin id
+            logger.error(
+                f"El backend devolvió {len(external_ids)} ids para {len(rows)} correos; se guardan sin id externo"
+            )
+            external_ids = [''] * len(rows)
+        for row, external_id in zip(rows, external_ids):
+            row.status = 'sent'
+            row.sent_at = now
+            row.external_id = external_id or ''
+            row.attempts += 1
+            row.last_error = ''
+        EmailOutbox.objects.bulk_update(rows, ['status', 'sent_at', 'external_id', 'attempts', 'last_error'])
+        stats.record(
+            sent=len(rows),
+            latencies=[(now - row.created_at).total_seconds() for row in rows],
+        )
+
+    @staticmethod
+    def _mark_failed(rows, error: str, stats: OutboxStats) -> None:
+        now = timezone.now()
+        max_attempts = settings.EMAIL_OUTBOX_MAX_ATTEMPTS
+        retried = dead = 0
+        for row in rows:
+            row.attempts += 1
+            row.last_error = error[:2000]
+            if row.attempts >= max_attempts:
+                row.status = 'dead'
+                dead += 1
+                logger.error(f"Correo a {row.to_email} descartado tras {row.attempts} intentos: {error}")
+            else:
+                row.status = 'pending'
+                row.next_attempt_at = now + EmailOutboxService.backoff(row.attempts)
+                retried += 1
+        EmailOutbox.objects.bulk_update(rows, ['status', 'attempts', 'last_error', 'next_attempt_at'])
+        stats.record(retried=retried, dead=dead)
+
+    @staticmethod
+    def backoff(attempts: int) -> timedelta:
+        """Backoff exponencial con jitter del 10% para no sincronizar reintentos."""
+        seconds = min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+        return timedelta(seconds=seconds + random.uniform(0, seconds * 0.1))
+
+    @staticmethod
+    def drain(workers: int = 4, batch_size: int = 50, backend=None) -> OutboxStats:
+        """
+        Drena la cola hasta vaciarla con un pool fijo de `workers` hilos.
+        Con workers=1 corre en el hilo actual.
+        """
+        backend = backend or get_email_backend()
+        stats = OutboxStats()
+
+        def worker():
+            try:
+                while True:
+                    rows = EmailOutboxService.claim_batch(batch_size)
+                    if not rows:
+                        return
+                    EmailOutboxService.deliver(rows, backend, stats)
+            finally:
+                if workers > 1:
+                    connection.close()
+
+        if workers <= 1:
+            worker()
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for future in [executor.submit(worker) for _ in range(workers)]:
+                    future.result()
+
+        stats.finished = time.monotonic()
+        return stats
+
+    @staticmethod
+    def purge_sent_bodies(older_than: timedelta | None = None) -> int:
+        """
+        Vacía html/text de los correos enviados hace más de `older_than`
+        (EMAIL_OUTBOX_RETENTION_DAYS por defecto). Los cuerpos llevan datos
+        personales y ya no se van a reenviar; la fila queda como registro.
+        """
+        if older_than is None:
+            older_than = timedelta(days=settings.EMAIL_OUTBOX_RETENTION_DAYS)
+        return (
+            EmailOutbox.objects
+            .filter(status='sent', sent_at__lt=timezone.now() - older_than)
+            .exclude(html='', text='')
+            .update(html='', text='')
+        )
+
+    @staticmethod
+    def backlog() -> dict:
+        """Tamaño de la cola por estado y antigüedad del correo pendiente más viejo."""
+        counts = dict(
+            EmailOutbox.objects.values('status')
+            .annotate(total=Count('id'))
+            .values_list('status', 'total')
+        )
+        oldest = EmailOutbox.objects.filter(status='pending').aggregate(oldest=Min('created_at'))['oldest']
+        return {
+            'by_status': counts,
+            'oldest_pending_seconds': (timezone.now() - oldest).total_seconds() if oldest else 0,
+        }
@@ -1,48 +1,38 @@
-import resend
-import threading
 import logging
-from django.conf import settings
+from django.db import transaction
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
-from decouple import config
 
-resend.api_key = config('RESEND_API_KEY')
+from core.services.email_outbox import EmailOutboxService
+
 logger = logging.getLogger(__name__)
 
 class EmailService:
     @classmethod
     def send_template_email(cls, subject, to_email, template_name, **context):
+        """
+        Renderiza el template y lo deja en el outbox. La entrega real la hace
+        el comando process_email_outbox, así que nunca bloquea la request.
+        """
         try:
             html_content = render_to_string(template_name, context)
             plain_message = strip_tags(html_content)
 
-            thread = threading.Thread(
-                target=cls._send,
-                args=(subject, plain_message, to_email, html_content)
-            )
-            thread.daemon = True
-            thread.start()
+            # Savepoint: si el INSERT falla no rompe la transacción del caller
+            with transaction.atomic():
+                EmailOutboxService.enqueue(
+                    subject=subject,
+                    to_email=to_email,
+                    html=html_content,
+                    text=plain_message,
+                    template_name=template_name,
+                )
             return True
 
         except Exception as e:
-            logger.exception(f"Error al enviar correo a {to_email}: {e}")
+            logger.exception(f"Error al encolar correo a {to_email}: {e}")
             return False
 
-    @classmethod
-    def _send(cls, subject, plain_message, to_email, html_content):
-        try:
-            params = {
-                "from": settings.DEFAULT_FROM_EMAIL,
-                "to": [to_email],
-                "subject": subject,
-                "html": html_content,
-                "text": plain_message,
-            }
-            email = resend.Emails.send(params)
-            logger.info(f"Correo enviado a {to_email}, id: {email['id']}")
-        except Exception as e:
-            logger.exception(f"Error al enviar correo a {to_email}: {e}")
-
 
 # Todas tus clases quedan igual, no tocar nada abajo
 class PasswordResetEmail:
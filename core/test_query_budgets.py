@@ -0,0 +1,236 @@
+"""
+Presupuesto de consultas por endpoint.
+
+Cada fila de QUERY_BUDGETS es un GET de los routers con un rol (anon, user,
+staff) y el máximo de consultas SQL permitido. La prueba siembra N=5 registros
+de cada tipo (piezas, fotos, descuentos, reseñas, favoritos, pedidos con items,
+pagos y guías, blogs, colecciones), mide cada endpoint, sube a N=50 y vuelve a
+medir: el conteo tiene que ser idéntico (sin N+1) y no pasar del presupuesto.
+Si falla, el mensaje trae el SQL de la corrida con N=50.
+
+Al agregar un endpoint a un router, agrega aquí su fila.
+"""
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from blog.models import Blog
+from cms.models import Collection, ImageCollection
+from orders.models import Order, OrderItem, Payment, ShippingTracking
+from pieces.models import Discount, Piece, PieceDiscount, PiecePhoto, Review, Section, ShippingRate, TypePiece
+from users.models import Address, WishList
+
+User = get_user_model()
+
+
+@dataclass(frozen=True)
+class Budget:
+    url: str
+    role: str
+    max_queries: int
+
+
+# Los placeholders ({piece}, {order}, ...) se llenan con el primer registro sembrado
+QUERY_BUDGETS = [
+    # --- Catálogo
+    Budget('/api/v1/pieces/', 'anon', 4),
+    Budget('/api/v1/pieces/?currency=USD', 'anon', 4),
+    Budget('/api/v1/pieces/', 'user', 6),
+    Budget('/api/v1/pieces/', 'staff', 6),
+    Budget('/api/v1/pieces/{piece}/', 'anon', 3),
+    Budget('/api/v1/pieces/basic/', 'anon', 1),
+    Budget('/api/v1/pieces/{piece}/photos/', 'anon', 2),
+    Budget('/api/v1/pieces/{piece}/discounts/', 'anon', 2),
+    Budget('/api/v1/types/', 'anon', 2),
+    Budget('/api/v1/sections/', 'anon', 2),
+    Budget('/api/v1/reviews/', 'anon', 2),
+    Budget('/api/v1/reviews/', 'staff', 2),
+    # --- Usuario
+    Budget('/api/v1/users/me/addresses/', 'user', 2),
+    Budget('/api/v1/users/me/wishlist/', 'user', 6),
+    # --- Pedidos
+    Budget('/api/v1/orders/', 'user', 5),
+    Budget('/api/v1/orders/', 'staff', 1),  # staff sólo ve sus propios pedidos
+    Budget('/api/v1/orders/{order}/', 'user', 4),
+    Budget('/api/v1/shipping-trackings/', 'user', 2),
+    Budget('/api/v1/shipping-trackings/', 'staff', 2),
+    Budget('/api/v1/shipping-trackings/{tracking}/', 'user', 2),
+    # --- Contenido
+    Budget('/api/v1/blog/', 'anon', 3),
+    Budget('/api/v1/blog/{blog}/', 'anon', 2),
+    Budget('/api/v1/collections/', 'anon', 2),
+    Budget('/api/v1/collections/{collection}/', 'anon', 2),
+]
+
+
+class CatalogSeeder:
+    """Siembra por lotes con bulk_create; `grow(n)` agrega hasta tener n de cada cosa."""
+
+    def __init__(self, user, staff):
+        self.user = user
+        self.staff = staff
+        self.count = 0
+        self.type_piece = TypePiece.objects.create(type='Escultura', key='escultura')
+        self.section = Section.objects.create(section='Arte', key='arte')
+        self.discount = Discount.objects.create(
+            name='Temporada',
+            percentage=Decimal('10.0'),
+            start_date=timezone.now().date() - timedelta(days=1),
+            end_date=timezone.now().date() + timedelta(days=30),
+        )
+        self.address = Address.objects.create(
+            user=user, recipient_name='Cliente', country='mexico', state='Jalisco',
+            city='Guadalajara', postal_code='44100', neighborhood='Centro', street='Juárez',
+            street_number=1, phone_number='+523310000000', reference='Ninguna', is_default=True,
+        )
+        ShippingRate.objects.bulk_create([
+            ShippingRate(region=region, kg=kg, cost=Decimal('150.00') + kg)
+            for region in ('MX', 'US') for kg in range(1, 11)
+        ], ignore_conflicts=True)
+
+    def grow(self, n):
+        new = range(self.count, n)
+        self.count = n
+
+        pieces = Piece.objects.bulk_create([
+            Piece(
+                title=f'Pieza {i}', title_es=f'Pieza {i}', title_en=f'Piece {i}',
+                slug=f'pieza-{i}', description='Descripción', description_es='Descripción',
+                description_en='Description', quantity=5, price_base=Decimal('100.00'),
+                width=Decimal('10'), height=Decimal('10'), length=Decimal('10'), weight=Decimal('1.5'),
+                type=self.type_piece, section=self.section, thumbnail_path=f'pieces/placeholder-{i}.jpg',
+            )
+            for i in new
+        ])
+        PiecePhoto.objects.bulk_create([
+            PiecePhoto(piece=piece, image_path=f'pieces/photos/placeholder-{piece.pk}-{position}.jpg', position=position)
+            for piece in pieces for position in (1, 2)
+        ])
+        PieceDiscount.objects.bulk_create([PieceDiscount(piece=piece, discount=self.discount) for piece in pieces])
+        # Los detalles y endpoints anidados miden el primer registro: que también crezca con N
+        first = Piece.objects.order_by('pk').first()
+        PiecePhoto.objects.bulk_create([
+            PiecePhoto(piece=first, image_path=f'pieces/photos/extra-{i}.jpg', position=10 + i) for i in new
+        ])
+
+        reviewers = User.objects.bulk_create([
+            User(username=f'reviewer{i}', email=f'reviewer{i}@example.com') for i in new
+        ])
+        Review.objects.bulk_create([
+            Review(user=reviewer, piece=piece, rating=5, comment='Muy bonita')
+            for reviewer, piece in zip(reviewers, pieces)
+        ])
+        WishList.objects.bulk_create([WishList(user=self.user, piece=piece) for piece in pieces])
+        Address.objects.bulk_create([
+            Address(
+                user=self.user, recipient_name=f'Destino {i}', country='mexico', state='Jalisco',
+                city='Guadalajara', postal_code='44100', neighborhood='Centro', street='Juárez',
+                street_number=i + 2, phone_number='+523310000000', reference='Ninguna',
+            )
+            for i in new
+        ])
+
+        orders = Order.objects.bulk_create([
+            Order(user=self.user, total=Decimal('200.00'), status='paid', address=self.address) for _ in new
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, piece=piece, quantity=1, price_snapshot=Decimal('200.00'))
+            for order, piece in zip(orders, pieces)
+        ])
+        first_order = Order.objects.order_by('pk').first()
+        OrderItem.objects.bulk_create([
+            OrderItem(order=first_order, piece=piece, quantity=1, price_snapshot=Decimal('200.00'))
+            for piece in pieces
+        ])
+        Payment.objects.bulk_create([
+            Payment(order=order, amount=order.total, payment_method='card', external_id=f'pi_{order.pk}', status='paid')
+            for order in orders
+        ])
+        ShippingTracking.objects.bulk_create([
+            ShippingTracking(order=order, carrier='fedex', tracking_number=f'T{order.pk}', status=status)
+            for order in orders for status in ('pending', 'in_transit')
+        ])
+
+        blogs = Blog.objects.bulk_create([
+            Blog(
+                title=f'Entrada {i}', slug=f'entrada-{i}', content='Contenido', status='published',
+                published_at=timezone.now(), section=self.section, cover_image=f'blog/placeholder-{i}.jpg',
+            )
+            for i in new
+        ])
+        Blog.pieces.through.objects.bulk_create([
+            Blog.pieces.through(blog_id=blog.pk, piece_id=piece.pk) for blog, piece in zip(blogs, pieces)
+        ])
+        collections = Collection.objects.bulk_create([
+            Collection(name=f'Colección {i}', thumbnail_path=f'collections/placeholder-{i}.jpg') for i in new
+        ])
+        first_collection = Collection.objects.order_by('pk').first()
+        ImageCollection.objects.bulk_create([
+            ImageCollection(collection=collection, image_path=f'collections/img-{collection.pk}.jpg', year=2020)
+            for collection in collections
+        ] + [
+            ImageCollection(collection=first_collection, image_path=f'collections/extra-{i}.jpg', year=2021)
+            for i in new
+        ])
+
+    def url_kwargs(self):
+        return {
+            'piece': Piece.objects.order_by('pk').values_list('slug', flat=True).first(),
+            'order': Order.objects.order_by('pk').values_list('pk', flat=True).first(),
+            'tracking': ShippingTracking.objects.order_by('pk').values_list('pk', flat=True).first(),
+            'blog': Blog.objects.order_by('pk').values_list('slug', flat=True).first(),
+            'collection': Collection.objects.order_by('pk').values_list('name', flat=True).first(),
+        }
+
+
+@patch('pieces.service.CurrencyService.get_usd_rate', return_value=Decimal('17.50'))
+class QueryBudgetTest(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='cliente', email='cliente@example.com', password='x')
+        self.staff = User.objects.create_user(
+            username='staff', email='staff@example.com', password='x', is_staff=True
+        )
+        self.seeder = CatalogSeeder(self.user, self.staff)
+
+    def _measure(self, budget, url_kwargs):
+        self.client.force_authenticate(user={'anon': None, 'user': self.user, 'staff': self.staff}[budget.role])
+        # Cache vacía en cada medición: throttles, tipo de cambio, etc. no deben variar el conteo
+        cache.clear()
+        url = budget.url.format(**url_kwargs)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, f'{budget.role} GET {url}: {response.status_code}')
+        return [query['sql'] for query in ctx.captured_queries]
+
+    def _run_all(self):
+        url_kwargs = self.seeder.url_kwargs()
+        return {budget: self._measure(budget, url_kwargs) for budget in QUERY_BUDGETS}
+
+    def test_query_counts_do_not_grow_with_data(self, _rate):
+        self.seeder.grow(5)
+        small = self._run_all()
+        self.seeder.grow(50)
+        large = self._run_all()
+
+        for budget in QUERY_BUDGETS:
+            with self.subTest(url=budget.url, role=budget.role):
+                sql = '\n'.join(f'  {i}. {query}' for i, query in enumerate(large[budget], 1))
+                self.assertEqual(
+                    len(small[budget]), len(large[budget]),
+                    f'{budget.role} GET {budget.url}: {len(small[budget])} consultas con N=5 '
+                    f'y {len(large[budget])} con N=50 (N+1)\n{sql}',
+                )
+                self.assertLessEqual(
+                    len(large[budget]), budget.max_queries,
+                    f'{budget.role} GET {budget.url}: {len(large[budget])} consultas, '
+                    f'presupuesto {budget.max_queries}\n{sql}',
+                )
@@ -1,3 +1,754 @@
-from django.test import TestCase
+import json
+import logging
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import StringIO
+from logging.handlers import QueueListener
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
 
-# Create your tests here.
+import requests
+import resend
+import stripe
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from cms.models import Carousel, Collection
+from config import throttling
+from config.throttling import LoginThrottle
+from core.benchmarks.fakes import USD_TO_MXN, FakeProviders
+from core.benchmarks.report import ScenarioResult, compare, percentile
+from core.benchmarks.synthetic import SyntheticDataGenerator
+from core.middleware import CountryDetectionMiddleware, RequestIdMiddleware
+from core.models import EmailOutbox
+from core.services.email_backends import BaseEmailBackend, LocmemBackend, ResendBackend
+from core.services.email_outbox import EmailOutboxService
+from core.services.email_service import EmailService
+from core.mixins import SentryErrorHandlerMixin
+from core.utils import metrics
+from core.utils.logs import DeferredQueueHandler, JSONFormatter, bind_request, unbind_request
+from core.utils.sentry import before_send, traces_sampler
+from core.utils.storages import delete_storage_names
+from orders.models import Order, OrderItem, Payment
+from pieces.models import Piece
+from pieces.service import BanxicoClient
+
+
+class CleanupOrphanMediaCommandTest(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+        default_storage.save('carrusel/1/img-1.jpg', ContentFile(b'referenciado'))
+        default_storage.save('carrusel/1/huerfano.jpg', ContentFile(b'huerfano'))
+        default_storage.save('pieces/temp/abc123.jpg', ContentFile(b'huerfano'))
+        Carousel.objects.create(carousel=1, position=1, img='carrusel/1/img-1.jpg')
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def _run(self, *args):
+        out = StringIO()
+        call_command('cleanup_orphan_media', '--min-age-hours', '0', *args, stdout=out)
+        return out.getvalue()
+
+    def _exists(self, name):
+        return os.path.exists(os.path.join(self.media_root, name))
+
+    def test_dry_run_reports_orphans_without_deleting(self):
+        output = self._run('--dry-run')
+
+        self.assertIn('carrusel/1/huerfano.jpg', output)
+        self.assertIn('pieces/temp/abc123.jpg', output)
+        self.assertNotIn('img-1.jpg', output)
+        self.assertTrue(self._exists('carrusel/1/huerfano.jpg'))
+
+    def test_deletes_orphans_and_keeps_referenced_files(self):
+        self._run('--page-size', '1', '--workers', '2')
+
+        self.assertTrue(self._exists('carrusel/1/img-1.jpg'))
+        self.assertFalse(self._exists('carrusel/1/huerfano.jpg'))
+        self.assertFalse(self._exists('pieces/temp/abc123.jpg'))
+
+    def test_recent_files_are_skipped(self):
+        out = StringIO()
+        call_command('cleanup_orphan_media', stdout=out)
+
+        self.assertTrue(self._exists('carrusel/1/huerfano.jpg'))
+        self.assertIn('0 huérfanos', out.getvalue())
+
+    def test_failed_deletes_are_reported_not_counted(self):
+        delete = default_storage.delete
+
+        def flaky_delete(name):
+            if name.startswith('pieces/'):
+                raise PermissionError('sin permiso')
+            delete(name)
+
+        out, err = StringIO(), StringIO()
+        with patch.object(default_storage, 'delete', side_effect=flaky_delete):
+            call_command('cleanup_orphan_media', '--min-age-hours', '0', stdout=out, stderr=err)
+
+        self.assertIn('1 eliminados, 1 con error', out.getvalue())
+        self.assertIn('pieces/temp/abc123.jpg', err.getvalue())
+        self.assertTrue(self._exists('pieces/temp/abc123.jpg'))
+
+    def test_s3_errors_are_subtracted_from_deleted(self):
+        client = Mock()
+        client.delete_objects.return_value = {
+            'Errors': [{'Key': 'media/a.jpg', 'Code': 'AccessDenied', 'Message': 'Access Denied'}],
+        }
+        storage = SimpleNamespace(
+            bucket=SimpleNamespace(meta=SimpleNamespace(client=client)),
+            bucket_name='bucket',
+            _normalize_name=lambda name: f'media/{name}',
+        )
+
+        deleted, failed = delete_storage_names(storage, ['a.jpg', 'b.jpg'])
+
+        self.assertEqual(deleted, 1)
+        self.assertEqual(failed, [('a.jpg', 'AccessDenied: Access Denied')])
+
+
+class FailingBackend(BaseEmailBackend):
+    def send_batch(self, messages):
+        raise RuntimeError("proveedor caído")
+
+
+class PoisonBackend(LocmemBackend):
+    """Rechaza el lote entero si trae la dirección inválida."""
+    def send_batch(self, messages):
+        if any(message["to"] == ["rechazado@example.com"] for message in messages):
+            raise RuntimeError("dirección inválida")
+        return super().send_batch(messages)
+
+
+class ShortIdsBackend(LocmemBackend):
+    def send_batch(self, messages):
+        return super().send_batch(messages)[:-1]
+
+
+class EmailOutboxTest(TestCase):
+
+    def setUp(self):
+        LocmemBackend.outbox.clear()
+
+    def _enqueue(self, to_email="cliente@example.com"):
+        EmailService.send_template_email(
+            "Pedido Enviado", to_email, "emails/password_reset.txt", reset_url="http://x"
+        )
+
+    def test_send_template_email_enqueues_without_sending(self):
+        self._enqueue()
+
+        row = EmailOutbox.objects.get()
+        self.assertEqual(row.status, "pending")
+        self.assertEqual(row.to_email, "cliente@example.com")
+        self.assertEqual(LocmemBackend.outbox, [])
+
+    def test_enqueue_is_rolled_back_with_caller_transaction(self):
+        try:
+            with transaction.atomic():
+                self._enqueue()
+                raise RuntimeError("rollback")
+        except RuntimeError:
+            pass
+
+        self.assertFalse(EmailOutbox.objects.exists())
+
+    def test_drain_delivers_in_batches_and_marks_sent(self):
+        for i in range(5):
+            self._enqueue(f"c{i}@example.com")
+
+        stats = EmailOutboxService.drain(workers=1, batch_size=2)
+
+        self.assertEqual(stats.sent, 5)
+        self.assertEqual(len(LocmemBackend.outbox), 5)
+        self.assertFalse(EmailOutbox.objects.exclude(status="sent").exists())
+        self.assertIsNotNone(stats.latency_percentile(95))
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        self._enqueue()
+
+        stats = EmailOutboxService.drain(workers=1, backend=FailingBackend())
+
+        row = EmailOutbox.objects.get()
+        self.assertEqual(stats.retried, 1)
+        self.assertEqual(row.status, "pending")
+        self.assertEqual(row.attempts, 1)
+        self.assertGreater(row.next_attempt_at, timezone.now())
+        self.assertIn("proveedor caído", row.last_error)
+
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=1)
+    def test_exhausted_retries_dead_letter_the_email(self):
+        self._enqueue()
+
+        stats = EmailOutboxService.drain(workers=1, backend=FailingBackend())
+
+        self.assertEqual(stats.dead, 1)
+        self.assertEqual(EmailOutbox.objects.get().status, "dead")
+
+    def test_failed_batch_falls_back_to_single_sends(self):
+        for to_email in ("a@example.com", "rechazado@example.com", "b@example.com"):
+            self._enqueue(to_email)
+
+        stats = EmailOutboxService.drain(workers=1, backend=PoisonBackend())
+
+        self.assertEqual(stats.sent, 2)
+        self.assertEqual(stats.retried, 1)
+        self.assertEqual(
+            EmailOutbox.objects.exclude(status="sent").get().to_email, "rechazado@example.com"
+        )
+
+    def test_mismatched_ids_mark_batch_sent_without_ids(self):
+        for i in range(3):
+            self._enqueue(f"c{i}@example.com")
+
+        stats = EmailOutboxService.drain(workers=1, backend=ShortIdsBackend())
+
+        self.assertEqual(stats.sent, 3)
+        self.assertEqual(EmailOutbox.objects.filter(status="sent", external_id="").count(), 3)
+
+    def test_purge_blanks_bodies_of_old_sent_emails(self):
+        self._enqueue("viejo@example.com")
+        self._enqueue("nuevo@example.com")
+        EmailOutboxService.drain(workers=1)
+        EmailOutbox.objects.filter(to_email="viejo@example.com").update(
+            sent_at=timezone.now() - timezone.timedelta(days=30)
+        )
+
+        self.assertEqual(EmailOutboxService.purge_sent_bodies(), 1)
+        self.assertEqual(EmailOutbox.objects.get(to_email="viejo@example.com").html, "")
+        self.assertNotEqual(EmailOutbox.objects.get(to_email="nuevo@example.com").html, "")
+
+    def test_command_logs_drain_summary(self):
+        for i in range(2):
+            self._enqueue(f"c{i}@example.com")
+
+        with self.assertLogs("core.management.commands.process_email_outbox", level="INFO") as logs:
+            call_command("process_email_outbox", "--workers", "1", stdout=StringIO())
+
+        record = logs.records[0]
+        self.assertEqual(record.sent, 2)
+        self.assertEqual(record.dead, 0)
+        self.assertEqual(record.backlog, {"sent": 2})
+
+
+class CountryDetectionMiddlewareTest(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def _middleware(self):
+        return CountryDetectionMiddleware(lambda request: HttpResponse())
+
+    def _request(self, path="/api/v1/pieces/", ip="8.8.8.8"):
+        return self.factory.get(path, REMOTE_ADDR=ip)
+
+    def test_repeated_ip_is_served_from_lru(self):
+        middleware = self._middleware()
+        for _ in range(3):
+            request = self._request()
+            middleware(request)
+
+        stats = middleware.stats()
+        self.assertEqual(request.detected_country, "US")
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 1))
+        self.assertEqual(stats["hit_rate"], round(2 / 3, 4))
+
+    def test_skipped_paths_do_not_lookup(self):
+        middleware = self._middleware()
+        request = self._request("/api/v1/orders/webhook/")
+
+        middleware(request)
+
+        self.assertFalse(hasattr(request, "detected_country"))
+        self.assertEqual(middleware.stats()["skipped"], 1)
+        self.assertEqual(middleware.stats()["misses"], 0)
+
+    @override_settings(GEOIP_DB_PATH="/no/existe/GeoLite2-Country.mmdb")
+    def test_missing_database_does_not_break_startup(self):
+        with self.assertLogs("core.middleware", level="WARNING"):
+            middleware = self._middleware()
+        request = self._request()
+
+        middleware(request)
+
+        self.assertIsNone(middleware.reader)
+        self.assertEqual(request.detected_country, "US")
+
+    @override_settings(GEOIP_READER_MODE="memory")
+    def test_memory_reader_mode(self):
+        middleware = self._middleware()
+        request = self._request(ip="192.168.1.10")
+
+        middleware(request)
+
+        self.assertEqual(request.detected_country, "MX")
+        self.assertEqual(middleware.stats()["reader"], "memory")
+
+    @override_settings(GEOIP_READER_MODE="disco")
+    def test_invalid_reader_mode_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self._middleware()
+
+
+class FakeSlidingWindowScript:
+    """Réplica en Python de SLIDING_WINDOW_LUA para probar el throttle sin servidor Redis."""
+
+    def __init__(self):
+        self.windows = {}
+        self.calls = 0
+
+    def __call__(self, keys, args):
+        self.calls += 1
+        now, duration, limit, member = float(args[0]), args[1], args[2], args[3]
+        window = [entry for entry in self.windows.get(keys[0], []) if entry[0] > now - duration]
+        self.windows[keys[0]] = window
+        if len(window) < limit:
+            window.append((now, member))
+            return [1, len(window), args[0]]
+        return [0, len(window), repr(min(window)[0])]
+
+
+class RedisRateThrottleTest(SimpleTestCase):
+
+    def setUp(self):
+        self.script = FakeSlidingWindowScript()
+        patcher = patch.object(throttling, "get_throttle_script", return_value=self.script)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        backoff = patch.object(throttling, "_redis_down_until", 0.0)
+        backoff.start()
+        self.addCleanup(backoff.stop)
+        throttling._fallback_cache.clear()
+        self.request = SimpleNamespace(META={"REMOTE_ADDR": "8.8.8.8"}, user=None)
+        self.now = 1000.0
+
+    def _check(self):
+        throttle = LoginThrottle()
+        throttle.rate = "3/min"
+        throttle.num_requests, throttle.duration = throttle.parse_rate(throttle.rate)
+        throttle.timer = lambda: self.now
+        return throttle.allow_request(self.request, None), throttle
+
+    def test_limit_is_enforced_with_one_script_call_per_check(self):
+        results = [self._check()[0] for _ in range(4)]
+
+        self.assertEqual(results, [True, True, True, False])
+        self.assertEqual(self.script.calls, 4)
+
+    def test_retry_after_matches_oldest_request_in_window(self):
+        for _ in range(3):
+            self._check()
+            self.now += 10
+
+        allowed, throttle = self._check()
+
+        self.assertFalse(allowed)
+        # La primera petición (t=1000) sale de la ventana de 60s en t=1060
+        self.assertAlmostEqual(throttle.wait(), 30.0)
+
+    def test_window_slides(self):
+        for _ in range(3):
+            self._check()
+        self.now += 61
+
+        self.assertTrue(self._check()[0])
+
+    def test_redis_outage_falls_back_to_local_limit(self):
+        failing = Mock(side_effect=throttling.redis.ConnectionError("caído"))
+        with patch.object(throttling, "get_throttle_script", return_value=failing):
+            with self.assertLogs("config.throttling", level="WARNING"):
+                results = [self._check() for _ in range(4)]
+
+        self.assertEqual([allowed for allowed, _ in results], [True, True, True, False])
+        self.assertGreater(results[-1][1].wait(), 0)
+
+    def test_redis_is_skipped_during_backoff_window(self):
+        failing = Mock(side_effect=throttling.redis.ConnectionError("caído"))
+        with patch.object(throttling, "get_throttle_script", return_value=failing):
+            with self.assertLogs("config.throttling", level="WARNING") as logs:
+                self._check()
+                self._check()
+
+        # La segunda petición no toca Redis y el aviso sale una sola vez
+        self.assertEqual(failing.call_count, 1)
+        self.assertEqual(len(logs.records), 1)
+
+        with patch.object(throttling.time, "monotonic", return_value=time.monotonic() + 31):
+            self.assertTrue(self._check()[0])
+        self.assertEqual(self.script.calls, 1)
+
+
+class StructuredLoggingTest(SimpleTestCase):
+
+    def _record(self, msg="Pago cancelado", args=(), **extra):
+        logger = logging.getLogger("orders.test")
+        return logger.makeRecord(logger.name, logging.INFO, __file__, 1, msg, args, None, extra=extra)
+
+    def test_json_formatter_emits_single_line_with_extras_and_request_id(self):
+        tokens = bind_request("req-123")
+        try:
+            record = self._record(order_id=7, amount=Decimal("10.00"))
+        finally:
+            unbind_request(tokens)
+
+        line = JSONFormatter().format(record)
+        data = json.loads(line)
+
+        self.assertNotIn("\n", line)
+        self.assertEqual(data["msg"], "Pago cancelado")
+        self.assertEqual(data["request_id"], "req-123")
+        self.assertEqual(data["order_id"], 7)
+        self.assertEqual(data["amount"], "10.00")
+        self.assertIsNotNone(data["elapsed_ms"])
+
+    def test_queue_handler_defers_formatting_to_listener(self):
+        formatted_in = []
+
+        class RecordingFormatter(logging.Formatter):
+            def format(self, record):
+                formatted_in.append(threading.get_ident())
+                return super().format(record)
+
+        class RecordingHandler(logging.Handler):
+            def emit(self, record):
+                self.format(record)
+
+        target = RecordingHandler()
+        target.setFormatter(RecordingFormatter())
+        log_queue = queue.SimpleQueue()
+        listener = QueueListener(log_queue, target)
+        listener.start()
+        try:
+            DeferredQueueHandler(log_queue).handle(self._record("total %s", ("10.00",)))
+        finally:
+            listener.stop()
+
+        # El hilo que loguea nunca pasa por el formatter; sólo el listener
+        self.assertEqual(len(formatted_in), 1)
+        self.assertNotEqual(formatted_in[0], threading.get_ident())
+
+    def test_queue_handler_resolves_args_and_traceback_before_enqueueing(self):
+        log_queue = queue.SimpleQueue()
+        items = ["a"]
+        try:
+            raise ValueError("fallo")
+        except ValueError:
+            logger = logging.getLogger("orders.test")
+            record = logger.makeRecord(
+                logger.name, logging.ERROR, __file__, 1, "items %s", (items,), sys.exc_info()
+            )
+
+        DeferredQueueHandler(log_queue).handle(record)
+        items.append("b")
+        queued = log_queue.get_nowait()
+
+        self.assertEqual(queued.getMessage(), "items ['a']")
+        self.assertIsNone(queued.args)
+        self.assertIsNone(queued.exc_info)
+        self.assertIn("ValueError: fallo", json.loads(JSONFormatter().format(queued))["exc"])
+
+    def test_request_id_middleware_echoes_or_generates_id(self):
+        middleware = RequestIdMiddleware(lambda request: HttpResponse())
+        factory = RequestFactory()
+
+        echoed = middleware(factory.get("/", HTTP_X_REQUEST_ID="abc-123"))
+        generated = middleware(factory.get("/", HTTP_X_REQUEST_ID="no válido\n"))
+
+        self.assertEqual(echoed["X-Request-ID"], "abc-123")
+        self.assertRegex(generated["X-Request-ID"], r"^[0-9a-f]{32}$")
+
+
+@override_settings(
+    SENTRY_TRACES_DEFAULT_RATE=0.1,
+    SENTRY_TRACES_RATES=[
+        ("/health", None, 0.0),
+        ("/api/v1/orders/checkout/", None, 1.0),
+        ("/api/v1/pieces/", ("GET", "HEAD"), 0.02),
+    ],
+)
+class SentrySamplingTest(SimpleTestCase):
+    def _wsgi(self, method, path, **extra):
+        return {"wsgi_environ": {"REQUEST_METHOD": method, "PATH_INFO": path}, **extra}
+
+    def test_rate_by_route_and_method(self):
+        self.assertEqual(traces_sampler(self._wsgi("GET", "/api/v1/pieces/12/")), 0.02)
+        self.assertEqual(traces_sampler(self._wsgi("POST", "/api/v1/pieces/")), 0.1)
+        self.assertEqual(traces_sampler(self._wsgi("POST", "/api/v1/orders/checkout/")), 1.0)
+        self.assertEqual(traces_sampler(self._wsgi("GET", "/health/")), 0.0)
+        self.assertEqual(traces_sampler(self._wsgi("GET", "/api/v1/blog/")), 0.1)
+
+    def test_asgi_scope_and_non_http_context(self):
+        asgi = {"asgi_scope": {"type": "http", "method": "GET", "path": "/api/v1/pieces/"}}
+        self.assertEqual(traces_sampler(asgi), 0.02)
+        self.assertEqual(traces_sampler({"transaction_context": {"op": "task"}}), 0.1)
+
+    def test_parent_decision_wins(self):
+        self.assertEqual(traces_sampler(self._wsgi("GET", "/health/", parent_sampled=True)), 1.0)
+        self.assertEqual(traces_sampler(self._wsgi("POST", "/api/v1/orders/checkout/", parent_sampled=False)), 0.0)
+
+
+class SentryCaptureDedupTest(SimpleTestCase):
+    def setUp(self):
+        self.handler = SentryErrorHandlerMixin()
+
+    def _capture(self, exc):
+        self.handler._capture_to_sentry(exc, level="error", tags={"view": "X"}, extra={})
+
+    @patch("core.mixins.sentry_sdk")
+    def test_captured_once_and_duplicate_dropped(self, sdk):
+        sdk.get_client.return_value.is_active.return_value = True
+        exc = RuntimeError("boom")
+
+        self._capture(exc)
+        self._capture(exc)
+
+        self.assertEqual(sdk.capture_exception.call_count, 1)
+        self.assertEqual(sdk.push_scope.call_count, 1)
+        self.assertIsNone(before_send({"event_id": "1"}, {"exc_info": (RuntimeError, exc, None)}))
+        self.assertIsNotNone(before_send({"event_id": "2"}, {"exc_info": (RuntimeError, RuntimeError("otra"), None)}))
+
+    @patch("core.mixins.sentry_sdk")
+    def test_no_scope_without_active_client(self, sdk):
+        sdk.get_client.return_value.is_active.return_value = False
+
+        self._capture(RuntimeError("boom"))
+
+        sdk.push_scope.assert_not_called()
+        sdk.capture_exception.assert_not_called()
+
+
+class RequestMetricsTest(TestCase):
+    def setUp(self):
+        self.registry = metrics.MetricsRegistry()
+        patcher = patch.object(metrics, "_registry", self.registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+
+    def test_viewset_request_is_recorded_and_exposed_to_staff(self):
+        self.client.get("/api/v1/types/")
+
+        staff = get_user_model().objects.create_user(
+            username="metrics", email="metrics@example.com", password="x", is_staff=True
+        )
+        self.client.force_authenticate(user=staff)
+        response = self.client.get("/api/v1/metrics/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        body = response.content.decode()
+        self.assertIn("# TYPE http_request_duration_seconds histogram", body)
+        self.assertIn(
+            'http_request_duration_seconds_count{action="list",method="GET",status="200",view="TypePieceViewSet"} 1',
+            body,
+        )
+        self.assertIn('db_queries_total{action="list",view="TypePieceViewSet"}', body)
+
+    def test_metrics_endpoint_requires_staff(self):
+        user = get_user_model().objects.create_user(username="plain", email="plain@example.com", password="x")
+        self.client.force_authenticate(user=user)
+
+        self.assertEqual(self.client.get("/api/v1/metrics/").status_code, 403)
+
+    def test_cache_hits_and_misses_are_counted_per_request(self):
+        stats = metrics.RequestStats()
+        token = metrics.bind_stats(stats)
+        try:
+            cache.set("metrics:a", 1)
+            self.assertEqual(cache.get("metrics:missing", "default"), "default")
+            self.assertEqual(cache.get("metrics:a"), 1)
+            cache.get_many(["metrics:a", "metrics:missing"])
+        finally:
+            metrics.unbind_stats(token)
+
+        self.assertEqual((stats.cache_hits, stats.cache_misses), (2, 2))
+
+    def test_collect_sums_worker_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            worker = metrics.MetricsRegistry(directory=directory)
+            worker.inc("db_queries_total", {"view": "V", "action": "list"}, 3)
+            worker.observe("http_request_duration_seconds", {"view": "V"}, 0.02)
+            with open(os.path.join(directory, "metrics-1.json"), "w") as fh:
+                json.dump(worker.snapshot(), fh)
+
+            local = metrics.MetricsRegistry(directory=directory)
+            local.inc("db_queries_total", {"view": "V", "action": "list"}, 2)
+            local.observe("http_request_duration_seconds", {"view": "V"}, 3.0)
+            body = metrics.render(local.collect())
+
+        self.assertIn('db_queries_total{action="list",view="V"} 5', body)
+        self.assertIn('http_request_duration_seconds_bucket{view="V",le="0.025"} 1', body)
+        self.assertIn('http_request_duration_seconds_bucket{view="V",le="+Inf"} 2', body)
+        self.assertIn('http_request_duration_seconds_count{view="V"} 2', body)
+
+    def test_outbound_http_time_is_recorded_by_host(self):
+        class OkHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"ok")
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(("127.0.0.1", 0), OkHandler)
+        threading.Thread(target=server.handle_request, daemon=True).start()
+        self.addCleanup(server.server_close)
+
+        stats = metrics.RequestStats()
+        token = metrics.bind_stats(stats)
+        try:
+            requests.get(f"http://127.0.0.1:{server.server_port}/", timeout=5)
+        finally:
+            metrics.unbind_stats(token)
+
+        self.assertEqual(stats.http["127.0.0.1"][0], 1)
+
+
+class BenchmarkFakesTest(SimpleTestCase):
+    def test_clients_talk_to_the_fake_providers(self):
+        with FakeProviders() as providers:
+            intent = stripe.PaymentIntent.create(
+                amount=1000, currency="mxn", api_key="sk_test_fake", metadata={"order_id": "7"}
+            )
+            refund = stripe.Refund.create(payment_intent=intent.id, api_key="sk_test_fake")
+            rate = BanxicoClient.fetch_rate()
+            sent = ResendBackend().send_batch([
+                {"from": "a@example.com", "to": ["b@example.com"], "subject": "x", "html": "x"},
+                {"from": "a@example.com", "to": ["c@example.com"], "subject": "y", "html": "y"},
+            ])
+
+        self.assertTrue(intent.id.startswith("pi_fake"))
+        self.assertEqual(intent.metadata["order_id"], "7")
+        self.assertEqual(refund.payment_intent, intent.id)
+        self.assertEqual(rate, Decimal(USD_TO_MXN))
+        self.assertEqual(len(sent), 2)
+        self.assertEqual(providers.calls["POST /v1/payment_intents"], 1)
+        self.assertEqual(providers.calls["POST /emails/batch"], 1)
+        # Al salir se restauran los destinos reales
+        self.assertNotIn("127.0.0.1", stripe.api_base)
+        self.assertNotIn("127.0.0.1", resend.api_url)
+
+
+class BenchmarkReportTest(SimpleTestCase):
+    def test_percentiles_and_summary(self):
+        result = ScenarioResult("catalog", elapsed=2.0, latencies=[i / 1000 for i in range(1, 101)], operations=100)
+        summary = result.summary()
+
+        self.assertIsNone(percentile([], 50))
+        self.assertEqual(summary["throughput"], 50.0)
+        self.assertEqual(summary["p50_ms"], 51.0)
+        self.assertEqual(summary["p99_ms"], 100.0)
+
+    def test_compare_flags_only_changes_beyond_tolerance(self):
+        baseline = {"catalog": {"p95_ms": 100.0, "p99_ms": 200.0, "throughput": 50.0}}
+
+        self.assertEqual(compare({"catalog": {"p95_ms": 115.0, "p99_ms": 210.0, "throughput": 45.0}}, baseline, 0.2), [])
+        regressions = compare({"catalog": {"p95_ms": 130.0, "p99_ms": 200.0, "throughput": 30.0}}, baseline, 0.2)
+        self.assertEqual(len(regressions), 2)
+        self.assertIn("p95_ms", regressions[0])
+        self.assertIn("throughput", regressions[1])
+        # Escenarios que no están en el baseline no cuentan
+        self.assertEqual(compare({"webhook_storm": {"p95_ms": 1e6, "throughput": 0.0}}, baseline, 0.2), [])
+
+
+class GenerateSyntheticDataCommandTest(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def _generate(self, seed=7):
+        generator = SyntheticDataGenerator(
+            seed=seed, chunk_size=7, workers=1, end=timezone.make_aware(timezone.datetime(2026, 1, 31))
+        )
+        return generator, generator.run(pieces=20, users=15, orders=40, blogs=5, collections=3, discounts=4)
+
+    def _snapshot(self):
+        return (
+            list(Piece.all_objects.filter(slug__startswith='synthetic-').order_by('slug').values_list(
+                'slug', 'title_es', 'title_en', 'price_base', 'quantity', 'created_at'
+            )),
+            sorted(Order.all_objects.values_list('user__username', 'total', 'status', 'created_at')),
+        )
+
+    def test_generates_requested_volumes_with_history(self):
+        _, counts = self._generate()
+
+        self.assertEqual(counts['pieces'], 20)
+        self.assertEqual(counts['users'], 15)
+        self.assertEqual(counts['orders'], 40)
+        self.assertEqual(Order.all_objects.count(), 40)
+        self.assertEqual(Payment.all_objects.count(), 40)
+        self.assertEqual(OrderItem.all_objects.count(), counts['order_items'])
+        self.assertEqual(Collection.all_objects.count(), 3)
+        # Las fechas vienen del historial generado, no de auto_now_add
+        self.assertLess(Order.all_objects.order_by('created_at').first().created_at.year, 2026)
+        self.assertTrue(default_storage.exists('synthetic/placeholders/piece-0.jpg'))
+
+    def test_same_seed_generates_same_data(self):
+        with transaction.atomic():
+            self._generate()
+            first = self._snapshot()
+            transaction.set_rollback(True)
+
+        with transaction.atomic():
+            self._generate(seed=8)
+            self.assertNotEqual(self._snapshot(), first)
+            transaction.set_rollback(True)
+
+        self._generate()
+        self.assertEqual(self._snapshot(), first)
+
+    def test_refuses_to_generate_twice_with_same_prefix(self):
+        call_command('generate_synthetic_data', '--pieces', '2', '--users', '1', '--orders', '1',
+                     '--blogs', '0', '--collections', '0', '--workers', '1', stdout=StringIO())
+
+        with self.assertRaises(CommandError):
+            call_command('generate_synthetic_data', '--pieces', '2', '--workers', '1', stdout=StringIO())
+
+    def test_second_prefix_does_not_collide_with_first_run(self):
+        self._generate()
+        generator = SyntheticDataGenerator(
+            prefix='otra', seed=7, chunk_size=7, workers=1, write_placeholders=False,
+            end=timezone.make_aware(timezone.datetime(2026, 1, 31)),
+        )
+
+        self.assertFalse(generator.existing())
+        generator.run(pieces=20, users=15, orders=40, blogs=5, collections=3, discounts=4)
+
+        self.assertEqual(Collection.all_objects.count(), 6)
+        self.assertTrue(generator.existing())
+
+    def test_history_has_no_pending_orders_for_the_sweeper(self):
+        self._generate()
+
+        self.assertFalse(Order.all_objects.filter(status='pending').exists())
+        self.assertFalse(Payment.all_objects.filter(status='pending').exists())
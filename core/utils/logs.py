@@ -0,0 +1,140 @@
+"""
+Piezas del logging estructurado: request id por contexto, formatter de JSON
+compacto y un QueueHandler que no formatea en el hilo del request.
+
+Con LOG_QUEUE=True, CoreConfig.ready() pone los handlers configurados en
+LOGGING detrás de colas: el request sólo encola el LogRecord y un hilo
+listener hace el formateo y la escritura (consola, archivo).
+"""
+import atexit
+import copy
+import json
+import logging
+import queue
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+_request_id: ContextVar[str | None] = ContextVar('request_id', default=None)
+_request_started: ContextVar[float | None] = ContextVar('request_started', default=None)
+
+# Atributos propios de LogRecord: todo lo demás en __dict__ vino por `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {
+    'message', 'asctime', 'request_id', 'elapsed_ms', 'taskName',
+}
+
+_listeners: list[QueueListener] = []
+
+
+def bind_request(request_id: str):
+    """Asocia el request id (y el inicio del request) al contexto actual."""
+    return _request_id.set(request_id), _request_started.set(time.perf_counter())
+
+
+def unbind_request(tokens) -> None:
+    id_token, started_token = tokens
+    _request_id.reset(id_token)
+    _request_started.reset(started_token)
+
+
+def current_request_id() -> str | None:
+    return _request_id.get()
+
+
+def install_record_factory() -> None:
+    """Cada LogRecord sale con request_id y ms transcurridos del request en curso."""
+    base_factory = logging.getLogRecordFactory()
+    if getattr(base_factory, 'adds_request_context', False):
+        return
+
+    def factory(*args, **kwargs):
+        record = base_factory(*args, **kwargs)
+        record.request_id = _request_id.get()
+        started = _request_started.get()
+        record.elapsed_ms = round((time.perf_counter() - started) * 1000, 1) if started is not None else None
+        return record
+
+    factory.adds_request_context = True
+    logging.setLogRecordFactory(factory)
+
+
+class JSONFormatter(logging.Formatter):
+    """Una línea JSON por registro; los campos de `extra=` van al primer nivel."""
+
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+            'elapsed_ms': getattr(record, 'elapsed_ms', None),
+            'pid': record.process,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # Record que pasó por DeferredQueueHandler: el traceback ya viene como texto
+            data['exc'] = record.exc_text
+        if record.stack_info:
+            data['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(data, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler.prepare aplica el formatter completo antes de encolar, o sea en
+    el hilo del request. Aquí sólo se hace lo que no puede esperar, igual que la
+    stdlib: `msg % args` (los args pueden cambiar o depender del request cuando
+    el listener los lea) y el traceback a texto. El formateo (JSON, verbose)
+    ocurre en el listener, sólo para los handlers que realmente lo emiten.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def start_queue_logging(logger_names) -> list[QueueListener]:
+    """
+    Sustituye los handlers de cada logger por un DeferredQueueHandler. Los
+    loggers que comparten el mismo conjunto de handlers comparten cola y
+    listener, así cada record llega exactamente a los handlers de antes.
+    """
+    if _listeners:
+        return _listeners
+
+    groups: dict[tuple, list[logging.Logger]] = {}
+    for name in logger_names:
+        logger = logging.getLogger(name or None)
+        if logger.handlers and not any(isinstance(h, QueueHandler) for h in logger.handlers):
+            groups.setdefault(tuple(logger.handlers), []).append(logger)
+
+    for handlers, loggers in groups.items():
+        log_queue = queue.SimpleQueue()
+        listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        listener.start()
+        _listeners.append(listener)
+
+        queue_handler = DeferredQueueHandler(log_queue)
+        for logger in loggers:
+            logger.handlers = [queue_handler]
+
+    # Vaciar las colas al salir para no perder los últimos registros
+    atexit.register(stop_queue_logging)
+    return _listeners
+
+
+def stop_queue_logging() -> None:
+    while _listeners:
+        _listeners.pop().stop()
@@ -0,0 +1,327 @@
+"""
+Métricas por vista en formato de texto de Prometheus.
+
+RequestMetricsMiddleware abre un RequestStats por request y los ganchos de este
+módulo lo van llenando mientras la vista corre:
+
+- consultas SQL y su tiempo, con `connection.execute_wrapper`
+- hits/misses de la cache de Django (get/get_many de los backends configurados)
+- llamadas HTTP salientes por host (Stripe, Banxico, Resend y R2 pasan todos
+  por urllib3)
+
+Al terminar, el request se agrega al MetricsRegistry del proceso. Con
+METRICS_DIR cada worker vuelca su registro a `metrics-<pid>.json` en ese
+directorio (escritura atómica, un solo escritor por archivo) y el endpoint suma
+los archivos de todos los workers; sin METRICS_DIR sólo se ve el proceso que
+atiende el scrape.
+"""
+import atexit
+import glob
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# nombre -> (tipo, ayuda)
+METRICS = {
+    'http_request_duration_seconds': ('histogram', 'Latencia de la respuesta por vista y acción'),
+    'db_queries_total': ('counter', 'Consultas SQL ejecutadas'),
+    'db_query_duration_seconds_total': ('counter', 'Tiempo acumulado en consultas SQL'),
+    'cache_hits_total': ('counter', 'Lecturas de la cache de Django que encontraron la clave'),
+    'cache_misses_total': ('counter', 'Lecturas de la cache de Django que no encontraron la clave'),
+    'outbound_http_requests_total': ('counter', 'Llamadas HTTP salientes por host'),
+    'outbound_http_duration_seconds_total': ('counter', 'Tiempo acumulado en llamadas HTTP salientes'),
+    'geoip_cache_hits_total': ('counter', 'Hits del LRU de GeoIP'),
+    'geoip_cache_misses_total': ('counter', 'Misses del LRU de GeoIP'),
+    'geoip_cache_size': ('gauge', 'Entradas en el LRU de GeoIP'),
+    'geoip_lookups_skipped_total': ('counter', 'Requests que no consultaron GeoIP por GEOIP_SKIP_PATHS'),
+}
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    # host -> [llamadas, segundos]
+    http: dict = field(default_factory=dict)
+
+
+_current: ContextVar[RequestStats | None] = ContextVar('request_metrics', default=None)
+_in_http_call: ContextVar[bool] = ContextVar('in_http_call', default=False)
+
+
+def bind_stats(stats: RequestStats):
+    return _current.set(stats)
+
+
+def unbind_stats(token) -> None:
+    _current.reset(token)
+
+
+def _key(name: str, labels: dict) -> str:
+    # Clave serializable para poder volcarla a JSON y sumarla entre procesos
+    return json.dumps([name, sorted(labels.items())], separators=(',', ':'))
+
+
+class MetricsRegistry:
+
+    def __init__(self, directory=None, flush_interval=10.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = {}
+        # clave -> [conteo por bucket..., +Inf, suma]
+        self._histograms: dict[str, list] = {}
+        self._collectors = {}
+        self._last_flush = time.monotonic()
+
+    def inc(self, name: str, labels: dict, value: float = 1.0) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, labels: dict, value: float) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            buckets = self._histograms.get(key)
+            if buckets is None:
+                buckets = self._histograms[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+            index = next((i for i, bound in enumerate(LATENCY_BUCKETS) if value <= bound), len(LATENCY_BUCKETS))
+            buckets[index] += 1
+            buckets[-1] += value
+
+    def add_collector(self, name: str, collect) -> None:
+        """`collect()` retorna {métrica: valor} leído en el momento del volcado (p. ej. el LRU de GeoIP)."""
+        self._collectors[name] = collect
+
+    def snapshot(self) -> dict:
+        gauges = {}
+        for collect in list(self._collectors.values()):
+            for name, value in (collect() or {}).items():
+                if value is not None:
+                    gauges[_key(name, {})] = float(value)
+
+        with self._lock:
+            return {
+                'counters': {**dict(self._counters), **gauges},
+                'histograms': {key: list(values) for key, values in self._histograms.items()},
+            }
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.directory, f'metrics-{pid}.json')
+
+    def flush(self, force: bool = False) -> None:
+        if not self.directory:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.flush_interval:
+            return
+        self._last_flush = now
+
+        data = self.snapshot()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.metrics-')
+            with os.fdopen(fd, 'w') as fh:
+                json.dump(data, fh, separators=(',', ':'))
+            os.replace(tmp_path, self._path(os.getpid()))
+        except OSError:
+            logger.warning("No se pudieron volcar las métricas", extra={"directory": self.directory}, exc_info=True)
+
+    def collect(self) -> dict:
+        """Snapshot sumado de todos los workers (o sólo de este proceso sin METRICS_DIR)."""
+        if not self.directory:
+            return self.snapshot()
+
+        self.flush(force=True)
+        merged = {'counters': {}, 'histograms': {}}
+        for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+            try:
+                with open(path) as fh:
+                    data = json.load(fh)
+            except (OSError, ValueError):
+                continue
+            for key, value in data.get('counters', {}).items():
+                merged['counters'][key] = merged['counters'].get(key, 0.0) + value
+            for key, values in data.get('histograms', {}).items():
+                current = merged['histograms'].get(key)
+                merged['histograms'][key] = values if current is None else [a + b for a, b in zip(current, values)]
+        return merged
+
+
+_registry: MetricsRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> MetricsRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = MetricsRegistry(
+                    directory=getattr(settings, 'METRICS_DIR', None),
+                    flush_interval=getattr(settings, 'METRICS_FLUSH_INTERVAL', 10.0),
+                )
+                atexit.register(_registry.flush, True)
+    return _registry
+
+
+def record_request(view: str, action: str, method: str, status: int, seconds: float, stats: RequestStats) -> None:
+    registry = get_registry()
+    labels = {'view': view, 'action': action}
+
+    registry.observe('http_request_duration_seconds', {**labels, 'method': method, 'status': str(status)}, seconds)
+    if stats.queries:
+        registry.inc('db_queries_total', labels, stats.queries)
+        registry.inc('db_query_duration_seconds_total', labels, stats.db_seconds)
+    if stats.cache_hits:
+        registry.inc('cache_hits_total', labels, stats.cache_hits)
+    if stats.cache_misses:
+        registry.inc('cache_misses_total', labels, stats.cache_misses)
+    for host, (calls, elapsed) in stats.http.items():
+        registry.inc('outbound_http_requests_total', {**labels, 'host': host}, calls)
+        registry.inc('outbound_http_duration_seconds_total', {**labels, 'host': host}, elapsed)
+
+    registry.flush()
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render(data: dict) -> str:
+    """Texto de exposición de Prometheus (version 0.0.4)."""
+    series: dict[str, list] = {}
+    for key, value in data['counters'].items():
+        name, labels = json.loads(key)
+        series.setdefault(name, []).append((name, labels, value))
+
+    for key, values in data['histograms'].items():
+        name, labels = json.loads(key)
+        cumulative = 0
+        for bound, count in zip((*LATENCY_BUCKETS, '+Inf'), values[:-1]):
+            cumulative += count
+            series.setdefault(name, []).append((f'{name}_bucket', [*labels, ['le', str(bound)]], cumulative))
+        series[name].append((f'{name}_sum', labels, values[-1]))
+        series[name].append((f'{name}_count', labels, cumulative))
+
+    lines = []
+    for name in sorted(series):
+        kind, help_text = METRICS.get(name, ('untyped', ''))
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for sample, labels, value in series[name]:
+            lines.append(f'{sample}{_format_labels(labels)} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+# ---------------------------------------------------------------- ganchos
+
+def record_query(execute, sql, params, many, context):
+    """Para `connection.execute_wrapper`: cuenta la consulta y su tiempo en el request actual."""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+_MISSING = object()
+
+
+def _instrument_cache_class(cls) -> None:
+    if getattr(cls.get, 'records_metrics', False):
+        return
+    original_get = cls.get
+    original_get_many = cls.get_many
+
+    def get(self, key, default=None, version=None, **kwargs):
+        value = original_get(self, key, _MISSING, version, **kwargs)
+        stats = _current.get()
+        if stats is not None:
+            if value is _MISSING:
+                stats.cache_misses += 1
+            else:
+                stats.cache_hits += 1
+        return default if value is _MISSING else value
+
+    def get_many(self, keys, version=None, **kwargs):
+        keys = list(keys)
+        stats = _current.get()
+        # BaseCache.get_many llama a self.get por clave: no contarlas dos veces
+        token = _current.set(None)
+        try:
+            found = original_get_many(self, keys, version=version, **kwargs)
+        finally:
+            _current.reset(token)
+        if stats is not None:
+            stats.cache_hits += len(found)
+            stats.cache_misses += len(keys) - len(found)
+        return found
+
+    get.records_metrics = True
+    cls.get = get
+    cls.get_many = get_many
+
+
+def _instrument_urllib3() -> None:
+    from urllib3.connectionpool import HTTPConnectionPool
+
+    if getattr(HTTPConnectionPool.urlopen, 'records_metrics', False):
+        return
+    original_urlopen = HTTPConnectionPool.urlopen
+
+    def urlopen(self, *args, **kwargs):
+        stats = _current.get()
+        # urlopen se llama a sí mismo en reintentos y redirecciones: medir sólo la externa
+        if stats is None or _in_http_call.get():
+            return original_urlopen(self, *args, **kwargs)
+
+        token = _in_http_call.set(True)
+        started = time.perf_counter()
+        try:
+            return original_urlopen(self, *args, **kwargs)
+        finally:
+            _in_http_call.reset(token)
+            calls = stats.http.setdefault(self.host or 'unknown', [0, 0.0])
+            calls[0] += 1
+            calls[1] += time.perf_counter() - started
+
+    urlopen.records_metrics = True
+    HTTPConnectionPool.urlopen = urlopen
+
+
+def install_instrumentation() -> None:
+    """Engancha la cache y urllib3; las consultas SQL se enganchan por request en el middleware."""
+    from django.core.cache import caches
+
+    for alias in settings.CACHES:
+        _instrument_cache_class(type(caches[alias]))
+    _instrument_urllib3()
@@ -0,0 +1,61 @@
+"""
+Muestreo de trazas de Sentry por ruta.
+
+Con traces_sample_rate=1.0 cada request abre una transacción con sus spans y
+se envía completa; en el catálogo eso es casi todo tráfico de lectura que no
+aporta nada nuevo. `traces_sampler` decide por prefijo de ruta y método con la
+tabla SENTRY_TRACES_RATES: checkout y webhook completos, lecturas de /pieces/
+con una tasa baja, health checks y debug nunca.
+
+Los errores no pasan por aquí: los eventos de error se envían según
+`sample_rate` (1.0), estén o no dentro de una transacción muestreada;
+`before_send` sólo quita los duplicados que ya envió SentryErrorHandlerMixin.
+"""
+from django.conf import settings
+
+
+def traces_rate(path: str, method: str) -> float:
+    """Tasa de la primera entrada de SENTRY_TRACES_RATES que coincide; si ninguna, la default."""
+    method = (method or '').upper()
+    for prefix, methods, rate in settings.SENTRY_TRACES_RATES:
+        if path.startswith(prefix) and (methods is None or method in methods):
+            return rate
+    return settings.SENTRY_TRACES_DEFAULT_RATE
+
+
+def _request_line(sampling_context) -> tuple[str | None, str | None]:
+    environ = sampling_context.get('wsgi_environ')
+    if environ is not None:
+        return environ.get('PATH_INFO', ''), environ.get('REQUEST_METHOD')
+
+    scope = sampling_context.get('asgi_scope')
+    if scope is not None and scope.get('type') == 'http':
+        return scope.get('path', ''), scope.get('method')
+
+    return None, None
+
+
+def traces_sampler(sampling_context) -> float:
+    # Si el servicio que llama ya decidió (header sentry-trace), respetarlo para
+    # no partir la traza distribuida
+    parent_sampled = sampling_context.get('parent_sampled')
+    if parent_sampled is not None:
+        return float(parent_sampled)
+
+    path, method = _request_line(sampling_context)
+    if path is None:
+        # Fuera de un request HTTP (management commands, tareas)
+        return settings.SENTRY_TRACES_DEFAULT_RATE
+    return traces_rate(path, method)
+
+
+def before_send(event, hint):
+    """
+    Descarta los errores que SentryErrorHandlerMixin ya envió con su contexto
+    (tags, extra, usuario) y que luego vuelve a reportar la integración de Django
+    al re-lanzarse.
+    """
+    exc_info = hint.get('exc_info')
+    if exc_info and getattr(exc_info[1], '_sentry_captured', False):
+        return None
+    return event
@@ -23,4 +23,90 @@ def delete_if_changed(previous, new_instance, fields: list[str]):
     """Borra archivos antiguos solo si el campo cambió."""
     for field in fields:
         if file_field_changed(previous, new_instance, field):
-            delete_storage_file(getattr(previous, field))
\ No newline at end of file
+            delete_storage_file(getattr(previous, field))
+
+def iter_storage_pages(storage, prefix='', page_size=1000):
+    """
+    Recorre el storage página por página sin cargar todo el listado en memoria.
+    Cada página es una lista de tuplas (name, modified_at).
+    En S3/R2 usa el paginador de list_objects_v2; en local recorre carpetas con listdir.
+    """
+    if hasattr(storage, 'bucket'):
+        yield from _iter_s3_pages(storage, prefix, page_size)
+    else:
+        yield from _iter_local_pages(storage, prefix, page_size)
+
+
+def _iter_s3_pages(storage, prefix, page_size):
+    location = (storage.location or '').strip('/')
+    key_prefix = '/'.join(p for p in (location, prefix.strip('/')) if p)
+    client = storage.bucket.meta.client
+    paginator = client.get_paginator('list_objects_v2')
+
+    for page in paginator.paginate(
+        Bucket=storage.bucket_name,
+        Prefix=key_prefix,
+        PaginationConfig={'PageSize': page_size},
+    ):
+        entries = []
+        for obj in page.get('Contents', []):
+            key = obj['Key']
+            if location:
+                key = key[len(location) + 1:]
+            entries.append((key, obj['LastModified']))
+        if entries:
+            yield entries
+
+
+def _iter_local_pages(storage, prefix, page_size):
+    pending_dirs = [prefix.strip('/')]
+    page = []
+
+    while pending_dirs:
+        current = pending_dirs.pop()
+        try:
+            dirs, files = storage.listdir(current)
+        except FileNotFoundError:
+            continue
+
+        pending_dirs.extend(f'{current}/{d}' if current else d for d in dirs)
+        for filename in files:
+            name = f'{current}/{filename}' if current else filename
+            page.append((name, storage.get_modified_time(name)))
+            if len(page) >= page_size:
+                yield page
+                page = []
+
+    if page:
+        yield page
+
+
+def delete_storage_names(storage, names: list[str]) -> tuple[int, list[tuple[str, str]]]:
+    """
+    Borra un lote de archivos. En S3/R2 usa un solo delete_objects (máx. 1000 llaves);
+    en cualquier otro backend cae a storage.delete por archivo.
+    Retorna (borrados, [(name, error)]) con los que no se pudieron borrar.
+    """
+    if not names:
+        return 0, []
+
+    failed = []
+    if hasattr(storage, 'bucket'):
+        client = storage.bucket.meta.client
+        by_key = {storage._normalize_name(name): name for name in names}
+        response = client.delete_objects(
+            Bucket=storage.bucket_name,
+            Delete={'Objects': [{'Key': key} for key in by_key], 'Quiet': True},
+        )
+        # Con Quiet sólo vuelven las llaves que fallaron (AccessDenied, InternalError...)
+        for error in response.get('Errors', []):
+            name = by_key.get(error.get('Key'), error.get('Key'))
+            failed.append((name, f"{error.get('Code', '')}: {error.get('Message', '')}"))
+        return len(names) - len(failed), failed
+
+    for name in names:
+        try:
+            storage.delete(name)
+        except OSError as e:
+            failed.append((name, str(e)))
+    return len(names) - len(failed), failed
@@ -1,3 +1,16 @@
-from django.shortcuts import render
+from django.http import HttpResponse
+from rest_framework.permissions import IsAdminUser
+from rest_framework.views import APIView
 
-# Create your views here.
+from core.utils.metrics import get_registry, render
+
+
+class MetricsView(APIView):
+    """Métricas de todos los workers en formato de texto de Prometheus; sólo staff."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(
+            render(get_registry().collect()),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
@@ -1,18 +1,94 @@
 #!/bin/sh
 # entrypoint.sh — Se ejecuta cada vez que el contenedor arranca
+#
+# Rol del contenedor (primer argumento o PROCESS_ROLE):
+#   web        migraciones, estáticos y gunicorn
+#   worker     colas fuera del request: correos, eventos de Stripe y
+#              cancelaciones de PaymentIntents
+#   scheduler  barridos periódicos: apartados vencidos y pedidos abandonados
+#   all        (por defecto) worker y scheduler en segundo plano más web, para
+#              despliegues de un solo contenedor (Railway)
+#
+# Sin worker, los webhooks de Stripe se guardan pero nunca se aplican (ningún
+# pedido pasa a pagado) y los correos se quedan en la cola.
 
 set -e  # Si algo falla, detener todo
 
-echo "▶ Corriendo migraciones..."
-python manage.py migrate --noinput
+ROLE="${1:-${PROCESS_ROLE:-all}}"
 
-echo "▶ Colectando archivos estáticos..."
-python manage.py collectstatic --noinput
+# Mantiene vivo un comando: si termina o falla, se vuelve a lanzar
+supervise() {
+    while true; do
+        python manage.py "$@" || echo "✖ $1 terminó con error"
+        echo "↻ Reiniciando $1 en 5s..."
+        sleep 5
+    done
+}
 
-echo "▶ Iniciando servidor..."
-exec gunicorn config.wsgi:application \
-    --bind 0.0.0.0:$PORT \
-    --workers 3 \
-    --timeout 120 \
-    --access-logfile - \
-    --error-logfile -
\ No newline at end of file
+start_workers() {
+    echo "▶ Iniciando workers (correos, eventos de Stripe, cancelaciones)..."
+    supervise process_email_outbox --loop --workers "${EMAIL_WORKERS:-4}" &
+    supervise process_stripe_events --loop --workers "${STRIPE_EVENT_WORKERS:-2}" &
+    supervise process_stripe_cancellations --loop --workers "${STRIPE_CANCEL_WORKERS:-8}" &
+}
+
+start_scheduler() {
+    echo "▶ Iniciando barridos periódicos cada ${SCHEDULER_INTERVAL:-60}s..."
+    while true; do
+        python manage.py release_expired_reservations || echo "✖ release_expired_reservations falló"
+        # Las cancelaciones en Stripe las hace process_stripe_cancellations
+        python manage.py expire_pending_orders --no-cancel || echo "✖ expire_pending_orders falló"
+        sleep "${SCHEDULER_INTERVAL:-60}"
+    done &
+}
+
+migrate() {
+    echo "▶ Corriendo migraciones..."
+    python manage.py migrate --noinput
+}
+
+start_web() {
+    echo "▶ Colectando archivos estáticos..."
+    python manage.py collectstatic --noinput
+
+    # Métricas de los workers de gunicorn: cada uno vuelca su registro aquí y
+    # /api/v1/metrics/ los suma. En cada arranque se borran sólo esos archivos (los
+    # contadores empiezan en 0); METRICS_DIR puede ser un directorio compartido
+    export METRICS_DIR="${METRICS_DIR:-/tmp/metrics}"
+    mkdir -p "$METRICS_DIR"
+    rm -f "$METRICS_DIR"/metrics-*.json "$METRICS_DIR"/.metrics-*
+
+    echo "▶ Iniciando servidor..."
+    exec gunicorn config.wsgi:application \
+        --bind 0.0.0.0:$PORT \
+        --workers 3 \
+        --timeout 120 \
+        --access-logfile - \
+        --error-logfile -
+}
+
+case "$ROLE" in
+    web)
+        migrate
+        start_web
+        ;;
+    worker)
+        start_workers
+        wait
+        ;;
+    scheduler)
+        start_scheduler
+        wait
+        ;;
+    all)
+        # Las migraciones van primero: los workers necesitan las tablas
+        migrate
+        start_workers
+        start_scheduler
+        start_web
+        ;;
+    *)
+        echo "Rol desconocido: $ROLE (web | worker | scheduler | all)"
+        exit 1
+        ;;
+esac
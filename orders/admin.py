@@ -1,10 +1,20 @@
 from django.contrib import admin
 
 # Register your models here.
+from collections import Counter
+
+from django import forms
 from django.contrib import admin
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.template.response import TemplateResponse
+from django.utils import timezone
 from django.utils.html import format_html
 
 from core.mixins import SoftDeleteAdminMixin
+from core.utils.validations import validate_date_range
+from orders.service import COUPON_CODE_MIN_LENGTH, CouponBatchService, CouponService
 from .models import (
     Coupon,
     ExchangeRate,
@@ -13,6 +23,8 @@ from .models import (
     ShippingTracking,
     Payment,
     CouponUsage,
+    PaymentIntentCancellation,
+    StripeEvent,
 )
 
 
@@ -45,6 +57,40 @@ class ShippingTrackingInline(SoftDeleteAdminMixin, admin.TabularInline):
     tracking_link.short_description = "Tracking"
 
 
+# ---------- FORMS ----------
+
+class CouponBatchForm(forms.Form):
+    count = forms.IntegerField(label="Cantidad", min_value=1, max_value=100000)
+    prefix = forms.CharField(label="Prefijo", max_length=20, required=False)
+    percentage = forms.DecimalField(label="Porcentaje", max_digits=5, decimal_places=2, min_value=0.01, max_value=100)
+    valid_from = forms.DateField(label="Válido desde", widget=forms.DateInput(attrs={"type": "date"}))
+    valid_until = forms.DateField(label="Válido hasta", widget=forms.DateInput(attrs={"type": "date"}))
+    max_uses = forms.IntegerField(label="Usos por cupón", min_value=1, required=False, initial=1)
+    length = forms.IntegerField(
+        label="Caracteres aleatorios", min_value=COUPON_CODE_MIN_LENGTH, required=False, initial=8,
+    )
+
+    def clean_length(self):
+        return self.cleaned_data["length"] or 8
+
+    def clean(self):
+        cleaned = super().clean()
+        if cleaned.get("count") and "length" in cleaned:
+            try:
+                CouponBatchService.validate(cleaned["count"], cleaned.get("prefix", ""), cleaned["length"])
+            except ValidationError as e:
+                self.add_error(None, e)
+        try:
+            validate_date_range(cleaned.get("valid_from"), cleaned.get("valid_until"))
+        except ValidationError as e:
+            # validate_date_range reporta start_date/end_date; aquí los campos son valid_from/valid_until
+            fields = {"start_date": "valid_from", "end_date": "valid_until"}
+            for key, messages in e.message_dict.items():
+                for message in messages:
+                    self.add_error(fields.get(key), message)
+        return cleaned
+
+
 # ---------- ADMINS ----------
 
 @admin.register(Coupon)
@@ -74,9 +120,69 @@ class CouponAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
 
     readonly_fields = ("used_count",)
 
-    @admin.display(description="Usos")
-    def used_count(self, obj):
-        return obj.usages.count()
+    actions = [*SoftDeleteAdminMixin.actions, "action_generate_batch"]
+
+    # Restaurar/desactivar hacen queryset.update: no hay señales que invaliden
+    # CouponService, así que se limpia la cache aquí
+    def _invalidate_cache(self, queryset):
+        CouponService.invalidate_many(queryset.values_list("code", flat=True))
+
+    @admin.action(description="Restaurar registros seleccionados")
+    def action_restore(self, request, queryset):
+        super().action_restore(request, queryset)
+        self._invalidate_cache(queryset)
+
+    @admin.action(description="Desactivar registros seleccionados")
+    def action_deactivate(self, request, queryset):
+        super().action_deactivate(request, queryset)
+        self._invalidate_cache(queryset)
+
+    @admin.action(description="Generar lote de cupones (usa el seleccionado como plantilla)")
+    def action_generate_batch(self, request, queryset):
+        if "apply" in request.POST:
+            form = CouponBatchForm(request.POST)
+            if form.is_valid():
+                data = form.cleaned_data
+                try:
+                    # Todo el lote se crea antes de responder: si el cliente corta la descarga
+                    # no quedan cupones en la BD cuyos códigos nunca se entregaron
+                    with transaction.atomic():
+                        batches = list(CouponBatchService.generate(
+                            count=data["count"],
+                            prefix=data["prefix"],
+                            percentage=data["percentage"],
+                            valid_from=data["valid_from"],
+                            valid_until=data["valid_until"],
+                            max_uses=data["max_uses"],
+                            length=data["length"],
+                        ))
+                except ValidationError as e:
+                    form.add_error(None, e)
+                else:
+                    response = StreamingHttpResponse(
+                        CouponBatchService.stream_csv(
+                            batches, data["percentage"], data["valid_from"], data["valid_until"], data["max_uses"]
+                        ),
+                        content_type="text/csv",
+                    )
+                    response["Content-Disposition"] = f'attachment; filename="cupones-{data["prefix"] or "lote"}.csv"'
+                    return response
+        else:
+            template = queryset.first()
+            form = CouponBatchForm(initial={
+                "percentage": template.percentage,
+                "valid_from": template.valid_from,
+                "valid_until": template.valid_until,
+                "max_uses": template.max_uses or 1,
+            })
+
+        return TemplateResponse(request, "admin/orders/coupon/generate_coupons.html", {
+            **self.admin_site.each_context(request),
+            "title": "Generar lote de cupones",
+            "form": form,
+            "queryset": queryset[:1],
+            "opts": self.model._meta,
+        })
 
     @admin.display(boolean=True, description="Vigente")
     def is_currently_valid(self, obj):
@@ -171,6 +277,41 @@ class CouponUsageAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
     list_filter = ("coupon", "created_at")
     search_fields = ("order__id", "coupon__code", "user__username")
 
+    # Restaurar/desactivar/borrar en lote hacen queryset.update (sin señales):
+    # used_count del cupón se ajusta aquí con los usos que de verdad cambian de estado
+    def delete_queryset(self, request, queryset):
+        # Soft delete como delete_model (obj.delete()), no borrado físico
+        with transaction.atomic():
+            changed = Counter(
+                queryset.select_for_update()
+                .filter(is_active=True, deleted_at__isnull=True)
+                .values_list("coupon_id", flat=True)
+            )
+            queryset.update(deleted_at=timezone.now(), is_active=False)
+            CouponService.adjust_used_count({coupon_id: -count for coupon_id, count in changed.items()})
+
+    @admin.action(description="Restaurar registros seleccionados")
+    def action_restore(self, request, queryset):
+        with transaction.atomic():
+            changed = Counter(
+                queryset.select_for_update()
+                .exclude(is_active=True, deleted_at__isnull=True)
+                .values_list("coupon_id", flat=True)
+            )
+            super().action_restore(request, queryset)
+            CouponService.adjust_used_count(changed)
+
+    @admin.action(description="Desactivar registros seleccionados")
+    def action_deactivate(self, request, queryset):
+        with transaction.atomic():
+            changed = Counter(
+                queryset.select_for_update()
+                .filter(is_active=True, deleted_at__isnull=True)
+                .values_list("coupon_id", flat=True)
+            )
+            super().action_deactivate(request, queryset)
+            CouponService.adjust_used_count({coupon_id: -count for coupon_id, count in changed.items()})
+
 @admin.register(ExchangeRate)
 class ExchangeRateAdmin(admin.ModelAdmin):
     list_display = ("id","usd_to_mxn", "fetched_at", "source")
@@ -186,4 +327,36 @@ class ExchangeRateAdmin(admin.ModelAdmin):
         ("Metadata", {
             "fields": ("fetched_at", "source")
         }),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(StripeEvent)
+class StripeEventAdmin(admin.ModelAdmin):
+    list_display = ("id", "event_id", "event_type", "status", "attempts", "created_at", "processed_at")
+    list_filter = ("status", "event_type")
+    search_fields = ("event_id",)
+    readonly_fields = ("event_id", "event_type", "payload", "last_error", "locked_at", "processed_at", "created_at")
+    actions = ["action_retry"]
+
+    @admin.action(description="Reprocesar eventos seleccionados")
+    def action_retry(self, request, queryset):
+        updated = queryset.exclude(status='processed').update(
+            status='pending', attempts=0, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f"{updated} evento(s) encolados de nuevo.")
+
+
+@admin.register(PaymentIntentCancellation)
+class PaymentIntentCancellationAdmin(admin.ModelAdmin):
+    list_display = ("id", "payment_intent_id", "status", "attempts", "next_attempt_at", "processed_at")
+    list_filter = ("status",)
+    search_fields = ("payment_intent_id",)
+    readonly_fields = ("payment_intent_id", "last_error", "locked_at", "processed_at", "created_at")
+    actions = ["action_retry"]
+
+    @admin.action(description="Reintentar cancelaciones seleccionadas")
+    def action_retry(self, request, queryset):
+        updated = queryset.exclude(status='done').update(
+            status='pending', attempts=0, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f"{updated} cancelación(es) encoladas de nuevo.")
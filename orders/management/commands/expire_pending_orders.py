@@ -0,0 +1,89 @@
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.service import OrderService, PaymentIntentCancellationService
+
+
+class Command(BaseCommand):
+    help = 'Expira pedidos pendientes abandonados y cancela sus PaymentIntents'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-minutes',
+            type=int,
+            default=settings.PENDING_ORDER_MAX_AGE_MINUTES,
+            help='Antigüedad mínima del pedido pendiente para darlo por abandonado'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Pedidos por página (keyset) y por transacción'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Cancelaciones en Stripe en paralelo'
+        )
+        parser.add_argument(
+            '--no-cancel',
+            action='store_true',
+            help='Sólo expirar y encolar; dejar las cancelaciones a process_stripe_cancellations'
+        )
+        parser.add_argument(
+            '--stub',
+            action='store_true',
+            help=(
+                'No llamar a Stripe: simular cada cancelación con --stub-latency-ms de espera. '
+                'Sólo con DEBUG: marca como hechas las cancelaciones de la cola real'
+            )
+        )
+        parser.add_argument(
+            '--stub-latency-ms',
+            type=int,
+            default=150,
+            help='Latencia simulada por cancelación en modo --stub'
+        )
+
+    def handle(self, *args, **options):
+        if options['stub'] and not settings.DEBUG:
+            # Los PaymentIntents quedarían vivos en Stripe sin nada en la cola que los cancele
+            raise CommandError('--stub sólo se permite con DEBUG (vacía la cola sin llamar a Stripe)')
+
+        started = time.monotonic()
+        stats = OrderService.sweep_abandoned_orders(
+            older_than=timedelta(minutes=options['older_than_minutes']),
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['expired']} pedidos expirados de {stats['scanned']} revisados "
+            f"en {stats['pages']} páginas (select {stats['select_seconds']:.2f}s, "
+            f"update {stats['expire_seconds']:.2f}s)"
+        ))
+
+        if options['no_cancel']:
+            return
+
+        cancel = None
+        if options['stub']:
+            latency = options['stub_latency_ms'] / 1000
+
+            def cancel(row):
+                time.sleep(latency * random.uniform(0.5, 1.5))
+                return None
+
+        cancel_started = time.monotonic()
+        result = PaymentIntentCancellationService.drain(workers=options['workers'], cancel=cancel)
+        cancel_seconds = time.monotonic() - cancel_started
+        rate = result['cancelled'] / cancel_seconds if cancel_seconds > 0 else 0
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['cancelled']} PaymentIntents cancelados, {result['retried']} reintentos, "
+            f"{result['dead']} descartados en {cancel_seconds:.2f}s ({rate:.1f}/s)"
+        ))
+        self.stdout.write(f"Tiempo total: {time.monotonic() - started:.2f}s")
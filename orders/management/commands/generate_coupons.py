@@ -0,0 +1,80 @@
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.utils.validations import validate_date_range
+from orders.service import CouponBatchService
+
+
+class Command(BaseCommand):
+    help = 'Genera cupones únicos en lote para una campaña y escribe los códigos en CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, required=True, help='Cantidad de cupones')
+        parser.add_argument('--prefix', default='', help='Prefijo de los códigos, p. ej. BUENFIN-')
+        parser.add_argument('--percentage', type=Decimal, required=True, help='Porcentaje de descuento')
+        parser.add_argument('--valid-from', type=date.fromisoformat, required=True, help='AAAA-MM-DD')
+        parser.add_argument('--valid-until', type=date.fromisoformat, required=True, help='AAAA-MM-DD')
+        parser.add_argument(
+            '--max-uses',
+            type=int,
+            default=1,
+            help='Usos por cupón (0 = ilimitado)'
+        )
+        parser.add_argument('--length', type=int, default=8, help='Caracteres aleatorios por código (mínimo 4)')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Filas por bulk_create')
+        parser.add_argument('--output', help='Archivo CSV de salida (por defecto stdout)')
+
+    def handle(self, *args, **options):
+        if options['count'] < 1:
+            raise CommandError('--count debe ser mayor a 0')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size debe ser mayor a 0')
+        if not (Decimal('0') < options['percentage'] <= Decimal('100')):
+            raise CommandError('--percentage debe estar entre 0 y 100')
+        try:
+            validate_date_range(options['valid_from'], options['valid_until'])
+        except ValidationError as e:
+            raise CommandError('; '.join(e.messages))
+        try:
+            CouponBatchService.validate(options['count'], options['prefix'], options['length'])
+        except ValidationError as e:
+            raise CommandError(f"--length: {'; '.join(e.messages)}")
+
+        max_uses = options['max_uses'] or None
+        started = time.monotonic()
+
+        try:
+            if options['output']:
+                with open(options['output'], 'w', newline='') as fh:
+                    self._generate(fh.write, options, max_uses)
+            else:
+                self._generate(lambda text: self.stdout.write(text, ending=''), options, max_uses)
+        except ValidationError as e:
+            raise CommandError('; '.join(e.messages))
+
+        self.stderr.write(self.style.SUCCESS(
+            f"{options['count']} cupones generados en {time.monotonic() - started:.2f}s"
+        ))
+
+    def _generate(self, write, options, max_uses):
+        # Todo el lote o nada: si algo falla no quedan cupones creados sin su CSV
+        with transaction.atomic():
+            batches = CouponBatchService.generate(
+                count=options['count'],
+                prefix=options['prefix'],
+                percentage=options['percentage'],
+                valid_from=options['valid_from'],
+                valid_until=options['valid_until'],
+                max_uses=max_uses,
+                length=options['length'],
+                chunk_size=options['chunk_size'],
+            )
+            for text in CouponBatchService.stream_csv(
+                batches, options['percentage'], options['valid_from'], options['valid_until'], max_uses
+            ):
+                write(text)
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.service import PaymentIntentCancellationService
+
+
+class Command(BaseCommand):
+    help = 'Cancela en Stripe los PaymentIntents de pedidos expirados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Llamadas a Stripe en paralelo por lote'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Cancelaciones reservadas en cada vuelta'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='No terminar al vaciar la cola; volver a revisar cada --interval segundos'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=10,
+            help='Segundos entre revisiones en modo --loop'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            stats = PaymentIntentCancellationService.drain(
+                workers=options['workers'],
+                batch_size=options['batch_size'],
+            )
+            if any(stats.values()):
+                self.stdout.write(self.style.SUCCESS(
+                    f"{stats['cancelled']} cancelados, {stats['retried']} reintentos, "
+                    f"{stats['dead']} descartados"
+                ))
+
+            if not options['loop']:
+                if not any(stats.values()):
+                    self.stdout.write('Sin cancelaciones pendientes')
+                return
+            time.sleep(options['interval'])
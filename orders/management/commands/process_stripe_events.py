@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.service import StripeEventService
+
+
+class Command(BaseCommand):
+    help = 'Aplica los webhooks de Stripe guardados en StripeEvent'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=2,
+            help='Hilos que procesan eventos en paralelo (SKIP LOCKED)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20,
+            help='Eventos reservados por cada worker en cada vuelta'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='No terminar al vaciar la cola; volver a revisar cada --interval segundos'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2,
+            help='Segundos entre revisiones en modo --loop'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            stats = StripeEventService.drain(
+                workers=options['workers'],
+                batch_size=options['batch_size'],
+            )
+            if stats['processed'] or stats['failed']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"{stats['processed']} eventos procesados, {stats['failed']} con error"
+                ))
+
+            if not options['loop']:
+                if not (stats['processed'] or stats['failed']):
+                    self.stdout.write('Sin eventos pendientes')
+                return
+            time.sleep(options['interval'])
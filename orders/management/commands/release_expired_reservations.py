@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from orders.service import ReservationService
+
+
+class Command(BaseCommand):
+    help = 'Marca como expirados los apartados de stock vencidos'
+
+    def handle(self, *args, **options):
+        expired = ReservationService.sweep_expired()
+        self.stdout.write(self.style.SUCCESS(f'{expired} apartados expirados'))
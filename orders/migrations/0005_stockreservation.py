@@ -0,0 +1,32 @@
+# Generated by Django 5.2.12 on 2026-10-19 00:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_stripeevent'),
+        ('pieces', '0007_piece_quantity_non_negative'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('active', 'Active'), ('consumed', 'Consumed'), ('released', 'Released'), ('expired', 'Expired')], default='active', max_length=10)),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='orders.order')),
+                ('piece', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='pieces.piece')),
+            ],
+            options={
+                'verbose_name': 'Apartado de stock',
+                'verbose_name_plural': 'Apartados de stock',
+                'indexes': [models.Index(fields=['piece', 'status', 'expires_at'], name='reservation_piece_active_idx'), models.Index(fields=['status', 'expires_at'], name='reservation_status_exp_idx')],
+            },
+        ),
+    ]
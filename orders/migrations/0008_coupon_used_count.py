@@ -0,0 +1,36 @@
+# Generated by Django 5.2.12 on 2026-10-19 01:09
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_used_count(apps, schema_editor):
+    Coupon = apps.get_model('orders', 'Coupon')
+    CouponUsage = apps.get_model('orders', 'CouponUsage')
+    usages = (
+        CouponUsage.objects
+        .filter(coupon=OuterRef('pk'), deleted_at__isnull=True, is_active=True)
+        .values('coupon')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    Coupon.objects.update(
+        used_count=Coalesce(Subquery(usages, output_field=IntegerField()), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_order_status_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coupon',
+            name='used_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Usos'),
+        ),
+        migrations.RunPython(backfill_used_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.12 on 2026-10-19 01:16
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+def normalize_codes(apps, schema_editor):
+    """
+    Pasa los códigos a mayúsculas antes de la restricción. Si dos códigos sólo
+    difieren en mayúsculas, el que ya estaba en mayúsculas (o el más antiguo)
+    conserva el código y los demás quedan con su id como sufijo.
+    """
+    Coupon = apps.get_model('orders', 'Coupon')
+    rows = list(Coupon.objects.values_list('id', 'code'))
+    # Primero los que ya están normalizados: no cambian y reservan su código
+    rows.sort(key=lambda row: (row[1] != row[1].strip().upper(), row[0]))
+
+    taken = set()
+    for pk, code in rows:
+        target = code.strip().upper()
+        if target in taken:
+            target = f'{target[:90]}-{pk}'
+        taken.add(target)
+        if target != code:
+            Coupon.objects.filter(pk=pk).update(code=target)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_coupon_used_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_codes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='coupon',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Upper('code'), name='coupon_code_upper_unique'),
+        ),
+    ]
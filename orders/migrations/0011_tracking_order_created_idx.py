@@ -0,0 +1,17 @@
+# Generated by Django 5.2.12 on 2026-10-19 01:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_order_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shippingtracking',
+            index=models.Index(fields=['order', '-created_at'], name='tracking_order_created_idx'),
+        ),
+    ]
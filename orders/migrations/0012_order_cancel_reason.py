@@ -0,0 +1,18 @@
+# Generated by Django 5.2.12 on 2026-10-19 03:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0011_tracking_order_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='cancel_reason',
+            field=models.CharField(blank=True, choices=[('payment_failed', 'Pago rechazado'), ('payment_canceled', 'PaymentIntent cancelado'), ('out_of_stock', 'Sin stock al pagar'), ('customer', 'Cancelado por el cliente')], max_length=20),
+        ),
+    ]
@@ -1,10 +1,11 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from decimal import Decimal
 User = get_user_model()
-from core.models import BaseModel
+from core.models import BaseModel, SoftDeleteManager, SoftDeleteQuerySet
 from core.utils.validations import validate_date_range
 from pieces.models import Piece
 from users.models import Address
@@ -19,8 +20,11 @@ class Coupon(BaseModel):
     valid_from = models.DateField(db_index=True)
     valid_until = models.DateField(db_index=True)
     max_uses = models.PositiveIntegerField(null=True, blank=True)
+    # Denormalizado: se incrementa en Coupon.redeem junto con la validación de max_uses
+    used_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Usos')
 
     def clean(self):
+        self.code = self.code.strip().upper()
         validate_date_range(self.valid_from, self.valid_until)
         if not (Decimal('0') < self.percentage <= Decimal('100')):
             raise ValidationError({'percentage': 'El porcentaje debe estar entre 0 y 100.'})
@@ -32,7 +36,23 @@ class Coupon(BaseModel):
     def has_uses_remaining(self):
         if self.max_uses is None:
             return True
-        return self.usages.count() < self.max_uses
+        return self.used_count < self.max_uses
+
+    def redeem(self) -> bool:
+        """
+        Consume un uso con un solo UPDATE condicional
+        (used_count = used_count + 1 WHERE used_count < max_uses).
+        Retorna False si el cupón ya no tenía usos disponibles.
+        """
+        updated = (
+            Coupon.objects
+            .filter(pk=self.pk)
+            .filter(models.Q(max_uses__isnull=True) | models.Q(used_count__lt=models.F('max_uses')))
+            .update(used_count=models.F('used_count') + 1)
+        )
+        if updated:
+            self.used_count += 1
+        return bool(updated)
 
     def __str__(self):
         return f"{self.code} ({self.percentage}%)"
@@ -43,6 +63,36 @@ class Coupon(BaseModel):
         indexes = [
             models.Index(fields=["valid_from", "valid_until"], name="coupon_validity_idx"),
         ]
+        constraints = [
+            models.UniqueConstraint(Upper("code"), name="coupon_code_upper_unique"),
+        ]
+
+def latest_tracking_status(order_ref: str = 'pk') -> models.Subquery:
+    """Estado del rastreo más reciente de la orden referenciada por `order_ref`."""
+    return models.Subquery(
+        ShippingTracking.objects
+        .filter(order_id=models.OuterRef(order_ref))
+        .order_by('-created_at')
+        .values('status')[:1]
+    )
+
+
+class OrderQuerySet(SoftDeleteQuerySet):
+    def with_latest_tracking_status(self):
+        """Anota latest_tracking_status para que can_be_cancelled no consulte por orden."""
+        return self.annotate(latest_tracking_status=latest_tracking_status())
+
+
+class OrderManager(SoftDeleteManager):
+    def get_queryset(self):
+        return OrderQuerySet(self.model, using=self._db).filter(
+            deleted_at__isnull=True,
+            is_active=True
+        )
+
+    def with_latest_tracking_status(self):
+        return self.get_queryset().with_latest_tracking_status()
+
 
 class Order(BaseModel):
     STATUS_CHOICES = [
@@ -51,20 +101,36 @@ class Order(BaseModel):
         ('cancelled', 'Cancelled'),
         ('expired', 'Expired')
     ]
+    CANCEL_REASON_CHOICES = [
+        ('payment_failed', 'Pago rechazado'),
+        ('payment_canceled', 'PaymentIntent cancelado'),
+        ('out_of_stock', 'Sin stock al pagar'),
+        ('customer', 'Cancelado por el cliente'),
+    ]
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders')
     total = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', db_index=True)
+    # Un rechazo se puede reintentar sobre el mismo PaymentIntent; las demás causas cierran el pedido
+    cancel_reason = models.CharField(max_length=20, choices=CANCEL_REASON_CHOICES, blank=True)
     address = models.ForeignKey(Address, on_delete=models.CASCADE, related_name='orders')
 
+    objects = OrderManager()
+
     class Meta:
         indexes = [
             models.Index(fields=["user", "status"], name="order_user_status_idx"),
+            models.Index(fields=["status", "created_at", "id"], name="order_status_created_idx"),
+            models.Index(fields=["user", "-created_at"], name="order_user_created_idx"),
         ]
 
     def can_be_cancelled(self) -> bool:
         if self.status == 'cancelled':
             return False
 
+        # Anotado por with_latest_tracking_status(); None si la orden no tiene rastreo
+        if hasattr(self, 'latest_tracking_status'):
+            return self.latest_tracking_status == 'pending'
+
         tracking = self.trakings.first()
 
         if tracking is None:
@@ -115,6 +181,9 @@ class ShippingTracking(BaseModel):
         verbose_name = ("Rastreo de pedido")
         verbose_name_plural = ("Rastreo de pedidos") 
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=["order", "-created_at"], name="tracking_order_created_idx"),
+        ]
 
 
     def get_tracking_url(self):
@@ -183,4 +252,107 @@ class ExchangeRate(models.Model):
         verbose_name_plural = ("Tipos de Cambio")
 
     def __str__(self):
-        return f"USD a MXN: {self.usd_to_mxn} ({self.fetched_at.strftime('%d/%m/%Y')})"  
\ No newline at end of file
+        return f"USD a MXN: {self.usd_to_mxn} ({self.fetched_at.strftime('%d/%m/%Y')})"  
+
+class StockReservationQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(status='active', expires_at__gt=timezone.now())
+
+
+class StockReservation(models.Model):
+    """
+    Apartado temporal de stock mientras el cliente paga. El disponible para
+    venta de una pieza es quantity menos la suma de sus apartados activos.
+    """
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('consumed', 'Consumed'),
+        ('released', 'Released'),
+        ('expired', 'Expired'),
+    ]
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='reservations')
+    piece = models.ForeignKey(Piece, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = StockReservationQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Apartado de stock'
+        verbose_name_plural = 'Apartados de stock'
+        indexes = [
+            models.Index(fields=['piece', 'status', 'expires_at'], name='reservation_piece_active_idx'),
+            models.Index(fields=['status', 'expires_at'], name='reservation_status_exp_idx'),
+        ]
+
+    def __str__(self):
+        return f"Orden {self.order_id} - Pieza {self.piece_id} x{self.quantity} ({self.status})"
+
+
+class StripeEvent(models.Model):
+    """
+    Log de eventos de Stripe. El webhook sólo verifica la firma e inserta aquí;
+    el comando process_stripe_events los aplica. La unicidad de event_id hace
+    que una entrega duplicada sea un simple conflicto en el INSERT.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('processed', 'Processed'),
+        ('dead', 'Dead'),
+    ]
+    event_id = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Evento de Stripe'
+        verbose_name_plural = 'Eventos de Stripe'
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='stripeevent_status_next_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_id} - {self.event_type} ({self.status})"
+
+
+class PaymentIntentCancellation(models.Model):
+    """
+    Cola de PaymentIntents por cancelar en Stripe. Se llena al expirar pedidos
+    pendientes y la drena process_stripe_cancellations fuera del request.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('dead', 'Dead'),
+    ]
+    payment_intent_id = models.CharField(max_length=250, unique=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Cancelación de PaymentIntent'
+        verbose_name_plural = 'Cancelaciones de PaymentIntent'
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='picancel_status_next_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.payment_intent_id} ({self.status})"
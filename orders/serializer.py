@@ -1,14 +1,15 @@
-from datetime import date
 from decimal import Decimal
 from rest_framework import serializers
 from core.mixins import CurrencyMixin
 from pieces.models import Piece
 from users.models import Address
 from users.serializers import AddressSerializer
-from .models import CouponUsage, Order, OrderItem, Payment, ShippingTracking, Coupon
+from .models import CouponUsage, Order, OrderItem, Payment, ShippingTracking
+from .service import CouponService
 
 class OrderItemInputSerializer(serializers.Serializer):
-    piece = serializers.PrimaryKeyRelatedField(queryset=Piece.objects.all())
+    # Se resuelve a Piece en CheckoutSerializer.validate_items con una sola query
+    piece = serializers.IntegerField(min_value=1)
     quantity = serializers.IntegerField(min_value=1)
 
 
@@ -27,19 +28,21 @@ class CheckoutSerializer(serializers.Serializer):
     def validate_items(self, items):
         if not items:
             raise serializers.ValidationError("Debes enviar al menos un item.")
+
+        pieces = Piece.objects.in_bulk({item['piece'] for item in items})
+        missing = sorted({item['piece'] for item in items} - pieces.keys())
+        if missing:
+            raise serializers.ValidationError(f"Pieza inválida: {', '.join(map(str, missing))}.")
+
+        for item in items:
+            item['piece'] = pieces[item['piece']]
         return items
 
     def validate_coupon_code(self, code):
         if not code:
             return None
-        today = date.today()
-        try:
-            coupon = Coupon.objects.get(
-                code=code,
-                valid_from__lte=today,
-                valid_until__gte=today
-            )
-        except Coupon.DoesNotExist:
+        coupon = CouponService.get(code)
+        if coupon is None or not coupon.is_valid():
             raise serializers.ValidationError("Cupón inválido o expirado.")
 
         if not coupon.has_uses_remaining():
@@ -145,6 +148,9 @@ class ShippingTrackingDetailSerializer(CurrencyMixin, serializers.ModelSerialize
         return obj.get_tracking_url()
 
     def get_order(self, obj):
+        # Anotado por ShippingTrackingViewSet: can_be_cancelled no vuelve a consultar
+        if hasattr(obj, 'order_latest_tracking_status'):
+            obj.order.latest_tracking_status = obj.order_latest_tracking_status
         return OrderDetailSerializer(
             obj.order,
             context={**self.context, 'serializer': self}
@@ -1,8 +1,18 @@
 from django.utils import timezone
+from datetime import date, timedelta
 from decimal import Decimal
+import csv
+import io
 import logging
-import json
-from django.db import DatabaseError, transaction
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Greatest, Upper
 from rest_framework.exceptions import ValidationError
 import stripe
 
@@ -12,8 +22,13 @@ from core.services.email_service import (
     OrderCreatedAdminEmail, OrderShippedEmail, OrderCreatedUserEmail
 )
 from orders.exceptions import OrderNotCancellableError, RefundError
-from orders.models import CouponUsage, Order, OrderItem, Payment, ShippingTracking
+from orders.models import (
+    Coupon, CouponUsage, Order, OrderItem, Payment, PaymentIntentCancellation,
+    ShippingTracking, StockReservation, StripeEvent
+)
+from pieces.exceptions import InsufficientStockError
 from pieces.models import Piece
+from pieces.service import InventoryService
 from django.core.cache import cache
 from decouple import config
 
@@ -23,6 +38,386 @@ BACKEND_URL = config('BACKEND_URL')
 EMAIL_ADMIN = config('EMAIL_ADMIN')
 
 
+class OrderNotificationService:
+    """
+    Notificaciones de pedidos. Se ejecutan con transaction.on_commit para que
+    el render de templates y las lecturas extra no ocurran mientras se
+    sostienen los locks de Payment/Piece, y para no notificar nada que
+    termine en rollback.
+    """
+
+    @staticmethod
+    def _load_order(order_id: int) -> Order:
+        return (
+            Order.objects
+            .select_related('user', 'address')
+            .prefetch_related('items__piece')
+            .get(id=order_id)
+        )
+
+    @staticmethod
+    def payment_succeeded(order_id: int) -> None:
+        order = OrderNotificationService._load_order(order_id)
+        order_items = order.items.all()
+
+        OrderCreatedUserEmail.send_email(
+            to_email=order.user.email,
+            nombre=order.user.username,
+            order_number=order.id,
+            order_date=order.created_at,
+            order_total=order.total,
+            order_url=f'{FRONTEND_URL}/cuenta'
+        )
+
+        OrderCreatedAdminEmail.send_email(
+            to_email=EMAIL_ADMIN,
+            order_number=order.id,
+            customer_name=order.user.username,
+            customer_email=order.user.email,
+            order_date=order.created_at,
+            order_items=order_items,
+            order_total=order.total,
+            admin_order_url=f'{BACKEND_URL}/orders/order/',
+        )
+
+    @staticmethod
+    def order_cancelled(order_id: int) -> None:
+        order = OrderNotificationService._load_order(order_id)
+        order_items = order.items.all()
+        cancellation_date = timezone.now().date()
+
+        OrderCancelledUserEmail.send_email(
+            to_email=order.user.email,
+            customer_name=order.user.username,
+            order_number=order.id,
+            cancellation_date=cancellation_date,
+            order_items=order_items,
+            order_total=order.total,
+            shop_url=FRONTEND_URL
+        )
+
+        OrderCancelledAdminEmail.send_email(
+            to_email=EMAIL_ADMIN,
+            customer_name=order.user.username,
+            order_number=order.id,
+            cancellation_date=cancellation_date,
+            order_items=order_items,
+            order_total=order.total,
+            customer_email=order.user.email,
+            customer_phone=order.address.phone_number,
+            admin_order_url=BACKEND_URL
+        )
+
+    @staticmethod
+    def order_shipped(tracking_id: int) -> None:
+        tracking = ShippingTracking.objects.select_related('order__user').get(id=tracking_id)
+        order = tracking.order
+        order_items = order.items.select_related('piece').all()
+
+        OrderShippedEmail.send_email(
+            to_email=order.user.email,
+            order_number=order.id,
+            order_date=order.created_at,
+            customer_name=order.user.username,
+            customer_email=order.user.email,
+            tracking_number=tracking.tracking_number,
+            tracking_url=tracking.get_tracking_url(),
+            order_items=order_items,
+            order_total=order.total
+        )
+
+
+COUPON_CACHE_TTL = 60 * 5
+COUPON_NEGATIVE_CACHE_TTL = 60
+_COUPON_MISS = 'missing'
+
+
+class CouponService:
+    """
+    Lookup de cupones por código con cache. La llave es el código en
+    mayúsculas; los códigos inexistentes se guardan como negativos por poco
+    tiempo para que probar códigos al azar no llegue a la BD. Se invalida en
+    post_save/post_delete de Coupon (orders/signals.py), al consumir un uso y
+    en las acciones masivas del admin (queryset.update no dispara señales).
+    """
+
+    @staticmethod
+    def cache_key(code: str) -> str:
+        return f'coupon:{code.strip().upper()}'
+
+    @staticmethod
+    def invalidate(code: str) -> None:
+        cache.delete(CouponService.cache_key(code))
+
+    @staticmethod
+    def invalidate_many(codes) -> None:
+        cache.delete_many([CouponService.cache_key(code) for code in codes])
+
+    @staticmethod
+    def adjust_used_count(deltas) -> None:
+        """
+        Suma a used_count el delta de cada cupón ({coupon_id: delta}) cuando un
+        CouponUsage se da de baja o se restaura fuera de `redeem`. UPDATE con F()
+        para no pisar un checkout concurrente; nunca baja de 0.
+        """
+        deltas = {coupon_id: delta for coupon_id, delta in deltas.items() if delta}
+        for coupon_id, delta in deltas.items():
+            Coupon.all_objects.filter(pk=coupon_id).update(used_count=Greatest(F('used_count') + delta, 0))
+        if deltas:
+            CouponService.invalidate_many(
+                Coupon.all_objects.filter(pk__in=deltas).values_list('code', flat=True)
+            )
+
+    @staticmethod
+    def get(code: str) -> Coupon | None:
+        """
+        Retorna el cupón activo con ese código (sin importar mayúsculas) o None.
+        En un hit de cache la instancia se arma sin tocar la BD; sirve para
+        leer porcentaje/vigencia/usos y como FK, y `redeem` vuelve a validar
+        contra la BD.
+        """
+        key = CouponService.cache_key(code)
+        data = cache.get(key)
+
+        if data is None:
+            coupon = (
+                Coupon.objects
+                .annotate(code_upper=Upper('code'))
+                .filter(code_upper=code.strip().upper())
+                .first()
+            )
+            if coupon is None:
+                cache.set(key, _COUPON_MISS, COUPON_NEGATIVE_CACHE_TTL)
+                return None
+            cache.set(key, {
+                'id': coupon.id,
+                'code': coupon.code,
+                'percentage': str(coupon.percentage),
+                'valid_from': coupon.valid_from.isoformat(),
+                'valid_until': coupon.valid_until.isoformat(),
+                'max_uses': coupon.max_uses,
+                'used_count': coupon.used_count,
+            }, COUPON_CACHE_TTL)
+            return coupon
+
+        if data == _COUPON_MISS:
+            return None
+
+        # Los demás campos quedan diferidos: si alguien los lee, Django los carga
+        return Coupon.from_db(
+            'default',
+            ['id', 'code', 'percentage', 'valid_from', 'valid_until', 'max_uses', 'used_count'],
+            [
+                data['id'],
+                data['code'],
+                Decimal(data['percentage']),
+                date.fromisoformat(data['valid_from']),
+                date.fromisoformat(data['valid_until']),
+                data['max_uses'],
+                data['used_count'],
+            ],
+        )
+
+
+# Sin caracteres ambiguos (0/O, 1/I/L) para códigos que se teclean a mano
+COUPON_CODE_ALPHABET = 'ABCDEFGHJKMNPQRSTUVWXYZ23456789'
+COUPON_CODE_MIN_LENGTH = 4
+# Combinaciones posibles por cada cupón pedido: con menos, las colisiones
+# hacen que completar el lote tome cada vez más rondas
+COUPON_CODE_SPACE_FACTOR = 1000
+# Rondas para reponer códigos repetidos antes de rendirse
+COUPON_FILL_MAX_ROUNDS = 20
+
+
+class CouponBatchService:
+    """Generación masiva de cupones para campañas."""
+
+    @staticmethod
+    def validate(count: int, prefix: str, length: int) -> None:
+        """
+        Lanza ValidationError (de Django, con la llave `length`) si la longitud
+        no deja espacio de sobra para `count` códigos distintos o no cabe en
+        Coupon.code junto con el prefijo.
+        """
+        max_length = Coupon._meta.get_field('code').max_length - len(prefix.strip())
+        if not COUPON_CODE_MIN_LENGTH <= length <= max_length:
+            raise DjangoValidationError({
+                'length': f'La longitud debe estar entre {COUPON_CODE_MIN_LENGTH} y {max_length}.'
+            })
+        if len(COUPON_CODE_ALPHABET) ** length < count * COUPON_CODE_SPACE_FACTOR:
+            raise DjangoValidationError({
+                'length': f'{length} caracteres no alcanzan para {count} códigos únicos; usa una longitud mayor.'
+            })
+
+    @staticmethod
+    def _fill(codes: set[str], prefix: str, length: int, size: int) -> set[str]:
+        for _ in range(COUPON_FILL_MAX_ROUNDS):
+            missing = size - len(codes)
+            if missing <= 0:
+                return codes
+            codes.update(
+                prefix + ''.join(secrets.choice(COUPON_CODE_ALPHABET) for _ in range(length))
+                for _ in range(missing)
+            )
+        if len(codes) < size:
+            raise DjangoValidationError('No se pudieron generar suficientes códigos únicos; usa una longitud mayor.')
+        return codes
+
+    @staticmethod
+    def generate(count: int, prefix: str, percentage: Decimal, valid_from, valid_until,
+                 max_uses: int | None = 1, length: int = 8, chunk_size: int = 1000):
+        """
+        Crea `count` cupones únicos y va entregando los códigos por lotes
+        (generador de listas). En memoria sólo vive un lote a la vez: cada lote
+        se genera, se descartan los códigos que ya existen en la BD (una query
+        con UPPER(code) IN ...) y se inserta con un bulk_create.
+        """
+        CouponBatchService.validate(count, prefix, length)
+        prefix = prefix.strip().upper()
+        remaining = count
+
+        while remaining > 0:
+            size = min(chunk_size, remaining)
+            codes = CouponBatchService._fill(set(), prefix, length, size)
+
+            # Reemplazar sólo los que chocan con cupones existentes (incluye lotes anteriores)
+            for _ in range(COUPON_FILL_MAX_ROUNDS):
+                taken = set(
+                    Coupon.all_objects
+                    .annotate(code_upper=Upper('code'))
+                    .filter(code_upper__in=codes)
+                    .values_list('code_upper', flat=True)
+                )
+                if not taken:
+                    break
+                codes = CouponBatchService._fill(codes - taken, prefix, length, size)
+            else:
+                raise DjangoValidationError(
+                    f'Los códigos con prefijo {prefix!r} ya casi están agotados; usa otro prefijo o una longitud mayor.'
+                )
+
+            chunk = sorted(codes)
+            Coupon.objects.bulk_create([
+                Coupon(
+                    code=code,
+                    percentage=percentage,
+                    valid_from=valid_from,
+                    valid_until=valid_until,
+                    max_uses=max_uses,
+                )
+                for code in chunk
+            ], batch_size=chunk_size)
+            # bulk_create no dispara signals: limpiar posibles negativos en cache
+            cache.delete_many([CouponService.cache_key(code) for code in chunk])
+
+            remaining -= len(chunk)
+            yield chunk
+
+    @staticmethod
+    def stream_csv(batches, percentage, valid_from, valid_until, max_uses):
+        """Filas CSV (ya como texto) a partir de los lotes de `generate`."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        def flush():
+            value = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            return value
+
+        writer.writerow(['code', 'percentage', 'valid_from', 'valid_until', 'max_uses'])
+        yield flush()
+        for chunk in batches:
+            for code in chunk:
+                writer.writerow([code, percentage, valid_from, valid_until, max_uses or ''])
+            yield flush()
+
+
+class ReservationService:
+    """
+    Apartados de stock durante el checkout. Mientras el pago está en curso el
+    stock queda retenido N minutos (STOCK_RESERVATION_MINUTES), así dos
+    clientes no llegan a Stripe por la última unidad y el reembolso por
+    overselling queda como excepción.
+    """
+
+    @staticmethod
+    def reserved(piece_ids) -> dict[int, int]:
+        """Suma de apartados activos por pieza (usa reservation_piece_active_idx)."""
+        return dict(
+            StockReservation.objects.active()
+            .filter(piece_id__in=piece_ids)
+            .values('piece_id')
+            .annotate(total=Sum('quantity'))
+            .values_list('piece_id', 'total')
+        )
+
+    @staticmethod
+    def available(pieces) -> dict[int, int]:
+        """Disponible para venta: stock menos apartados activos."""
+        reserved = ReservationService.reserved([piece.id for piece in pieces])
+        return {piece.id: piece.quantity - reserved.get(piece.id, 0) for piece in pieces}
+
+    @staticmethod
+    def hold(order: Order, items_data) -> None:
+        """
+        Aparta el stock del pedido. Debe llamarse dentro de una transacción:
+        bloquea las piezas (ordenadas por id para evitar deadlocks) para que
+        dos apartados concurrentes no se basen en el mismo disponible.
+        """
+        totals = {}
+        for item in items_data:
+            totals[item['piece'].id] = totals.get(item['piece'].id, 0) + item['quantity']
+
+        pieces = list(
+            Piece._base_manager.select_for_update()
+            .filter(id__in=totals)
+            .order_by('id')
+            .only('id', 'title', 'quantity')
+        )
+        available = ReservationService.available(pieces)
+
+        for piece in pieces:
+            if available[piece.id] < totals[piece.id]:
+                raise ValidationError({
+                    'items': f'Stock insuficiente para "{piece.title}". '
+                             f'Disponible: {max(available[piece.id], 0)}'
+                })
+
+        expires_at = timezone.now() + timedelta(minutes=settings.STOCK_RESERVATION_MINUTES)
+        StockReservation.objects.bulk_create([
+            StockReservation(order=order, piece_id=piece_id, quantity=quantity, expires_at=expires_at)
+            for piece_id, quantity in totals.items()
+        ])
+
+    @staticmethod
+    def release(orders) -> int:
+        """
+        Libera los apartados activos de una o varias órdenes (instancias o ids)
+        por pago fallido, cancelación o expiración.
+        """
+        if isinstance(orders, Order):
+            orders = [orders]
+        order_ids = [order.id if isinstance(order, Order) else order for order in orders]
+        return StockReservation.objects.filter(order_id__in=order_ids, status='active').update(status='released')
+
+    @staticmethod
+    def consume(order: Order) -> None:
+        """El stock ya se descontó en Piece.quantity; el apartado deja de contar."""
+        StockReservation.objects.filter(order=order, status='active').update(status='consumed')
+
+    @staticmethod
+    def sweep_expired() -> int:
+        """
+        Marca como expirados los apartados vencidos. No es necesario para la
+        disponibilidad (active() ya filtra por expires_at), pero mantiene
+        chico el conjunto de filas 'active' que recorre el índice.
+        """
+        return StockReservation.objects.filter(
+            status='active', expires_at__lte=timezone.now()
+        ).update(status='expired')
+
+
 class OrderService():
 
     # ─────────────────────────────────────────────
@@ -34,45 +429,108 @@ class OrderService():
         """
         Antes de crear un nuevo pedido, expira todos los pedidos pendientes
         del usuario. El stock nunca fue descontado en pending, así que no
-        hay nada que devolver — solo marcamos como expirado y cancelamos
-        el PaymentIntent en Stripe si existe.
+        hay nada que devolver. La cancelación de los PaymentIntents se encola
+        para no esperar a Stripe dentro del checkout.
         """
-        stale_orders = Order.objects.filter(
-            user=user,
-            status='pending'
-        ).prefetch_related('payments')
+        stale_ids = list(
+            Order.objects.filter(user=user, status='pending').values_list('id', flat=True)
+        )
+        if stale_ids:
+            OrderService.expire_orders(stale_ids)
 
-        for order in stale_orders:
-            payment = order.payments.first()
+    @staticmethod
+    @transaction.atomic
+    def expire_orders(order_ids, skip_locked: bool = False) -> int:
+        """
+        Expira en bloque pedidos pendientes con un UPDATE por tabla, libera sus
+        apartados y encola la cancelación de sus PaymentIntents. Retorna cuántas
+        órdenes se expiraron.
+
+        Se bloquean primero los Payment y luego las Order (mismo orden que los
+        webhooks) para no pisar un pago que se está confirmando en paralelo.
+        Con skip_locked=True (sweeper) las órdenes ocupadas se dejan para la
+        siguiente pasada en vez de esperar.
+        """
+        now = timezone.now()
+        locked = list(
+            Payment.objects.select_for_update(of=('self',), skip_locked=skip_locked)
+            .filter(order_id__in=order_ids, order__status='pending')
+            .values_list('order_id', 'external_id')
+        )
+        if skip_locked:
+            order_ids = list(
+                Order.objects.select_for_update(skip_locked=True)
+                .filter(id__in={order_id for order_id, _ in locked}, status='pending')
+                .values_list('id', flat=True)
+            )
+        expiring = set(order_ids)
+        intent_ids = [
+            external_id for order_id, external_id in locked
+            if order_id in expiring and external_id != 'pending'
+        ]
+
+        expired = Order.objects.filter(id__in=order_ids, status='pending').update(
+            status='expired', updated_at=now
+        )
+        Payment.objects.filter(order_id__in=order_ids, order__status='expired').exclude(
+            status='completed'
+        ).update(status='failed', updated_at=now)
+        ReservationService.release(order_ids)
+        PaymentIntentCancellationService.enqueue(intent_ids)
 
-            if payment and payment.external_id != 'pending':
-                try:
-                    stripe.PaymentIntent.cancel(payment.external_id)
-                except stripe.error.InvalidRequestError:
-                    # Ya estaba cancelado en Stripe, no importa
-                    pass
+        return expired
 
-            order.status = 'expired'
-            order.save(update_fields=['status'])
+    @staticmethod
+    def sweep_abandoned_orders(older_than: timedelta, batch_size: int = 500, logger=None) -> dict:
+        """
+        Expira pedidos pendientes más viejos que `older_than`. Recorre la tabla
+        con paginación keyset sobre (created_at, id) usando order_status_created_idx,
+        y cada página se expira en su propia transacción con SKIP LOCKED.
+        """
+        log = logger or logging.getLogger(__name__)
+        cutoff = timezone.now() - older_than
+        stats = {'pages': 0, 'scanned': 0, 'expired': 0, 'select_seconds': 0.0, 'expire_seconds': 0.0}
+        last = None
+
+        while True:
+            started = time.monotonic()
+            page = Order.objects.filter(status='pending', created_at__lt=cutoff)
+            if last:
+                page = page.filter(
+                    Q(created_at__gt=last[0]) | Q(created_at=last[0], id__gt=last[1])
+                )
+            rows = list(page.order_by('created_at', 'id').values_list('created_at', 'id')[:batch_size])
+            stats['select_seconds'] += time.monotonic() - started
+            if not rows:
+                break
 
-            if payment:
-                payment.status = 'failed'
-                payment.save(update_fields=['status'])
+            started = time.monotonic()
+            expired = OrderService.expire_orders([order_id for _, order_id in rows], skip_locked=True)
+            stats['expire_seconds'] += time.monotonic() - started
+
+            stats['pages'] += 1
+            stats['scanned'] += len(rows)
+            stats['expired'] += expired
+            last = rows[-1]
+
+        log.info("Pedidos abandonados expirados", extra=dict(stats))
+        return stats
 
     @staticmethod
     def _validate_stock(items_data) -> None:
         """
         Validación optimista de stock antes de llamar a Stripe.
         No usa lock — su propósito es UX (evitar que el usuario
-        llegue a Stripe si ya no hay stock visible).
-        La garantía real contra overselling está en handle_payment_succeeded.
+        llegue a Stripe si ya no hay stock visible, contando los apartados activos).
+        La garantía real está en ReservationService.hold y handle_payment_succeeded.
         """
+        available = ReservationService.available([item['piece'] for item in items_data])
         for item in items_data:
             piece = item['piece']
-            if piece.quantity < item['quantity']:
+            if available[piece.id] < item['quantity']:
                 raise ValidationError({
                     'items': f'Stock insuficiente para "{piece.title}". '
-                             f'Disponible: {piece.quantity}'
+                             f'Disponible: {max(available[piece.id], 0)}'
                 })
 
     # ─────────────────────────────────────────────
@@ -86,8 +544,10 @@ class OrderService():
         items_data = data['items']
         coupon = data.get('coupon_code')
 
+        # Una sola cotización del carrito: se reutiliza para el subtotal y el price_snapshot
+        prices = Piece.quote([item['piece'] for item in items_data], 'mx')
         subtotal = sum(
-            item['piece'].get_final_price('mx') * item['quantity']
+            prices[item['piece'].id] * item['quantity']
             for item in items_data
         )
 
@@ -105,18 +565,27 @@ class OrderService():
         )
 
         if coupon:
+            # El UPDATE condicional es la garantía real de max_uses bajo concurrencia
+            if not coupon.redeem():
+                raise ValidationError({'coupon_code': 'Este cupón ha alcanzado su límite de usos.'})
+            code = coupon.code
+            transaction.on_commit(lambda: CouponService.invalidate(code))
             CouponUsage.objects.create(
                 order=order, coupon=coupon,
                 user=user, discount_applied=discount
             )
 
-        for item in items_data:
-            OrderItem.objects.create(
+        ReservationService.hold(order, items_data)
+
+        OrderItem.objects.bulk_create([
+            OrderItem(
                 order=order,
                 piece=item['piece'],
                 quantity=item['quantity'],
-                price_snapshot=item['piece'].get_final_price('mx')
+                price_snapshot=prices[item['piece'].id]
             )
+            for item in items_data
+        ])
 
         payment = Payment.objects.create(
             order=order,
@@ -157,7 +626,7 @@ class OrderService():
         Orquesta el flujo completo:
         1. Expira pedidos pendientes anteriores
         2. Valida stock (optimista, para UX)
-        3. Crea orden en BD (sin descontar stock)
+        3. Crea orden en BD y aparta el stock (sin descontarlo)
         4. Llama a Stripe fuera del atomic
         """
         OrderService._expire_previous_pending_orders(user)
@@ -165,11 +634,15 @@ class OrderService():
 
         order, payment, discount = OrderService._create_order(user, data)  # ← desempaca discount
 
-        client_secret = OrderService._create_stripe_intent(
-            order, payment,
-            coupon=data.get('coupon_code'),
-            discount=discount  # ← ahora sí es el descuento real
-        )
+        try:
+            client_secret = OrderService._create_stripe_intent(
+                order, payment,
+                coupon=data.get('coupon_code'),
+                discount=discount  # ← ahora sí es el descuento real
+            )
+        except stripe.error.StripeError:
+            ReservationService.release(order)
+            raise
 
         return order, client_secret
 
@@ -191,80 +664,100 @@ class OrderService():
 
         if payment.status == 'completed':
             log.warning(
-                f"Evento de pago duplicado ignorado\n"
-                f"{json.dumps({'payment_intent_id': payment_intent['id']}, indent=2)}"
+                "Evento de pago duplicado ignorado",
+                extra={'payment_intent_id': payment_intent['id']}
             )
             return
 
         order = payment.order
 
-        # Adquirir lock en las piezas ordenadas por ID para evitar deadlocks
-        items = list(
-            order.items.select_related('piece')
-            .select_for_update()
-            .order_by('piece_id')
-        )
+        if order.status == 'cancelled' and order.cancel_reason == 'out_of_stock':
+            # Ya se reembolsó al detectar el overselling; el evento llegó repetido
+            log.warning(
+                "Pago de un pedido cancelado por falta de stock ignorado",
+                extra={'order_id': order.id, 'payment_intent_id': payment_intent['id']}
+            )
+            return
 
-        # Validar stock real con el lock ya adquirido
+        # El pedido expiró o el cliente lo canceló (su apartado se liberó y la cancelación
+        # del PaymentIntent va en la cola), pero alcanzó a pagar: se reembolsa en vez de
+        # marcarlo pagado y volver a descontar stock. Un pedido cancelado por un rechazo
+        # no cuenta: Stripe deja reintentar el mismo PaymentIntent con otra tarjeta
+        if order.status == 'expired' or (order.status == 'cancelled' and order.cancel_reason == 'customer'):
+            log.error(
+                "Pago recibido para un pedido ya cerrado — reembolsando",
+                extra={
+                    'order_id': order.id,
+                    'order_status': order.status,
+                    'payment_intent_id': payment.external_id,
+                }
+            )
+            # Si Stripe falla, la excepción deja el evento para reintento; la llave
+            # de idempotencia evita un segundo reembolso
+            stripe.Refund.create(
+                payment_intent=payment.external_id,
+                reason='duplicate',
+                idempotency_key=f'late-payment-refund-{payment.external_id}',
+            )
+            # Ya no hay nada que cancelar: el PaymentIntent se cobró y se reembolsó
+            PaymentIntentCancellation.objects.filter(
+                payment_intent_id=payment.external_id, status='pending'
+            ).update(status='done', processed_at=timezone.now(), last_error='Pagado tras expirar; reembolsado')
+            return
+
+        # Descuento atómico: un solo UPDATE condicional (quantity >= n) para todo el pedido.
         # Esta es la garantía real contra overselling
-        for item in items:
-            if item.piece.quantity < item.quantity:
-                log.error(
-                    f"Overselling detectado — reembolsando automáticamente\n"
-                    f"{json.dumps({'order_id': order.id, 'piece_id': item.piece.id, 'piece_title': item.piece.title, 'stock_disponible': item.piece.quantity, 'cantidad_solicitada': item.quantity}, indent=2)}"
+        items = list(order.items.values_list('piece_id', 'quantity'))
+        try:
+            InventoryService.decrement(items)
+        except InsufficientStockError as e:
+            log.error(
+                "Overselling detectado — reembolsando automáticamente",
+                extra={
+                    'order_id': order.id,
+                    'piece_id': e.piece_id,
+                    'stock_disponible': e.available,
+                    'cantidad_solicitada': e.requested,
+                }
+            )
+            try:
+                stripe.Refund.create(
+                    payment_intent=payment.external_id,
+                    reason='requested_by_customer'
                 )
-                try:
-                    stripe.Refund.create(
-                        payment_intent=payment.external_id,
-                        reason='requested_by_customer'
-                    )
-                except stripe.error.StripeError as e:
-                    log.error(f"Error al reembolsar overselling: {e}")
-
-                payment.status = 'failed'
-                payment.save(update_fields=['status'])
-                order.status = 'cancelled'
-                order.save(update_fields=['status'])
-                return  # Retornar 200 a Stripe para que no reintente
-
-        # Stock validado — descontar definitivamente
-        for item in items:
-            item.piece.quantity -= item.quantity
-            item.piece.save(update_fields=['quantity'])
+            except stripe.error.StripeError as refund_error:
+                log.error(f"Error al reembolsar overselling: {refund_error}")
+
+            payment.status = 'failed'
+            payment.save(update_fields=['status'])
+            order.status = 'cancelled'
+            order.cancel_reason = 'out_of_stock'
+            order.save(update_fields=['status', 'cancel_reason'])
+            ReservationService.release(order)
+            return  # Retornar 200 a Stripe para que no reintente
+
+        ReservationService.consume(order)
 
         payment.status = 'completed'
         payment.save(update_fields=['status'])
 
         order.status = 'paid'
-        order.save(update_fields=['status'])
+        order.cancel_reason = ''
+        order.save(update_fields=['status', 'cancel_reason'])
 
         ShippingTracking.objects.create(order=order)
 
-        OrderCreatedUserEmail.send_email(
-            to_email=order.user.email,
-            nombre=order.user.username,
-            order_number=order.id,
-            order_date=order.created_at,
-            order_total=order.total,
-            order_url=f'{FRONTEND_URL}/cuenta'
-        )
-
-        order_items = order.items.select_related('piece').all()
-
-        OrderCreatedAdminEmail.send_email(
-            to_email=EMAIL_ADMIN,
-            order_number=order.id,
-            customer_name=order.user.username,
-            customer_email=order.user.email,
-            order_date=order.created_at,
-            order_items=order_items,
-            order_total=order.total,
-            admin_order_url=f'{BACKEND_URL}/orders/order/',
-        )
+        # Correos y lecturas extra fuera del lock: corren cuando el commit libera Payment/Piece
+        order_id = order.id
+        transaction.on_commit(lambda: OrderNotificationService.payment_succeeded(order_id))
 
         log.info(
-            f"Pago completado\n"
-            f"{json.dumps({'order_id': order.id, 'payment_intent_id': payment_intent['id'], 'amount': str(payment.amount)}, indent=2)}"
+            "Pago completado",
+            extra={
+                'order_id': order_id,
+                'payment_intent_id': payment_intent['id'],
+                'amount': str(payment.amount),
+            }
         )
 
     @staticmethod
@@ -272,7 +765,7 @@ class OrderService():
     def handle_payment_canceled(payment_intent: dict, logger=None) -> None:
         """
         El stock nunca fue descontado en pending,
-        solo marcamos el pago y la orden como fallidos.
+        solo marcamos el pago y la orden como fallidos y liberamos el apartado.
         """
         log = logger or logging.getLogger(__name__)
 
@@ -291,11 +784,13 @@ class OrderService():
 
         order = payment.order
         order.status = 'cancelled'
-        order.save(update_fields=['status'])
+        order.cancel_reason = 'payment_canceled'
+        order.save(update_fields=['status', 'cancel_reason'])
+        ReservationService.release(order)
 
         log.info(
-            f"Pago cancelado\n"
-            f"{json.dumps({'payment_intent_id': payment_intent['id'], 'order_id': order.id}, indent=2)}"
+            "Pago cancelado",
+            extra={'payment_intent_id': payment_intent['id'], 'order_id': order.id}
         )
 
     @staticmethod
@@ -303,7 +798,7 @@ class OrderService():
     def handle_payment_failed(payment_intent: dict, logger=None) -> None:
         """
         El stock nunca fue descontado en pending,
-        solo marcamos el pago y la orden como fallidos.
+        solo marcamos el pago y la orden como fallidos y liberamos el apartado.
         """
         log = logger or logging.getLogger(__name__)
 
@@ -322,11 +817,17 @@ class OrderService():
 
         order = payment.order
         order.status = 'cancelled'
-        order.save(update_fields=['status'])
+        order.cancel_reason = 'payment_failed'
+        order.save(update_fields=['status', 'cancel_reason'])
+        ReservationService.release(order)
 
         log.warning(
-            f"Pago fallido\n"
-            f"{json.dumps({'order_id': order.id, 'payment_intent_id': payment_intent['id'], 'failure_reason': payment_intent.get('last_payment_error', {}).get('message')}, indent=2)}"
+            "Pago fallido",
+            extra={
+                'order_id': order.id,
+                'payment_intent_id': payment_intent['id'],
+                'failure_reason': (payment_intent.get('last_payment_error') or {}).get('message'),
+            }
         )
 
     # ─────────────────────────────────────────────
@@ -353,9 +854,7 @@ class OrderService():
 
         elif order.status == 'paid':
             # Stock sí fue descontado — devolver
-            for item in order.items.select_related('piece').all():
-                item.piece.quantity += item.quantity
-                item.piece.save(update_fields=['quantity'])
+            InventoryService.increment(order.items.values_list('piece_id', 'quantity'))
 
             # Reembolsar en Stripe
             try:
@@ -364,14 +863,16 @@ class OrderService():
                     reason='requested_by_customer'
                 )
                 log.info(
-                    f"Reembolso creado\n"
-                    f"{json.dumps({'order_id': order.id, 'amount': str(payment.amount)}, indent=2)}"
+                    "Reembolso creado",
+                    extra={'order_id': order.id, 'amount': str(payment.amount)}
                 )
             except stripe.error.StripeError as e:
                 raise RefundError(str(e)) from e
 
         order.status = 'cancelled'
-        order.save(update_fields=['status'])
+        order.cancel_reason = 'customer'
+        order.save(update_fields=['status', 'cancel_reason'])
+        ReservationService.release(order)
 
         if payment:
             payment.status = 'failed'
@@ -382,29 +883,8 @@ class OrderService():
             tracking.status = 'cancelled'
             tracking.save(update_fields=['status'])
 
-        order_items = order.items.select_related('piece').all()
-
-        OrderCancelledUserEmail.send_email(
-            to_email=order.user.email,
-            customer_name=order.user.username,
-            order_number=order.id,
-            cancellation_date=timezone.now().date(),
-            order_items=order_items,
-            order_total=order.total,
-            shop_url=FRONTEND_URL
-        )
-
-        OrderCancelledAdminEmail.send_email(
-            to_email=EMAIL_ADMIN,
-            customer_name=order.user.username,
-            order_number=order.id,
-            cancellation_date=timezone.now().date(),
-            order_items=order_items,
-            order_total=order.total,
-            customer_email=order.user.email,
-            customer_phone=order.address.phone_number,
-            admin_order_url=BACKEND_URL
-        )
+        order_id = order.id
+        transaction.on_commit(lambda: OrderNotificationService.order_cancelled(order_id))
 
     # ─────────────────────────────────────────────
     # TRACKING
@@ -416,17 +896,230 @@ class OrderService():
         instance.status = 'shipped'
         instance.save(update_fields=['tracking_number', 'status'])
 
-        order_items = instance.order.items.select_related('piece').all()
+        tracking_id = instance.id
+        transaction.on_commit(lambda: OrderNotificationService.order_shipped(tracking_id))
+        return instance
 
-        OrderShippedEmail.send_email(
-            to_email=instance.order.user.email,
-            order_number=instance.order.id,
-            order_date=instance.order.created_at,
-            customer_name=instance.order.user.username,
-            customer_email=instance.order.user.email,
-            tracking_number=instance.tracking_number,
-            tracking_url=instance.get_tracking_url(),
-            order_items=order_items,
-            order_total=instance.order.total
+
+# Si un worker muere con eventos en 'processing', se recuperan pasado este tiempo
+STRIPE_EVENT_PROCESSING_TIMEOUT = timedelta(minutes=10)
+
+
+class StripeEventService:
+    """
+    Ingesta asíncrona de webhooks: el view llama a `record` y responde 200,
+    el comando process_stripe_events drena la tabla con `drain`.
+    """
+
+    HANDLERS = {
+        'payment_intent.succeeded': OrderService.handle_payment_succeeded,
+        'payment_intent.payment_failed': OrderService.handle_payment_failed,
+        'payment_intent.canceled': OrderService.handle_payment_canceled,
+    }
+
+    @staticmethod
+    def record(event) -> bool:
+        """
+        Inserta el evento ya verificado. Retorna False si era una entrega
+        duplicada (conflicto en el índice único de event_id).
+        """
+        data = event['data']['object']
+        payload = data.to_dict() if hasattr(data, 'to_dict') else dict(data)
+        try:
+            with transaction.atomic():
+                StripeEvent.objects.create(
+                    event_id=event['id'],
+                    event_type=event['type'],
+                    payload=payload,
+                )
+        except IntegrityError:
+            return False
+        return True
+
+    @staticmethod
+    def claim_batch(batch_size: int) -> list[StripeEvent]:
+        """Reserva eventos con SELECT ... FOR UPDATE SKIP LOCKED."""
+        now = timezone.now()
+        with transaction.atomic():
+            ids = list(
+                StripeEvent.objects
+                .select_for_update(skip_locked=True)
+                .filter(
+                    Q(status='pending', next_attempt_at__lte=now)
+                    | Q(status='processing', locked_at__lt=now - STRIPE_EVENT_PROCESSING_TIMEOUT)
+                )
+                .order_by('created_at')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                return []
+            StripeEvent.objects.filter(id__in=ids).update(status='processing', locked_at=now)
+
+        return list(StripeEvent.objects.filter(id__in=ids).order_by('created_at'))
+
+    @staticmethod
+    def process(event: StripeEvent, logger=None) -> bool:
+        """Aplica un evento. Los errores se reintentan con backoff hasta agotar intentos."""
+        log = logger or logging.getLogger(__name__)
+        handler = StripeEventService.HANDLERS.get(event.event_type)
+
+        event.attempts += 1
+        try:
+            if handler:
+                handler(event.payload, logger=log)
+        except Exception as e:
+            event.last_error = str(e)[:2000]
+            if event.attempts >= settings.STRIPE_EVENT_MAX_ATTEMPTS:
+                event.status = 'dead'
+                log.error(
+                    "Evento de Stripe descartado",
+                    extra={'event_id': event.event_id, 'attempts': event.attempts, 'error': str(e)}
+                )
+            else:
+                event.status = 'pending'
+                event.next_attempt_at = timezone.now() + timedelta(minutes=2 ** (event.attempts - 1))
+                log.warning(
+                    "Error al procesar evento de Stripe, se reintentará",
+                    extra={'event_id': event.event_id, 'attempts': event.attempts, 'error': str(e)}
+                )
+            event.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error'])
+            return False
+
+        event.status = 'processed'
+        event.processed_at = timezone.now()
+        event.last_error = ''
+        event.save(update_fields=['status', 'attempts', 'processed_at', 'last_error'])
+        return True
+
+    @staticmethod
+    def drain(workers: int = 1, batch_size: int = 20, logger=None) -> dict:
+        """
+        Procesa eventos hasta vaciar la cola. Con workers > 1 cada hilo reserva
+        sus propios lotes; SKIP LOCKED evita que dos procesen el mismo evento.
+        """
+        stats = {'processed': 0, 'failed': 0}
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                while True:
+                    events = StripeEventService.claim_batch(batch_size)
+                    if not events:
+                        return
+                    for event in events:
+                        ok = StripeEventService.process(event, logger=logger)
+                        with lock:
+                            stats['processed' if ok else 'failed'] += 1
+            finally:
+                if workers > 1:
+                    connection.close()
+
+        if workers <= 1:
+            worker()
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for future in [executor.submit(worker) for _ in range(workers)]:
+                    future.result()
+
+        return stats
+
+
+# Si un worker muere con cancelaciones en 'processing', se recuperan pasado este tiempo
+CANCELLATION_PROCESSING_TIMEOUT = timedelta(minutes=10)
+
+
+class PaymentIntentCancellationService:
+    """
+    Cola de cancelaciones de PaymentIntent. Se llena con `enqueue` dentro de
+    la transacción que expira los pedidos y se drena con `drain`, que cancela
+    cada lote en paralelo con un pool acotado.
+    """
+
+    @staticmethod
+    def enqueue(intent_ids) -> None:
+        intent_ids = [intent_id for intent_id in intent_ids if intent_id and intent_id != 'pending']
+        if not intent_ids:
+            return
+        PaymentIntentCancellation.objects.bulk_create(
+            [PaymentIntentCancellation(payment_intent_id=intent_id) for intent_id in intent_ids],
+            ignore_conflicts=True,
         )
-        return instance
\ No newline at end of file
+
+    @staticmethod
+    def claim_batch(batch_size: int) -> list[PaymentIntentCancellation]:
+        """Reserva un lote con SELECT ... FOR UPDATE SKIP LOCKED."""
+        now = timezone.now()
+        with transaction.atomic():
+            ids = list(
+                PaymentIntentCancellation.objects
+                .select_for_update(skip_locked=True)
+                .filter(
+                    Q(status='pending', next_attempt_at__lte=now)
+                    | Q(status='processing', locked_at__lt=now - CANCELLATION_PROCESSING_TIMEOUT)
+                )
+                .order_by('next_attempt_at')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                return []
+            PaymentIntentCancellation.objects.filter(id__in=ids).update(status='processing', locked_at=now)
+
+        return list(PaymentIntentCancellation.objects.filter(id__in=ids))
+
+    @staticmethod
+    def _cancel(row: PaymentIntentCancellation) -> str | None:
+        """Llama a Stripe. Retorna None si quedó cancelado, o el error si hay que reintentar."""
+        try:
+            stripe.PaymentIntent.cancel(row.payment_intent_id)
+        except stripe.error.InvalidRequestError:
+            # Ya estaba cancelado o ya no es cancelable: no hay nada que reintentar
+            return None
+        except stripe.error.StripeError as e:
+            return str(e) or e.__class__.__name__
+        return None
+
+    @staticmethod
+    def drain(workers: int = 8, batch_size: int = 50, logger=None, cancel=None) -> dict:
+        """
+        Procesa la cola hasta vaciarla. Cada lote se cancela en paralelo con
+        `workers` hilos (sólo HTTP; las escrituras se hacen en bloque al final).
+        `cancel` permite sustituir la llamada a Stripe (p. ej. un stub local).
+        """
+        log = logger or logging.getLogger(__name__)
+        cancel = cancel or PaymentIntentCancellationService._cancel
+        stats = {'cancelled': 0, 'retried': 0, 'dead': 0}
+        max_attempts = settings.STRIPE_CANCEL_MAX_ATTEMPTS
+
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            while True:
+                rows = PaymentIntentCancellationService.claim_batch(batch_size)
+                if not rows:
+                    break
+
+                now = timezone.now()
+                for row, error in zip(rows, executor.map(cancel, rows)):
+                    row.attempts += 1
+                    if error is None:
+                        row.status = 'done'
+                        row.processed_at = now
+                        row.last_error = ''
+                        stats['cancelled'] += 1
+                    elif row.attempts >= max_attempts:
+                        row.status = 'dead'
+                        row.last_error = error[:2000]
+                        stats['dead'] += 1
+                        log.error(
+                            "Cancelación de PaymentIntent descartada",
+                            extra={'payment_intent_id': row.payment_intent_id, 'error': error}
+                        )
+                    else:
+                        row.status = 'pending'
+                        row.last_error = error[:2000]
+                        row.next_attempt_at = now + timedelta(minutes=2 ** (row.attempts - 1))
+                        stats['retried'] += 1
+
+                PaymentIntentCancellation.objects.bulk_update(
+                    rows, ['status', 'attempts', 'processed_at', 'last_error', 'next_attempt_at']
+                )
+
+        return stats
@@ -0,0 +1,64 @@
+# signals.py
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from orders.service import CouponService
+from .models import Coupon, CouponUsage
+
+#========================= COUPON =============================
+
+@receiver(pre_save, sender=Coupon)
+def recordar_codigo_anterior_cupon(sender, instance, **kwargs):
+    # Si cambia el código hay que invalidar también la llave anterior
+    instance._codigo_anterior = None
+    if instance.pk:
+        instance._codigo_anterior = (
+            Coupon.all_objects.filter(pk=instance.pk).values_list('code', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Coupon)
+def invalidar_cache_cupon(sender, instance, **kwargs):
+    CouponService.invalidate(instance.code)
+    if getattr(instance, '_codigo_anterior', None):
+        CouponService.invalidate(instance._codigo_anterior)
+
+
+@receiver(post_delete, sender=Coupon)
+def invalidar_cache_cupon_eliminado(sender, instance, **kwargs):
+    CouponService.invalidate(instance.code)
+
+
+#========================= COUPON USAGE =============================
+# used_count cuenta los CouponUsage vigentes (como el backfill de 0008). Al crearse
+# ya lo incrementó Coupon.redeem; aquí sólo se siguen bajas, restauraciones y borrados.
+
+def _uso_vigente(usage) -> bool:
+    return usage.is_active and usage.deleted_at is None
+
+
+@receiver(pre_save, sender=CouponUsage)
+def recordar_estado_anterior_uso(sender, instance, **kwargs):
+    instance._estaba_vigente = None
+    if instance.pk:
+        anterior = (
+            CouponUsage.all_objects.filter(pk=instance.pk).values('is_active', 'deleted_at').first()
+        )
+        if anterior is not None:
+            instance._estaba_vigente = anterior['is_active'] and anterior['deleted_at'] is None
+
+
+@receiver(post_save, sender=CouponUsage)
+def ajustar_usos_cupon(sender, instance, created, **kwargs):
+    estaba = getattr(instance, '_estaba_vigente', None)
+    if created or estaba is None:
+        return
+    vigente = _uso_vigente(instance)
+    if vigente != estaba:
+        CouponService.adjust_used_count({instance.coupon_id: 1 if vigente else -1})
+
+
+@receiver(post_delete, sender=CouponUsage)
+def descontar_uso_eliminado(sender, instance, **kwargs):
+    if _uso_vigente(instance):
+        CouponService.adjust_used_count({instance.coupon_id: -1})
@@ -0,0 +1,309 @@
+import csv
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, transaction
+from django.test import override_settings
+from django.utils import timezone
+
+from orders.admin import CouponBatchForm
+from orders.models import Coupon, CouponUsage, Order
+from orders.service import CouponService
+from orders.test.test_stripe import OrderTestBase, User
+
+
+class CouponUsedCountTest(OrderTestBase):
+
+    def setUp(self):
+        super().setUp()
+        today = timezone.now().date()
+        self.limited = Coupon.objects.create(
+            code="UNAVEZ",
+            percentage=Decimal("10.0"),
+            valid_from=today,
+            valid_until=today + timezone.timedelta(days=1),
+            max_uses=2,
+        )
+
+    def test_redeem_increments_until_max_uses(self):
+        self.assertTrue(self.limited.redeem())
+        self.assertTrue(self.limited.redeem())
+        self.assertFalse(self.limited.redeem())
+
+        self.limited.refresh_from_db()
+        self.assertEqual(self.limited.used_count, 2)
+        self.assertFalse(self.limited.has_uses_remaining())
+
+    def test_redeem_checks_database_not_stale_instance(self):
+        stale = Coupon.objects.get(id=self.limited.id)
+        Coupon.objects.filter(id=self.limited.id).update(used_count=2)
+
+        self.assertTrue(stale.has_uses_remaining())
+        self.assertFalse(stale.redeem())
+
+    def test_unlimited_coupon_always_redeems(self):
+        self.assertTrue(self.coupon.redeem())
+        self.coupon.refresh_from_db()
+        self.assertEqual(self.coupon.used_count, 1)
+
+    def test_has_uses_remaining_does_not_query(self):
+        with self.assertNumQueries(0):
+            self.assertTrue(self.limited.has_uses_remaining())
+
+    def _usage(self):
+        self.assertTrue(self.limited.redeem())
+        order = Order.objects.create(user=self.user, address=self.address, total=Decimal("100"))
+        return CouponUsage.objects.create(
+            order=order, coupon=self.limited, user=self.user, discount_applied=Decimal("10"),
+        )
+
+    def _used_count(self):
+        self.limited.refresh_from_db()
+        return self.limited.used_count
+
+    def test_soft_delete_and_restore_adjust_used_count(self):
+        usage = self._usage()
+
+        usage.delete()
+        self.assertEqual(self._used_count(), 0)
+
+        usage.restore()
+        self.assertEqual(self._used_count(), 1)
+
+    def test_hard_delete_releases_use(self):
+        self._usage().hard_delete()
+
+        self.assertEqual(self._used_count(), 0)
+
+    def test_admin_actions_adjust_used_count(self):
+        usage = self._usage()
+        admin_user = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        self.client.force_login(admin_user)
+        url = "/admin/orders/couponusage/"
+
+        self.client.post(url, {"action": "action_deactivate", "_selected_action": [usage.id]})
+        self.assertEqual(self._used_count(), 0)
+        # Desactivar otra vez no vuelve a descontar
+        self.client.post(url, {"action": "action_deactivate", "_selected_action": [usage.id]})
+        self.assertEqual(self._used_count(), 0)
+
+        self.client.post(url, {"action": "action_restore", "_selected_action": [usage.id]})
+        self.assertEqual(self._used_count(), 1)
+
+    def test_admin_bulk_delete_releases_use(self):
+        usage = self._usage()
+        admin_user = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        self.client.force_login(admin_user)
+        url = "/admin/orders/couponusage/"
+        payload = {"action": "delete_selected", "_selected_action": [usage.id], "post": "yes"}
+
+        self.client.post(url, payload)
+        self.assertEqual(self._used_count(), 0)
+        self.assertTrue(CouponUsage.all_objects.get(id=usage.id).is_deleted)
+        # Borrar otra vez un uso ya borrado no vuelve a descontar
+        self.client.post(url, payload)
+        self.assertEqual(self._used_count(), 0)
+
+
+class CouponCacheTest(OrderTestBase):
+    URL = "/api/v1/orders/coupons/validate/"
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self._authenticate()
+
+    def test_lookup_is_case_insensitive_and_cached(self):
+        self.assertEqual(CouponService.get("descuento20").id, self.coupon.id)
+
+        with self.assertNumQueries(0):
+            coupon = CouponService.get("Descuento20")
+        self.assertEqual(coupon.id, self.coupon.id)
+        self.assertEqual(coupon.percentage, Decimal("20.0"))
+
+    def test_unknown_code_is_negatively_cached(self):
+        self.assertIsNone(CouponService.get("NOEXISTE"))
+        with self.assertNumQueries(0):
+            self.assertIsNone(CouponService.get("noexiste"))
+
+    def test_creating_coupon_clears_negative_entry(self):
+        CouponService.get("NUEVO")
+        today = timezone.now().date()
+        Coupon.objects.create(code="NUEVO", percentage=Decimal("5"), valid_from=today, valid_until=today)
+
+        self.assertIsNotNone(CouponService.get("nuevo"))
+
+    def test_save_invalidates_cached_entry(self):
+        CouponService.get("DESCUENTO20")
+        self.coupon.percentage = Decimal("30.0")
+        self.coupon.save()
+
+        self.assertEqual(CouponService.get("DESCUENTO20").percentage, Decimal("30.0"))
+
+    def test_case_insensitive_unique_index(self):
+        today = timezone.now().date()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Coupon.objects.create(code="descuento20", percentage=Decimal("5"), valid_from=today, valid_until=today)
+
+    def test_validate_view_uses_cache(self):
+        self.client.get(self.URL, {"code": "descuento20"})
+        resp = self.client.get(self.URL, {"code": "descuento20"})
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(Decimal(resp.data["percentage"]), Decimal("20.0"))
+
+    def test_validate_view_rejects_expired_cached_coupon(self):
+        resp = self.client.get(self.URL, {"code": "vencido"})
+        self.assertEqual(resp.status_code, 404)
+
+    def _admin_action(self, action, **extra):
+        admin_user = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        self.client.force_login(admin_user)
+        return self.client.post(
+            "/admin/orders/coupon/",
+            {"action": action, "_selected_action": [self.coupon.id], **extra},
+        )
+
+    def test_admin_deactivate_invalidates_cached_entry(self):
+        CouponService.get("DESCUENTO20")
+
+        self._admin_action("action_deactivate")
+
+        self.assertIsNone(CouponService.get("DESCUENTO20"))
+
+    def test_admin_bulk_delete_invalidates_cached_entry(self):
+        CouponService.get("DESCUENTO20")
+
+        self._admin_action("delete_selected", post="yes")
+
+        self.assertIsNone(CouponService.get("DESCUENTO20"))
+
+    def test_admin_restore_invalidates_negative_entry(self):
+        self.coupon.delete()
+        self.assertIsNone(CouponService.get("DESCUENTO20"))
+
+        self._admin_action("action_restore")
+
+        self.assertEqual(CouponService.get("DESCUENTO20").id, self.coupon.id)
+
+    def test_migration_upper_cases_existing_codes(self):
+        from importlib import import_module
+        from django.apps import apps
+
+        migration = import_module("orders.migrations.0009_coupon_code_upper_unique")
+        today = timezone.now().date()
+        Coupon.objects.create(code=" minusculas ", percentage=Decimal("5"), valid_from=today, valid_until=today)
+
+        migration.normalize_codes(apps, None)
+
+        self.assertTrue(Coupon.objects.filter(code="MINUSCULAS").exists())
+        self.assertTrue(Coupon.objects.filter(code="DESCUENTO20").exists())
+
+
+class GenerateCouponsTest(OrderTestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.now().date()
+
+    def _run(self, *args):
+        out = StringIO()
+        call_command(
+            "generate_coupons", "--percentage", "15",
+            "--valid-from", self.today.isoformat(),
+            "--valid-until", (self.today + timezone.timedelta(days=7)).isoformat(),
+            *args, stdout=out, stderr=StringIO(),
+        )
+        return list(csv.reader(StringIO(out.getvalue())))
+
+    def test_generates_unique_codes_in_chunks_and_streams_csv(self):
+        rows = self._run("--count", "250", "--prefix", "camp-", "--chunk-size", "100")
+
+        self.assertEqual(rows[0], ["code", "percentage", "valid_from", "valid_until", "max_uses"])
+        codes = [row[0] for row in rows[1:]]
+        self.assertEqual(len(codes), 250)
+        self.assertEqual(len(set(codes)), 250)
+        self.assertTrue(all(code.startswith("CAMP-") for code in codes))
+        self.assertEqual(Coupon.objects.filter(code__startswith="CAMP-", max_uses=1).count(), 250)
+
+    def test_existing_codes_are_replaced(self):
+        Coupon.objects.create(
+            code="X-AAAA", percentage=Decimal("5"), valid_from=self.today, valid_until=self.today,
+        )
+        picks = iter("AAAA" + "BBBB" + "CCCC")
+        with patch("orders.service.secrets.choice", side_effect=lambda alphabet: next(picks)):
+            rows = self._run("--count", "1", "--prefix", "X-", "--length", "4")
+
+        self.assertEqual(rows[1][0], "X-BBBB")
+
+    def test_length_without_room_for_count_is_rejected(self):
+        for args in (["--count", "1", "--length", "0"], ["--count", "1000", "--length", "4"]):
+            with self.subTest(args=args), self.assertRaises(CommandError):
+                self._run(*args)
+
+        self.assertFalse(Coupon.objects.filter(code__startswith="X-").exists())
+
+    def test_zero_chunk_size_is_rejected(self):
+        with self.assertRaises(CommandError):
+            self._run("--count", "1", "--chunk-size", "0")
+
+    def test_exhausted_code_space_stops_instead_of_looping(self):
+        with patch("orders.service.secrets.choice", return_value="A"), self.assertRaises(CommandError):
+            self._run("--count", "2", "--prefix", "X-", "--length", "4")
+
+        self.assertFalse(Coupon.objects.filter(code__startswith="X-").exists())
+
+    @override_settings(STORAGES={
+        **settings.STORAGES,
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    })
+    def test_admin_action_returns_csv(self):
+        admin_user = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        self.client.force_login(admin_user)
+        url = "/admin/orders/coupon/"
+
+        form_page = self.client.post(url, {"action": "action_generate_batch", "_selected_action": [self.coupon.id]})
+        self.assertEqual(form_page.status_code, 200)
+        self.assertContains(form_page, "Generar lote de cupones")
+
+        resp = self.client.post(url, {
+            "action": "action_generate_batch",
+            "_selected_action": [self.coupon.id],
+            "apply": "1",
+            "count": "20",
+            "prefix": "ADM-",
+            "percentage": "20",
+            "valid_from": self.today.isoformat(),
+            "valid_until": (self.today + timezone.timedelta(days=1)).isoformat(),
+            "max_uses": "1",
+        })
+
+        self.assertEqual(resp["Content-Type"], "text/csv")
+        # El lote ya está guardado antes de leer la respuesta
+        self.assertEqual(Coupon.objects.filter(code__startswith="ADM-").count(), 20)
+        lines = b"".join(resp.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 21)
+
+    def test_batch_form_reports_past_dates_on_its_own_fields(self):
+        form = CouponBatchForm({
+            "count": "5", "percentage": "10", "valid_from": "2020-01-01", "valid_until": "2020-01-02",
+        })
+
+        self.assertFalse(form.is_valid())
+        self.assertIn("valid_from", form.errors)
+        self.assertIn("valid_until", form.errors)
+
+    def test_batch_form_rejects_length_without_room_for_count(self):
+        form = CouponBatchForm({
+            "count": "1000", "percentage": "10", "length": "4",
+            "valid_from": self.today.isoformat(),
+            "valid_until": (self.today + timezone.timedelta(days=1)).isoformat(),
+        })
+
+        self.assertFalse(form.is_valid())
+        self.assertIn("length", form.errors)
@@ -0,0 +1,213 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+import stripe
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import override_settings
+from django.utils import timezone
+
+from orders.models import Order, Payment, PaymentIntentCancellation
+from orders.service import OrderService, PaymentIntentCancellationService
+from orders.test.test_stripe import OrderTestBase
+
+
+class ExpirePendingOrdersTest(OrderTestBase):
+    URL = "/api/v1/orders/checkout/"
+
+    def _checkout(self, payment_intent_id):
+        self._authenticate()
+        with patch("orders.views.stripe.PaymentIntent.create") as mock_pi:
+            mock_pi.return_value = {"id": payment_intent_id, "client_secret": "s"}
+            return self.client.post(self.URL, self._checkout_payload(), format="json")
+
+    @patch("orders.views.stripe.PaymentIntent.cancel")
+    def test_new_checkout_expires_previous_orders_without_calling_stripe(self, mock_cancel):
+        first = self._checkout("pi_1").data["order_id"]
+        second = self._checkout("pi_2").data["order_id"]
+
+        mock_cancel.assert_not_called()
+        self.assertEqual(Order.objects.get(id=first).status, "expired")
+        self.assertEqual(Payment.objects.get(order_id=first).status, "failed")
+        self.assertEqual(Order.objects.get(id=second).status, "pending")
+        self.assertEqual(
+            list(PaymentIntentCancellation.objects.values_list("payment_intent_id", "status")),
+            [("pi_1", "pending")],
+        )
+
+    def test_expire_orders_skips_orders_no_longer_pending(self):
+        paid = self._checkout("pi_paid").data["order_id"]
+        Order.objects.filter(id=paid).update(status="paid")
+
+        expired = OrderService.expire_orders([paid])
+
+        self.assertEqual(expired, 0)
+        self.assertEqual(Order.objects.get(id=paid).status, "paid")
+        self.assertFalse(PaymentIntentCancellation.objects.exists())
+
+
+    @patch("orders.service.stripe.Refund.create")
+    def test_payment_after_expiration_is_refunded_not_marked_paid(self, mock_refund):
+        first = self._checkout("pi_1").data["order_id"]
+        self._checkout("pi_2")
+        self.piece.refresh_from_db()
+        stock = self.piece.quantity
+
+        OrderService.handle_payment_succeeded({"id": "pi_1"})
+
+        mock_refund.assert_called_once()
+        self.assertEqual(mock_refund.call_args.kwargs["payment_intent"], "pi_1")
+        self.assertEqual(Order.objects.get(id=first).status, "expired")
+        self.assertEqual(Payment.objects.get(order_id=first).status, "failed")
+        self.piece.refresh_from_db()
+        self.assertEqual(self.piece.quantity, stock)
+        self.assertEqual(PaymentIntentCancellation.objects.get(payment_intent_id="pi_1").status, "done")
+
+    @patch("orders.service.stripe.Refund.create")
+    def test_failed_refund_for_late_payment_is_left_for_retry(self, mock_refund):
+        first = self._checkout("pi_1").data["order_id"]
+        self._checkout("pi_2")
+        mock_refund.side_effect = stripe.error.APIConnectionError("timeout")
+
+        with self.assertRaises(stripe.error.APIConnectionError):
+            OrderService.handle_payment_succeeded({"id": "pi_1"})
+
+        self.assertEqual(Order.objects.get(id=first).status, "expired")
+        self.assertEqual(PaymentIntentCancellation.objects.get(payment_intent_id="pi_1").status, "pending")
+
+    @patch("orders.service.stripe.Refund.create")
+    def test_retry_after_declined_card_marks_order_paid(self, mock_refund):
+        order_id = self._checkout("pi_1").data["order_id"]
+
+        OrderService.handle_payment_failed({"id": "pi_1", "last_payment_error": {"message": "declined"}})
+        self.assertEqual(Order.objects.get(id=order_id).cancel_reason, "payment_failed")
+        # El cliente reintenta el mismo PaymentIntent con otra tarjeta
+        OrderService.handle_payment_succeeded({"id": "pi_1"})
+
+        mock_refund.assert_not_called()
+        order = Order.objects.get(id=order_id)
+        self.assertEqual(order.status, "paid")
+        self.assertEqual(order.cancel_reason, "")
+        self.assertEqual(Payment.objects.get(order_id=order_id).status, "completed")
+
+    @patch("orders.service.stripe.Refund.create")
+    @patch("orders.service.stripe.PaymentIntent.cancel")
+    def test_payment_after_customer_cancellation_is_refunded(self, mock_cancel, mock_refund):
+        order_id = self._checkout("pi_1").data["order_id"]
+        order = Order.objects.get(id=order_id)
+        # can_be_cancelled exige un rastreo pendiente
+        order.trakings.create()
+
+        OrderService.cancel_order(order)
+        OrderService.handle_payment_succeeded({"id": "pi_1"})
+
+        mock_refund.assert_called_once()
+        self.assertEqual(Order.objects.get(id=order_id).status, "cancelled")
+
+
+class PaymentIntentCancellationServiceTest(OrderTestBase):
+
+    def setUp(self):
+        super().setUp()
+        PaymentIntentCancellationService.enqueue(["pi_a", "pi_b", "pi_c"])
+
+    @patch("orders.views.stripe.PaymentIntent.cancel")
+    def test_drain_cancels_queue_concurrently(self, mock_cancel):
+        stats = PaymentIntentCancellationService.drain(workers=3, batch_size=2)
+
+        self.assertEqual(stats["cancelled"], 3)
+        self.assertEqual(
+            sorted(call.args[0] for call in mock_cancel.call_args_list),
+            ["pi_a", "pi_b", "pi_c"],
+        )
+        self.assertFalse(PaymentIntentCancellation.objects.exclude(status="done").exists())
+
+    def test_enqueue_ignores_duplicates(self):
+        PaymentIntentCancellationService.enqueue(["pi_a", "pending"])
+        self.assertEqual(PaymentIntentCancellation.objects.count(), 3)
+
+    @patch("orders.views.stripe.PaymentIntent.cancel")
+    def test_already_cancelled_intent_is_not_retried(self, mock_cancel):
+        mock_cancel.side_effect = stripe.error.InvalidRequestError("ya cancelado", "id")
+
+        stats = PaymentIntentCancellationService.drain(workers=2)
+
+        self.assertEqual(stats["cancelled"], 3)
+
+    @patch("orders.views.stripe.PaymentIntent.cancel")
+    def test_transient_errors_are_retried_with_backoff(self, mock_cancel):
+        mock_cancel.side_effect = stripe.error.APIConnectionError("timeout")
+
+        stats = PaymentIntentCancellationService.drain(workers=2)
+
+        row = PaymentIntentCancellation.objects.get(payment_intent_id="pi_a")
+        self.assertEqual(stats["retried"], 3)
+        self.assertEqual(row.status, "pending")
+        self.assertEqual(row.attempts, 1)
+        self.assertGreater(row.next_attempt_at, timezone.now())
+
+    @override_settings(STRIPE_CANCEL_MAX_ATTEMPTS=1)
+    @patch("orders.views.stripe.PaymentIntent.cancel")
+    def test_exhausted_retries_are_dead_lettered(self, mock_cancel):
+        mock_cancel.side_effect = stripe.error.APIConnectionError("timeout")
+
+        stats = PaymentIntentCancellationService.drain(workers=2)
+
+        self.assertEqual(stats["dead"], 3)
+
+
+class ExpirePendingOrdersCommandTest(OrderTestBase):
+
+    def _order(self, status, minutes_ago, intent_id):
+        order = Order.objects.create(
+            user=self.user, address=self.address, total=Decimal("500.00"), status=status,
+        )
+        Payment.objects.create(
+            order=order, amount=Decimal("500.00"), payment_method="card",
+            external_id=intent_id, status="pending",
+        )
+        Order.objects.filter(id=order.id).update(
+            created_at=timezone.now() - timedelta(minutes=minutes_ago)
+        )
+        return order
+
+    def _run(self, *args):
+        out = StringIO()
+        call_command("expire_pending_orders", "--older-than-minutes", "60", *args, stdout=out)
+        return out.getvalue()
+
+    @override_settings(DEBUG=True)
+    def test_sweeper_expires_only_old_pending_orders(self):
+        old = [self._order("pending", 120 + i, f"pi_old_{i}") for i in range(5)]
+        recent = self._order("pending", 5, "pi_recent")
+        paid = self._order("paid", 300, "pi_paid")
+
+        output = self._run("--batch-size", "2", "--stub", "--stub-latency-ms", "1")
+
+        self.assertEqual(
+            set(Order.objects.filter(status="expired").values_list("id", flat=True)),
+            {order.id for order in old},
+        )
+        self.assertEqual(Order.objects.get(id=recent.id).status, "pending")
+        self.assertEqual(Order.objects.get(id=paid.id).status, "paid")
+        self.assertEqual(PaymentIntentCancellation.objects.filter(status="done").count(), 5)
+        self.assertIn("5 pedidos expirados", output)
+        self.assertIn("3 páginas", output)
+
+    def test_stub_is_refused_outside_debug(self):
+        self._order("pending", 120, "pi_old")
+
+        with self.assertRaises(CommandError):
+            self._run("--stub")
+
+        self.assertEqual(Order.objects.get().status, "pending")
+        self.assertFalse(PaymentIntentCancellation.objects.exists())
+
+    def test_no_cancel_leaves_intents_queued(self):
+        self._order("pending", 120, "pi_old")
+
+        self._run("--no-cancel")
+
+        self.assertEqual(PaymentIntentCancellation.objects.get().status, "pending")
@@ -0,0 +1,78 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework import status
+
+from orders.models import Order, StockReservation
+from orders.service import OrderService, ReservationService
+from orders.test.test_stripe import OrderTestBase
+
+
+class StockReservationTest(OrderTestBase):
+    URL = "/api/v1/orders/checkout/"
+
+    def setUp(self):
+        super().setUp()
+        self.piece.quantity = 1
+        self.piece.save()
+
+    def _checkout(self, user, address, payment_intent_id):
+        self._authenticate(user)
+        payload = self._checkout_payload()
+        payload["address"] = address.id
+        with patch("orders.views.stripe.PaymentIntent.create") as mock_pi:
+            mock_pi.return_value = {"id": payment_intent_id, "client_secret": "s"}
+            return self.client.post(self.URL, payload, format="json")
+
+    def test_checkout_holds_stock(self):
+        resp = self._checkout(self.user, self.address, "pi_1")
+
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        hold = StockReservation.objects.get(order_id=resp.data["order_id"])
+        self.assertEqual(hold.status, "active")
+        self.assertGreater(hold.expires_at, timezone.now())
+        self.assertEqual(ReservationService.available([self.piece])[self.piece.id], 0)
+
+    def test_second_shopper_cannot_reach_stripe_for_held_unit(self):
+        self._checkout(self.user, self.address, "pi_1")
+        resp = self._checkout(self.other_user, self.other_address, "pi_2")
+
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Order.objects.filter(user=self.other_user).count(), 0)
+
+    def test_expired_hold_frees_stock(self):
+        self._checkout(self.user, self.address, "pi_1")
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        resp = self._checkout(self.other_user, self.other_address, "pi_2")
+
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+
+    def test_payment_failed_releases_hold(self):
+        resp = self._checkout(self.user, self.address, "pi_1")
+
+        OrderService.handle_payment_failed({"id": "pi_1"})
+
+        hold = StockReservation.objects.get(order_id=resp.data["order_id"])
+        self.assertEqual(hold.status, "released")
+
+    def test_payment_succeeded_consumes_hold(self):
+        resp = self._checkout(self.user, self.address, "pi_1")
+
+        OrderService.handle_payment_succeeded({"id": "pi_1"})
+
+        self.piece.refresh_from_db()
+        hold = StockReservation.objects.get(order_id=resp.data["order_id"])
+        self.assertEqual(hold.status, "consumed")
+        self.assertEqual(self.piece.quantity, 0)
+
+    def test_sweeper_marks_expired_holds(self):
+        self._checkout(self.user, self.address, "pi_1")
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        call_command("release_expired_reservations", stdout=StringIO())
+
+        self.assertEqual(StockReservation.objects.get().status, "expired")
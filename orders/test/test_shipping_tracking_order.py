@@ -1,5 +1,8 @@
 from decimal import Decimal
 import io
+from unittest.mock import patch
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from django.contrib.auth import get_user_model
@@ -225,6 +228,50 @@ class TestOrderList(OrderTestMixin, APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["count"], 3)
 
+    def _add_orders(self, n):
+        for i in range(n):
+            order = Order.objects.create(
+                user=self.user, total=Decimal("10.00"), status="paid", address=self.address
+            )
+            OrderItem.objects.create(
+                order=order, piece=self.piece, quantity=1, price_snapshot=Decimal("10.00")
+            )
+            Payment.objects.create(
+                order=order,
+                amount=Decimal("10.00"),
+                payment_method="stripe",
+                external_id=f"pi_page_{i}",
+                status="completed",
+            )
+
+    def _list_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("orders-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries), response
+
+    def test_list_query_count_does_not_grow_with_page_size(self):
+        self.login()
+        self._add_orders(1)
+        baseline, _ = self._list_queries()
+
+        self._add_orders(5)
+        queries, response = self._list_queries()
+
+        # count + página + un prefetch por relación anidada, sin N+1
+        self.assertEqual(queries, baseline)
+        self.assertEqual(response.data["count"], 7)
+
+    def test_list_is_ordered_newest_first(self):
+        self.login()
+        newer = Order.objects.create(
+            user=self.user, total=Decimal("10.00"), status="paid", address=self.address
+        )
+        response = self.client.get(reverse("orders-list"))
+
+        ids = [row["id"] for row in response.data["results"]]
+        self.assertEqual(ids, [newer.id, self.order.id])
+
 
 # ===========================================================================
 # OrderViewSet — RETRIEVE
@@ -409,6 +456,26 @@ class TestShippingTrackingList(OrderTestMixin, APITestCase):
         for field in ("id", "carrier", "tracking_number", "status", "shipped_at", "delivered_at"):
             self.assertIn(field, first, msg=f"Campo '{field}' no encontrado en la respuesta")
 
+    @patch("pieces.service.CurrencyService.get_usd_rate", return_value=Decimal("17.50"))
+    def test_list_resolves_rate_once_and_avoids_n_plus_one(self, get_rate):
+        self.login()
+        with CaptureQueriesContext(connection) as baseline:
+            self.client.get(reverse("shipping-tracking-list"))
+
+        for i in range(5):
+            order = Order.objects.create(
+                user=self.user, total=Decimal("10.00"), status="paid", address=self.address
+            )
+            ShippingTracking.objects.create(order=order, tracking_number=f"trk-{i}")
+        get_rate.reset_mock()
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("shipping-tracking-list"))
+
+        self.assertEqual(response.data["count"], 6)
+        self.assertEqual(len(ctx.captured_queries), len(baseline.captured_queries))
+        get_rate.assert_called_once()
+
 
 # ===========================================================================
 # ShippingTrackingViewSet — RETRIEVE
@@ -470,6 +537,52 @@ class TestShippingTrackingRetrieve(OrderTestMixin, APITestCase):
         self.assertIsNotNone(response.data["shipped_at"])
         self.assertIsNone(response.data["delivered_at"])
 
+    @patch("pieces.service.CurrencyService.get_usd_rate", return_value=Decimal("17.50"))
+    def test_detail_query_count_is_independent_of_items(self, get_rate):
+        tracking = ShippingTracking.objects.create(order=self.order, status="pending")
+        OrderItem.objects.create(
+            order=self.order, piece=self.piece, quantity=1, price_snapshot=Decimal("99.99")
+        )
+        self.login()
+        url = reverse("shipping-tracking-detail", kwargs={"pk": tracking.pk})
+        with CaptureQueriesContext(connection) as baseline:
+            self.client.get(url)
+
+        for i in range(4):
+            piece = Piece.objects.create(
+                title=f"Pieza {i}",
+                description="Descripción",
+                quantity=5,
+                price_base=Decimal("100.00"),
+                width=Decimal("10.00"),
+                height=Decimal("20.00"),
+                length=Decimal("5.00"),
+                weight=Decimal("1.50"),
+                type=self.type_piece,
+                section=self.section,
+                thumbnail_path=self._fake_image(),
+            )
+            OrderItem.objects.create(
+                order=self.order, piece=piece, quantity=1, price_snapshot=Decimal("99.99")
+            )
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+
+        self.assertEqual(len(ctx.captured_queries), len(baseline.captured_queries))
+        self.assertEqual(len(response.data["order"]["items"]), 5)
+        self.assertTrue(response.data["order"]["can_be_cancelled"])
+
+    @patch("pieces.service.CurrencyService.get_usd_rate", return_value=Decimal("17.50"))
+    def test_detail_can_be_cancelled_uses_latest_tracking(self, get_rate):
+        self.login()
+        response = self.client.get(
+            reverse("shipping-tracking-detail", kwargs={"pk": self.shipping_tracking.pk})
+        )
+
+        self.assertFalse(response.data["order"]["can_be_cancelled"])
+        get_rate.assert_called_once()
+
 
 # ===========================================================================
 # ShippingTrackingViewSet — READ ONLY
@@ -550,4 +663,49 @@ class TestNestedShippingTracking(OrderTestMixin, APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         ids = [t["id"] for t in response.data["results"]]
-        self.assertNotIn(self.other_shipping_tracking.id, ids)
\ No newline at end of file
+        self.assertNotIn(self.other_shipping_tracking.id, ids)
+
+# ===========================================================================
+# Order.can_be_cancelled — anotación del último rastreo
+# ===========================================================================
+
+class TestOrderLatestTrackingStatus(OrderTestMixin, APITestCase):
+
+    def test_annotation_uses_latest_tracking(self):
+        ShippingTracking.objects.create(order=self.order, status="pending")
+
+        order = Order.objects.with_latest_tracking_status().get(pk=self.order.pk)
+
+        self.assertEqual(order.latest_tracking_status, "pending")
+        with self.assertNumQueries(0):
+            self.assertTrue(order.can_be_cancelled())
+
+    def test_annotated_list_answers_without_queries_per_order(self):
+        for _ in range(3):
+            order = Order.objects.create(
+                user=self.user, total=Decimal("10.00"), status="pending", address=self.address
+            )
+            ShippingTracking.objects.create(order=order, status="pending")
+        Order.objects.create(
+            user=self.user, total=Decimal("10.00"), status="pending", address=self.address
+        )
+
+        orders = list(Order.objects.with_latest_tracking_status().filter(user=self.user))
+
+        with self.assertNumQueries(0):
+            results = [order.can_be_cancelled() for order in orders]
+        self.assertEqual(sorted(results), [False, False, True, True, True])
+
+    def test_cancelled_order_is_never_cancellable(self):
+        ShippingTracking.objects.create(order=self.order, status="pending")
+        Order.objects.filter(pk=self.order.pk).update(status="cancelled")
+
+        order = Order.objects.with_latest_tracking_status().get(pk=self.order.pk)
+
+        self.assertFalse(order.can_be_cancelled())
+
+    def test_fallback_without_annotation_matches(self):
+        ShippingTracking.objects.create(order=self.order, status="pending")
+
+        self.assertTrue(Order.objects.get(pk=self.order.pk).can_be_cancelled())
+        self.assertFalse(Order.objects.get(pk=self.other_order.pk).can_be_cancelled())
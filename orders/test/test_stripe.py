@@ -1,5 +1,6 @@
 # orders/tests/test_views.py
 import json
+import uuid
 from decimal import Decimal
 from unittest.mock import patch
 
@@ -13,8 +14,9 @@ from rest_framework.test import APIClient
 from rest_framework import status
 
 from orders.models import (
-    Coupon, CouponUsage, Order, OrderItem, Payment, ShippingTracking
+    Coupon, CouponUsage, Order, OrderItem, Payment, ShippingTracking, StripeEvent
 )
+from orders.service import StripeEventService
 
 
 # ===========================================================================
@@ -186,6 +188,36 @@ class CheckoutViewTest(OrderTestBase):
         self.piece.refresh_from_db()
         self.assertEqual(self.piece.quantity, initial_qty - 3)
 
+    @patch("orders.views.stripe.PaymentIntent.create")
+    def test_checkout_query_count_does_not_grow_with_cart_size(self, mock_pi):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        mock_pi.return_value = {"id": "pi_q", "client_secret": "s"}
+        pieces = [
+            self._create_piece(title=f"Obra carrito {i}", price=Decimal("100.00"), quantity=5)
+            for i in range(10)
+        ]
+
+        def checkout(user, address, cart):
+            self._authenticate(user)
+            payload = {
+                "address": address.id,
+                "payment_method": "card",
+                "items": [{"piece": piece.id, "quantity": 1} for piece in cart],
+            }
+            with CaptureQueriesContext(connection) as ctx:
+                resp = self.client.post(self.URL, payload, format="json")
+            self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+            return len(ctx.captured_queries)
+
+        one_item = checkout(self.other_user, self.other_address, pieces[:1])
+        ten_items = checkout(self.user, self.address, pieces)
+
+        self.assertEqual(one_item, ten_items)
+        order = Order.objects.get(user=self.user)
+        self.assertEqual(order.items.count(), 10)
+
     @patch("orders.views.stripe.PaymentIntent.create")
     def test_order_total_is_calculated_correctly(self, mock_pi):
         mock_pi.return_value = {"id": "pi_t", "client_secret": "s"}
@@ -376,18 +408,22 @@ class StripeWebhookViewTest(OrderTestBase):
         self.piece.quantity -= 2
         self.piece.save()
 
-    def _post_webhook(self, event_type, payment_intent_id="pi_webhook_test"):
+    def _post_webhook(self, event_type, payment_intent_id="pi_webhook_test", event_id=None, process=True):
         with patch("orders.views.stripe.Webhook.construct_event") as mock_event:
             mock_event.return_value = {
+                "id": event_id or f"evt_{uuid.uuid4().hex}",
                 "type": event_type,
                 "data": {"object": {"id": payment_intent_id}},
             }
-            return self.client.post(
+            resp = self.client.post(
                 self.URL,
                 data=json.dumps({"dummy": True}),
                 content_type="application/json",
                 HTTP_STRIPE_SIGNATURE="t=1,v1=fake",
             )
+        if process:
+            StripeEventService.drain(workers=1)
+        return resp
 
     # ---- signature / auth ----
 
@@ -416,6 +452,42 @@ class StripeWebhookViewTest(OrderTestBase):
         resp = self._post_webhook("payment_intent.succeeded")
         self.assertEqual(resp.status_code, 200)
 
+    # ---- ingesta asíncrona ----
+
+    def test_webhook_only_records_event(self):
+        resp = self._post_webhook("payment_intent.succeeded", event_id="evt_1", process=False)
+
+        self.assertEqual(resp.status_code, 200)
+        event = StripeEvent.objects.get(event_id="evt_1")
+        self.assertEqual(event.status, "pending")
+        self.assertEqual(event.payload, {"id": "pi_webhook_test"})
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, "pending")
+
+    def test_duplicate_delivery_is_stored_once(self):
+        self._post_webhook("payment_intent.succeeded", event_id="evt_dup", process=False)
+        resp = self._post_webhook("payment_intent.succeeded", event_id="evt_dup", process=False)
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(StripeEvent.objects.filter(event_id="evt_dup").count(), 1)
+
+    def test_worker_marks_event_processed(self):
+        self._post_webhook("payment_intent.succeeded", event_id="evt_ok")
+
+        event = StripeEvent.objects.get(event_id="evt_ok")
+        self.assertEqual(event.status, "processed")
+        self.assertEqual(event.attempts, 1)
+        self.assertIsNotNone(event.processed_at)
+
+    def test_failed_event_is_rescheduled(self):
+        self._post_webhook("payment_intent.succeeded", "pi_unknown", event_id="evt_bad")
+
+        event = StripeEvent.objects.get(event_id="evt_bad")
+        self.assertEqual(event.status, "pending")
+        self.assertEqual(event.attempts, 1)
+        self.assertGreater(event.next_attempt_at, timezone.now())
+        self.assertIn("pi_unknown", event.last_error)
+
     # ---- payment_intent.succeeded ----
 
     def test_succeeded_marks_order_as_paid(self):
@@ -432,6 +504,26 @@ class StripeWebhookViewTest(OrderTestBase):
         self._post_webhook("payment_intent.succeeded")
         self.assertTrue(ShippingTracking.objects.filter(order=self.order).exists())
 
+    def test_succeeded_decrements_stock(self):
+        self.piece.refresh_from_db()
+        stock_before = self.piece.quantity
+        self._post_webhook("payment_intent.succeeded")
+        self.piece.refresh_from_db()
+        self.assertEqual(self.piece.quantity, stock_before - 2)
+
+    @patch("orders.views.stripe.Refund.create")
+    def test_succeeded_oversold_refunds_and_cancels(self, mock_refund):
+        from pieces.models import Piece
+        Piece.objects.filter(id=self.piece.id).update(quantity=1)
+
+        self._post_webhook("payment_intent.succeeded")
+
+        self.order.refresh_from_db()
+        self.piece.refresh_from_db()
+        self.assertEqual(self.order.status, "cancelled")
+        self.assertEqual(self.piece.quantity, 1)
+        mock_refund.assert_called_once()
+
     def test_succeeded_idempotent_on_duplicate_event(self):
         self._post_webhook("payment_intent.succeeded")
         resp = self._post_webhook("payment_intent.succeeded")   # duplicate
@@ -443,6 +535,18 @@ class StripeWebhookViewTest(OrderTestBase):
         resp = self._post_webhook("payment_intent.succeeded", "pi_unknown")
         self.assertEqual(resp.status_code, 200)
 
+    def test_succeeded_notifications_wait_for_commit(self):
+        from core.models import EmailOutbox
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self._post_webhook("payment_intent.succeeded")
+            self.assertFalse(EmailOutbox.objects.exists())
+
+        self.assertEqual(len(callbacks), 1)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(EmailOutbox.objects.count(), 2)
+
     # ---- payment_intent.payment_failed ----
 
     def test_payment_failed_cancels_order(self):
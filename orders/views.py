@@ -3,13 +3,12 @@ import traceback
 
 import stripe
 from django.db import transaction
+from django.db.models import Prefetch
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from rest_framework.viewsets import ReadOnlyModelViewSet, ModelViewSet
-from django.utils import timezone
 
 from pieces.service import CurrencyService
-from .models import Coupon
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
@@ -23,8 +22,8 @@ from orders.docs.schemas import CANCEL_ORDER_VIEW, CHECKOUT_VIEW, ORDER_VIEWSET,
 from orders.exceptions import OrderNotCancellableError, RefundError
 from orders.filters import OrderFilter
 from orders.serializer import CheckoutSerializer, OrderSerializer, ShippingTrackingDetailSerializer, ShippingTrackingSerializer, UpdateTrackingNumberSerializer
-from orders.service import OrderService
-from .models import CouponUsage, Order, OrderItem, Payment, ShippingTracking
+from orders.service import CouponService, OrderService, StripeEventService
+from .models import CouponUsage, Order, OrderItem, Payment, ShippingTracking, latest_tracking_status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
@@ -104,16 +103,12 @@ class StripeWebhookView(SentryErrorHandlerMixin, APIView):
             self.logger.warning("Firma de webhook inválida")
             return Response({'error': 'Firma inválida'}, status=400)
 
-        self.logger.info("Webhook recibido", extra={"event_type": event['type']})
-
-        event_type = event['type']
-
-        if event_type == 'payment_intent.succeeded':
-            OrderService.handle_payment_succeeded(event['data']['object'], logger=self.logger)
-        elif event_type == 'payment_intent.payment_failed':
-            OrderService.handle_payment_failed(event['data']['object'], logger=self.logger)
-        elif event_type == 'payment_intent.canceled':
-            OrderService.handle_payment_canceled(event['data']['object'], logger=self.logger)
+        # Sólo se persiste el evento; process_stripe_events lo aplica fuera del request
+        created = StripeEventService.record(event)
+        self.logger.info(
+            "Webhook recibido",
+            extra={"event_type": event['type'], "event_id": event['id'], "duplicate": not created}
+        )
 
         return Response({'status': 'ok'}, status=200)
 
@@ -125,7 +120,11 @@ class CancelOrderView(SentryErrorHandlerMixin, APIView):
     @transaction.atomic
     def post(self, request, pk):
         try:
-            order = Order.objects.select_for_update().get(id=pk, user=request.user)
+            order = (
+                Order.objects.with_latest_tracking_status()
+                .select_for_update()
+                .get(id=pk, user=request.user)
+            )
         except Order.DoesNotExist:
             return Response({'error': 'Orden no encontrada.'}, status=404)
 
@@ -156,8 +155,9 @@ class OrderViewSet(ViewSetSentryMixin, ReadOnlyModelViewSet):
         user = self.request.user
         if not user or not user.is_authenticated:
             return Order.objects.none()
-        
-        return Order.objects.filter(user_id=user.id)
+
+        # Parte del queryset de clase para conservar prefetch/select_related y el orden
+        return super().get_queryset().filter(user_id=user.id)
 
 @SHIPPING_TRACKING_VIEWSET
 class ShippingTrackingViewSet(ViewSetSentryMixin, ReadOnlyModelViewSet):
@@ -173,10 +173,20 @@ class ShippingTrackingViewSet(ViewSetSentryMixin, ReadOnlyModelViewSet):
         if not user or not user.is_authenticated:
             return ShippingTracking.objects.none()
 
+        # Ambos serializers leen order.total: sin el JOIN sería una query por fila
+        queryset = ShippingTracking.objects.select_related('order')
+
+        if self.action == 'retrieve':
+            # OrderDetailSerializer recorre dirección, items y pieza de cada item,
+            # y decide si se puede cancelar con el último rastreo de la orden
+            queryset = queryset.select_related('order__address').prefetch_related(
+                Prefetch('order__items', queryset=OrderItem.objects.select_related('piece'))
+            ).annotate(order_latest_tracking_status=latest_tracking_status('order_id'))
+
         if user.is_staff:
-            return ShippingTracking.objects.all()
+            return queryset
 
-        return ShippingTracking.objects.filter(order__user_id=user.id)
+        return queryset.filter(order__user_id=user.id)
     
     @action(
         detail=True,
@@ -209,14 +219,8 @@ class ValidateCouponView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
-            today = timezone.now().date()
-            coupon = Coupon.objects.get(
-                code=code,
-                valid_from__lte=today,
-                valid_until__gte=today
-            )
-        except Coupon.DoesNotExist:
+        coupon = CouponService.get(code)
+        if coupon is None or not coupon.is_valid():
             return Response(
                 {'detail': 'Cupón no válido o expirado.'},
                 status=status.HTTP_404_NOT_FOUND
@@ -287,6 +291,7 @@ class CacheDebugView(APIView):
         
 from django.http import JsonResponse
 from django.views import View
+from core.middleware import geoip_cache_stats
 class IPDebugView(View):
     def get(self, request):
         forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -300,5 +305,6 @@ class IPDebugView(View):
             'x_forwarded_for':  forwarded,
             'x_force_country':  request.META.get('HTTP_X_FORCE_COUNTRY'),
             'cf_connecting_ip': request.META.get('HTTP_CF_CONNECTING_IP'),
+            'geoip_cache':      geoip_cache_stats(),
         })
 
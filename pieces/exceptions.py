@@ -0,0 +1,12 @@
+class StockError(Exception):
+    """Clase base para errores de inventario"""
+    pass
+
+class InsufficientStockError(StockError):
+    """Cuando un UPDATE condicional no encuentra stock suficiente"""
+
+    def __init__(self, piece_id, available, requested):
+        self.piece_id = piece_id
+        self.available = available
+        self.requested = requested
+        super().__init__(f"Stock insuficiente para la pieza {piece_id}: disponible {available}, solicitado {requested}")
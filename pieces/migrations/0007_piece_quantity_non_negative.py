@@ -0,0 +1,17 @@
+# Generated by Django 5.2.12 on 2026-10-19 00:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pieces', '0006_remove_piece_slug_en_remove_piece_slug_es'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='piece',
+            constraint=models.CheckConstraint(condition=models.Q(('quantity__gte', 0)), name='piece_quantity_non_negative'),
+        ),
+    ]
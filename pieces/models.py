@@ -72,6 +72,9 @@ class Piece(HEICConversionMixin, BaseModel):
     class Meta:
         verbose_name = 'Pieza'
         verbose_name_plural = 'Piezas'
+        constraints = [
+            models.CheckConstraint(condition=models.Q(quantity__gte=0), name='piece_quantity_non_negative'),
+        ]
     
     def __str__(self):
         return self.title
@@ -86,6 +89,11 @@ class Piece(HEICConversionMixin, BaseModel):
 
     def get_active_discount(self):
         """Fuente de verdad del descuento. Usable desde cualquier capa."""
+        if not hasattr(self, '_active_discount_cache') and hasattr(self, 'active_piece_discounts'):
+            # Precargado con active_discount_prefetch(): sin query por pieza
+            piece_discount = self.active_piece_discounts[0] if self.active_piece_discounts else None
+            self._active_discount_cache = piece_discount.discount if piece_discount else None
+
         if not hasattr(self, '_active_discount_cache'):
             today = timezone.now().date()
             piece_discount = (
@@ -101,14 +109,20 @@ class Piece(HEICConversionMixin, BaseModel):
             self._active_discount_cache = piece_discount.discount if piece_discount else None
         return self._active_discount_cache
 
-    def get_final_price(self, region: str, apply_discount: bool = True) -> Decimal:
-        peso = max(math.ceil(self.volumetric_weight), self.weight)
+    @property
+    def shipping_kg(self) -> int:
+        """Tramo de ShippingRate.kg (entero) que aplica a la pieza."""
+        return int(max(math.ceil(self.volumetric_weight), self.weight))
 
+    def get_final_price(self, region: str, apply_discount: bool = True) -> Decimal:
         shipping = ShippingRate.objects.filter(
-            region=region.upper(), kg=peso
+            region=region.upper(), kg=self.shipping_kg
         ).first()
 
-        subtotal = self.price_base + (shipping.cost if shipping else Decimal('0'))
+        return self._price_from(shipping.cost if shipping else Decimal('0'), apply_discount)
+
+    def _price_from(self, shipping_cost: Decimal, apply_discount: bool = True) -> Decimal:
+        subtotal = self.price_base + shipping_cost
 
         if apply_discount:
             discount = self.get_active_discount()
@@ -121,9 +135,52 @@ class Piece(HEICConversionMixin, BaseModel):
 
         return Decimal(ceil_to_10(subtotal + commission_stripe + iva))
 
+    @classmethod
+    def quote(cls, pieces, region: str, apply_discount: bool = True) -> dict[int, Decimal]:
+        """
+        Precio final de varias piezas con un número constante de queries:
+        una para las tarifas de envío y otra para los descuentos activos.
+        Mismo cálculo que get_final_price; retorna {piece_id: precio}.
+        """
+        pieces = list(pieces)
+        if not pieces:
+            return {}
+
+        rates = dict(
+            ShippingRate.objects
+            .filter(region=region.upper(), kg__in={piece.shipping_kg for piece in pieces})
+            .values_list('kg', 'cost')
+        )
+
+        if apply_discount:
+            pending = [piece for piece in pieces if not hasattr(piece, '_active_discount_cache')]
+            if pending:
+                today = timezone.now().date()
+                discounts = {}
+                piece_discounts = (
+                    PieceDiscount.objects
+                    .filter(
+                        piece__in=pending,
+                        deleted_at__isnull=True,
+                        discount__start_date__lte=today,
+                        discount__end_date__gte=today,
+                    )
+                    .select_related('discount')
+                )
+                for piece_discount in piece_discounts:
+                    discounts.setdefault(piece_discount.piece_id, piece_discount.discount)
+                for piece in pending:
+                    piece._active_discount_cache = discounts.get(piece.id)
+
+        return {
+            piece.id: piece._price_from(rates.get(piece.shipping_kg, Decimal('0')), apply_discount)
+            for piece in pieces
+        }
+
     def release_stock(self, quantity: int):
+        # UPDATE atómico: no pasa por save() (full_clean, signals) ni pisa escrituras concurrentes
+        Piece._base_manager.filter(pk=self.pk).update(quantity=models.F('quantity') + quantity)
         self.quantity += quantity
-        self.save(update_fields=['quantity'])
 
 class Discount(BaseModel):
     name = models.CharField(max_length=50, default='pendiente de nombrar')
@@ -163,6 +220,23 @@ class PieceDiscount(BaseModel):
         return f"{self.piece.title} - {self.discount.percentage}%"
 
 
+def active_discount_prefetch(lookup='discounts') -> models.Prefetch:
+    """
+    Prefetch de los descuentos vigentes hoy en `active_piece_discounts`, que es
+    lo que get_active_discount consulta antes de ir a la BD. `lookup` permite
+    usarlo desde otro modelo (p. ej. 'piece__discounts' en WishList).
+    """
+    today = timezone.now().date()
+    return models.Prefetch(
+        lookup,
+        queryset=PieceDiscount.objects.filter(
+            discount__start_date__lte=today,
+            discount__end_date__gte=today,
+        ).select_related('discount'),
+        to_attr='active_piece_discounts',
+    )
+
+
 class PiecePhoto(HEICConversionMixin, BaseModel):
     piece = models.ForeignKey(Piece, on_delete=models.CASCADE, related_name="photos")
     image_path = models.ImageField(upload_to=upload_piece_image)
@@ -1,7 +1,7 @@
 from django.utils import timezone
 from decimal import Decimal
 from core.mixins import CurrencyMixin, TranslatedFieldsMixin
-from pieces.models import Piece, PieceDiscount, PiecePhoto, Review, Section, TypePiece
+from pieces.models import Piece, PieceDiscount, PiecePhoto, Review, Section, ShippingRate, TypePiece
 from rest_framework import serializers
 from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework.exceptions import ValidationError as DRFValidationError
@@ -77,6 +77,12 @@ class PieceSerializer(TranslatedFieldsMixin, CurrencyMixin, serializers.ModelSer
         return self.get_translated(obj, 'description')
 
     def _get_region(self) -> str:
+        # Se resuelve una vez por respuesta: el contexto lo comparten todas las piezas de la lista
+        if 'region' not in self.context:
+            self.context['region'] = self._resolve_region()
+        return self.context['region']
+
+    def _resolve_region(self) -> str:
         request = self.context.get('request')
         if not request:
             return 'US'
@@ -88,16 +94,19 @@ class PieceSerializer(TranslatedFieldsMixin, CurrencyMixin, serializers.ModelSer
 
         return getattr(request, 'detected_country', 'US')
 
+    def _final_price(self, obj, apply_discount: bool) -> Decimal:
+        """Mismo cálculo que Piece.get_final_price, con la tabla de envíos de la región leída una vez."""
+        region = self._get_region().upper()
+        rates = self.context.setdefault('shipping_rates', {})
+        if region not in rates:
+            rates[region] = dict(ShippingRate.objects.filter(region=region).values_list('kg', 'cost'))
+        return obj._price_from(rates[region].get(obj.shipping_kg, Decimal('0')), apply_discount)
 
     def get_final_price_base(self, obj) -> dict:
-        region = self._get_region()
-        price_mxn = obj.get_final_price(region, apply_discount=True)
-        return self._to_currencies(price_mxn)
+        return self._to_currencies(self._final_price(obj, apply_discount=True))
 
     def get_original_price_base(self, obj) -> dict:
-        region = self._get_region()
-        price_mxn = obj.get_final_price(region, apply_discount=False)
-        return self._to_currencies(price_mxn)
+        return self._to_currencies(self._final_price(obj, apply_discount=False))
     
     def get_has_discount(self, obj) -> bool:
         return obj.get_active_discount() is not None
@@ -110,11 +119,15 @@ class PieceSerializer(TranslatedFieldsMixin, CurrencyMixin, serializers.ModelSer
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return None
-        wishlist = WishList.objects.filter(
-            user=request.user, 
-            piece=obj,
-            is_active=True 
-        ).first()
+        if hasattr(obj, 'user_wishlist'):
+            # Precargado por la vista (Prefetch a user_wishlist)
+            wishlist = obj.user_wishlist[0] if obj.user_wishlist else None
+        else:
+            wishlist = WishList.objects.filter(
+                user=request.user, 
+                piece=obj,
+                is_active=True 
+            ).first()
         if not wishlist:
             return None
         return WishListSerializerDetail(wishlist).data
@@ -1,17 +1,22 @@
+from django.conf import settings
 from django.utils import timezone  
 from decimal import Decimal
 import requests
 from decouple import config
+from collections import Counter
 from orders.models import ExchangeRate
 from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from pieces.exceptions import InsufficientStockError
+from pieces.models import Piece
 
 class BanxicoClient:
 
     @staticmethod
     def fetch_rate() -> Decimal:
         """Responsabilidad: hablar con la API de Banxico"""
-        url = "https://www.banxico.org.mx/SieAPIRest/service/v1/series/SF43718/datos/oportuno"
-        response = requests.get(url, headers={"Bmx-Token": config('CONSULT_BMX_TOKEN')}, timeout=3)
+        response = requests.get(settings.BANXICO_API_URL, headers={"Bmx-Token": config('CONSULT_BMX_TOKEN')}, timeout=3)
         dato = response.json()['bmx']['series'][0]['datos'][0]['dato']
         return Decimal(dato)
 
@@ -50,3 +55,64 @@ class CurrencyService:
             cache.set(EXCHANGE_RATE_CACHE_KEY, rate, EXCHANGE_RATE_CACHE_TTL)
             return rate
 
+
+class InventoryService:
+    """
+    Movimientos de stock con UPDATEs condicionales: la BD valida y descuenta en
+    la misma sentencia, sin leer la pieza ni pasar por Piece.save (full_clean,
+    signals, HEIC). `items` es un iterable de (piece_id, cantidad).
+    """
+
+    @staticmethod
+    def _totals(items) -> dict[int, int]:
+        totals = Counter()
+        for piece_id, quantity in items:
+            totals[piece_id] += quantity
+        return dict(sorted(totals.items()))
+
+    @staticmethod
+    def decrement(items) -> None:
+        """
+        Descuenta el stock de todo el pedido en una sola sentencia:
+        UPDATE ... SET quantity = quantity - n WHERE (id = a AND quantity >= n) OR ...
+        Si alguna pieza no alcanza, el conteo de filas no cuadra, se hace rollback
+        del savepoint y se lanza InsufficientStockError.
+        """
+        totals = InventoryService._totals(items)
+        if not totals:
+            return
+
+        condition = Q()
+        for piece_id, quantity in totals.items():
+            condition |= Q(id=piece_id, quantity__gte=quantity)
+        delta = Case(
+            *[When(id=piece_id, then=Value(quantity)) for piece_id, quantity in totals.items()],
+            output_field=IntegerField(),
+        )
+
+        with transaction.atomic():
+            updated = Piece._base_manager.filter(condition).update(quantity=F('quantity') - delta)
+            oversold = updated != len(totals)
+            if oversold:
+                transaction.set_rollback(True)
+
+        if oversold:
+            available = dict(Piece._base_manager.filter(id__in=totals).values_list('id', 'quantity'))
+            piece_id = next(
+                (pid for pid, quantity in totals.items() if available.get(pid, 0) < quantity),
+                next(iter(totals)),
+            )
+            raise InsufficientStockError(piece_id, available.get(piece_id, 0), totals[piece_id])
+
+    @staticmethod
+    def increment(items) -> None:
+        """Devuelve stock (cancelaciones) con un único UPDATE ... SET quantity = quantity + n."""
+        totals = InventoryService._totals(items)
+        if not totals:
+            return
+
+        delta = Case(
+            *[When(id=piece_id, then=Value(quantity)) for piece_id, quantity in totals.items()],
+            output_field=IntegerField(),
+        )
+        Piece._base_manager.filter(id__in=totals).update(quantity=F('quantity') + delta)
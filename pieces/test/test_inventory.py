@@ -0,0 +1,66 @@
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from pieces.exceptions import InsufficientStockError
+from pieces.models import Piece, TypePiece, Section
+from pieces.service import InventoryService
+from pieces.test.test_piece import fake_image
+
+
+class InventoryServiceTest(TestCase):
+
+    def setUp(self):
+        type_piece = TypePiece.objects.create(type='Pintura', key='painting')
+        section = Section.objects.create(section='Principal', key='main')
+        self.a = self._piece('Pieza A', 5, type_piece, section)
+        self.b = self._piece('Pieza B', 1, type_piece, section)
+
+    def _piece(self, title, quantity, type_piece, section):
+        return Piece.objects.create(
+            title=title, description='x', quantity=quantity, price_base='100.00',
+            width='1.00', height='1.00', length='1.00', weight='1.00',
+            type=type_piece, section=section, thumbnail_path=fake_image(),
+        )
+
+    def _stock(self, piece):
+        return Piece.objects.values_list('quantity', flat=True).get(id=piece.id)
+
+    def test_decrement_whole_order_in_one_update(self):
+        with CaptureQueriesContext(connection) as ctx:
+            InventoryService.decrement([(self.a.id, 2), (self.b.id, 1)])
+
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+
+        self.assertEqual(self._stock(self.a), 3)
+        self.assertEqual(self._stock(self.b), 0)
+
+    def test_decrement_sums_repeated_pieces(self):
+        with self.assertRaises(InsufficientStockError):
+            InventoryService.decrement([(self.a.id, 3), (self.a.id, 3)])
+        self.assertEqual(self._stock(self.a), 5)
+
+    def test_oversold_order_is_rolled_back(self):
+        with self.assertRaises(InsufficientStockError) as ctx:
+            InventoryService.decrement([(self.a.id, 2), (self.b.id, 2)])
+
+        self.assertEqual(ctx.exception.piece_id, self.b.id)
+        self.assertEqual(ctx.exception.available, 1)
+        self.assertEqual(self._stock(self.a), 5)
+        self.assertEqual(self._stock(self.b), 1)
+
+    def test_increment_restores_stock(self):
+        InventoryService.increment([(self.a.id, 2), (self.b.id, 3)])
+
+        self.assertEqual(self._stock(self.a), 7)
+        self.assertEqual(self._stock(self.b), 4)
+
+    def test_release_stock_skips_save(self):
+        with self.assertNumQueries(1):
+            self.b.release_stock(2)
+        self.assertEqual(self._stock(self.b), 3)
+
+    def test_check_constraint_rejects_negative_stock(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Piece.objects.filter(id=self.b.id).update(quantity=-1)
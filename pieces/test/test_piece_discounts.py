@@ -246,4 +246,30 @@ class PieceDiscountWriteForbiddenTests(AdminClientMixin, APITestCase):
 
     def test_delete_not_allowed(self):
         resp = self.client.delete(self.detail_url)
-        self.assertEqual(resp.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
\ No newline at end of file
+        self.assertEqual(resp.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+# ──────────────────────────────────────────────
+# Cotización en lote
+# ──────────────────────────────────────────────
+
+class PieceQuoteTests(APITestCase):
+
+    def setUp(self):
+        type_piece, section = create_type_piece(), create_section()
+        self.discounted = create_piece(type_piece, section)
+        self.plain = create_piece(type_piece, section, slug="plain", title="Plain")
+        create_piece_discount(self.discounted, create_discount(days_ahead_start=0))
+
+    def test_quote_matches_get_final_price(self):
+        expected = {
+            piece.id: Piece.objects.get(id=piece.id).get_final_price("mx")
+            for piece in (self.discounted, self.plain)
+        }
+
+        self.assertEqual(Piece.quote([self.discounted, self.plain], "mx"), expected)
+        self.assertNotEqual(expected[self.discounted.id], expected[self.plain.id])
+
+    def test_quote_uses_constant_queries(self):
+        pieces = list(Piece.objects.filter(id__in=[self.discounted.id, self.plain.id]))
+        with self.assertNumQueries(2):
+            Piece.quote(pieces, "mx")
@@ -11,7 +11,9 @@ from pieces.service import CurrencyService
 from .models import PieceDiscount, PiecePhoto, Review, TypePiece, Section
 from core.permission import IsAdminOrAuthenticatedCreate, IsAdminOrReadOnly
 from pieces.filters import PieceFilter, ReviewFilter
-from pieces.models import Piece
+from pieces.models import Piece, active_discount_prefetch
+from users.models import WishList
+from django.db.models import Prefetch
 from pieces.serializer import ExternalReviewSerializer, PieceDiscountSerializer, PiecePhotoBulkCreateSerializer, PiecePhotoBulkDeleteSerializer, PiecePhotoReorderSerializer, PiecePhotoSerializer, PiecePublicSerializer, PieceSerializer, ReviewSerializer, TypePieceSerializer, SectionSerializer
 from django.db import transaction
 from rest_framework import viewsets, status
@@ -26,6 +28,21 @@ class PieceViewSet(ViewSetSentryMixin, ModelViewSet):
     permission_classes = [IsAdminOrReadOnly]
     filterset_class = PieceFilter
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+
+        # Descuento vigente y favorito del usuario en dos queries para toda la página
+        queryset = queryset.prefetch_related(active_discount_prefetch())
+        if self.request.user.is_authenticated:
+            queryset = queryset.prefetch_related(Prefetch(
+                'wishlist_set',
+                queryset=WishList.objects.filter(user=self.request.user, is_active=True),
+                to_attr='user_wishlist',
+            ))
+        return queryset
+
     def perform_create(self, serializer):
         serializer.save(slug=slugify(serializer.validated_data['title']))
 
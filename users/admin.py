@@ -6,6 +6,7 @@ from .models import Address, WishList
 from django.contrib.auth.admin import UserAdmin
 
 from django.contrib.auth import get_user_model
+from auth.services import UserCacheService
 User = get_user_model()
 
 
@@ -38,7 +39,10 @@ class AddressAdmin(admin.ModelAdmin):
 
 @admin.action(description="Desactivar usuarios seleccionados")
 def deactivate_users(modeladmin, request, queryset):
-    updated = queryset.filter(is_active=True).update(is_active=False)
+    user_ids = list(queryset.filter(is_active=True).values_list('pk', flat=True))
+    # update() no dispara post_save: el usuario cacheado para JWT se invalida aquí
+    updated = User.objects.filter(pk__in=user_ids).update(is_active=False)
+    UserCacheService.invalidate(*user_ids)
     modeladmin.message_user(
         request,
         f"{updated} usuario(s) desactivado(s).",
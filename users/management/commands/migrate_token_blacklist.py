@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from auth.tokens import TokenBlacklistStore
+
+
+class Command(BaseCommand):
+    help = 'Copia los refresh tokens de la blacklist en BD a la blacklist en cache (Redis)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Filas leídas por consulta'
+        )
+        parser.add_argument(
+            '--purge',
+            action='store_true',
+            help='Después de copiar, borrar OutstandingToken/BlacklistedToken de la BD'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        now = timezone.now()
+
+        # Los vencidos ya no validan por `exp`: no hace falta llevarlos a la cache
+        rows = (
+            BlacklistedToken.objects
+            .filter(token__expires_at__gt=now)
+            .order_by('id')
+            .values_list('id', 'token__jti', 'token__expires_at')
+        )
+
+        copied = 0
+        last_id = 0
+        while True:
+            batch = list(rows.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            copied += TokenBlacklistStore.add_many(
+                (jti, int(expires_at.timestamp())) for _, jti, expires_at in batch
+            )
+            last_id = batch[-1][0]
+
+        self.stdout.write(self.style.SUCCESS(f'{copied} tokens vigentes copiados a la blacklist en cache'))
+
+        if options['purge']:
+            # BlacklistedToken cae en cascada con su OutstandingToken
+            deleted, _ = OutstandingToken.objects.all().delete()
+            self.stdout.write(f'{deleted} filas eliminadas de la BD')
@@ -1,10 +1,22 @@
 
 from email.headerregistry import Address
-from django.db.models.signals import post_delete
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from auth.services import UserCacheService
+
+User = get_user_model()
+
 @receiver(post_delete, sender=Address)
 def set_default_on_delete(sender, instance, **kwargs):
     remaining = Address.objects.filter(user=instance.user)
     if remaining.count() == 1:
-        remaining.update(is_default=True)
\ No newline at end of file
+        remaining.update(is_default=True)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    UserCacheService.invalidate(instance.pk)
+
@@ -5,7 +5,7 @@ from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from core.mixins import SentryErrorHandlerMixin, ViewSetSentryMixin
 from core.permission import IsOwner
 from core.responses.messages import UserMessages
-from pieces.models import Piece
+from pieces.models import Piece, active_discount_prefetch
 from users.docs.schemas import ADDRESS_SET_DEFAULT, ADDRESS_VIEWSET, EMAIL_UPDATE, WISHLIST_VIEWSET
 from users.filters import AddressFilter
 from users.serializers import EmailUpdateSerializer, AddressSerializer, WishListSerializer
@@ -19,6 +19,7 @@ from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiPara
 from rest_framework.decorators import action
 from .models import Address, WishList
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db.models import Prefetch
 
 User = get_user_model()
 
@@ -89,7 +90,15 @@ class WishListViewSet(ViewSetSentryMixin, viewsets.ModelViewSet):
         return WishList.objects.filter(
             user=self.request.user,
             is_active=True
-        ).select_related('piece')
+        ).select_related('piece__type', 'piece__section').prefetch_related(
+            active_discount_prefetch('piece__discounts'),
+            # El wishlist_detail de cada pieza es el propio favorito del usuario
+            Prefetch(
+                'piece__wishlist_set',
+                queryset=WishList.objects.filter(user=self.request.user, is_active=True),
+                to_attr='user_wishlist',
+            ),
+        )
 
     def perform_create(self, serializer):
         serializer.save()